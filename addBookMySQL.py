@@ -1,58 +1,325 @@
 #파이썬으로 sql사용하기 feat mySQL
+import csv
+import json
+import re
 import sys
 import pymysql
 from PyQt6.QtWidgets import QApplication
+from db_pool import get_pool
+
+BULK_BATCH = 1000           # executemany 한 번에 보낼 행 수 (가져오기 전체는 한 트랜잭션)
+PHONE_DIGITS_LEN = 20       # phone_digits / phone_digits_rev 컬럼 길이
+
+_PHONE_KEY = re.compile(r"[0-9\s\-.()+]+")     # 이런 검색어는 전화번호로 보고 phone_digits 로 찾는다
+# 전화번호 검색용 컬럼: 숫자만 남긴 번호(앞자리 검색)와 그것을 뒤집은 번호(뒷자리 검색), 각각 인덱스
+_PHONE_COLUMNS = (('phone_digits', 'idx_phone_digits'), ('phone_digits_rev', 'idx_phone_digits_rev'))
+
+
+def normalize_phone(phone):
+    """전화번호 비교용: 숫자만 남긴다 ('010-1234-5678' → '01012345678')"""
+    return re.sub(r"\D", "", str(phone or ""))[:PHONE_DIGITS_LEN]
+
+
+def _phone_keys(phone):
+    """(phone_digits, phone_digits_rev) - 뒷자리 검색은 뒤집은 번호의 앞자리 검색으로 인덱스를 탄다"""
+    digits = normalize_phone(phone)
+    return digits, digits[::-1]
+
+
 class mysqlDB():
     def __init__(self)->None:
         pymysql.version_info = (1, 4, 2, "final", 0)
         pymysql.install_as_MySQLdb()
         super().__init__()
-        self.connection = pymysql.connect(
-            host = 'bitnmeta2.synology.me',
-            user = 'iyrc',
-            passwd = 'Dodan1004!',
-            db = 'gemini_ai',
-            charset = 'utf8',
-            port = 3307,
-            cursorclass = pymysql.cursors.DictCursor)
-    def insert(self, new_question, new_phone):        
-        with self.connection.cursor() as cursor:
-            sql = "INSERT INTO addBook_AI (name, phone) VALUES (%s, %s)"
-            result = cursor.execute(sql, (new_name, new_phone))
-            self.connection.commit()
+        # 접속 설정은 db_pool.DB_CONFIG 한 곳에서 관리하고, 연결은 공용 풀에서 빌려 쓴다
+        self.pool = get_pool()
+        self.phone_index_ready = None   # phone_digits 컬럼 사용 가능 여부 (처음 쓸 때 확인)
+
+    def ensure_indexes(self):
+        """
+        숫자만 남긴 전화번호 컬럼(phone_digits, 뒤집은 phone_digits_rev)과 인덱스, name 인덱스가 없으면 만들고
+        비어 있는 값을 채운다. search_phone 은 phone LIKE '%...%' 전체 스캔 대신 이 인덱스로 찾는다.
+        """
+        if self.phone_index_ready is not None:
+            return self.phone_index_ready
+        try:
+            with self.pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    for column, index in _PHONE_COLUMNS:
+                        cursor.execute(
+                            "SELECT COUNT(*) AS cnt FROM information_schema.COLUMNS "
+                            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'addBook_AI' "
+                            "AND COLUMN_NAME = %s", (column,)
+                        )
+                        if not cursor.fetchone()['cnt']:
+                            print(f"📇 addBook_AI 에 {column} 컬럼/인덱스를 추가하는 중...")
+                            cursor.execute(
+                                f"ALTER TABLE addBook_AI ADD COLUMN {column} VARCHAR({PHONE_DIGITS_LEN}) NULL, "
+                                f"ADD INDEX {index} ({column})"
+                            )
+                    self._ensure_name_index(cursor)
+                    # 전화번호가 없는 행은 빈 값으로 표시해 둔다 (NULL 로 두면 시작할 때마다 다시 채우려 한다)
+                    cursor.execute("UPDATE addBook_AI SET phone_digits = '', phone_digits_rev = '' "
+                                   "WHERE phone IS NULL AND (phone_digits IS NULL OR phone_digits_rev IS NULL)")
+                    cursor.execute("SELECT DISTINCT phone FROM addBook_AI WHERE phone IS NOT NULL "
+                                   "AND (phone_digits IS NULL OR phone_digits_rev IS NULL)")
+                    phones = [row['phone'] for row in cursor.fetchall()]
+                    for batch in _batches(phones, BULK_BATCH):
+                        cursor.executemany(
+                            "UPDATE addBook_AI SET phone_digits = %s, phone_digits_rev = %s WHERE phone = %s",
+                            [_phone_keys(p) + (p,) for p in batch]
+                        )
+                conn.commit()
+            self.phone_index_ready = True
+        except Exception as e:
+            print(f"phone_digits 인덱스를 사용할 수 없어 phone LIKE 검색을 사용합니다: {e}")
+            self.phone_index_ready = False
+        return self.phone_index_ready
+
+    @staticmethod
+    def _ensure_name_index(cursor):
+        """update/delete/upsert 는 name 으로 찾으므로 name 인덱스가 없으면 만든다 (TEXT 컬럼이면 앞 100자)"""
+        cursor.execute(
+            "SELECT COUNT(*) AS cnt FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'addBook_AI' "
+            "AND COLUMN_NAME = 'name' AND SEQ_IN_INDEX = 1"
+        )
+        if cursor.fetchone()['cnt']:
+            return
+        try:
+            cursor.execute("ALTER TABLE addBook_AI ADD INDEX idx_name (name)")
+        except pymysql.err.MySQLError:
+            try:
+                cursor.execute("ALTER TABLE addBook_AI ADD INDEX idx_name (name(100))")
+            except pymysql.err.MySQLError as e:
+                print(f"name 인덱스를 만들지 못했습니다: {e}")
+
+    def insert(self, new_name, new_phone):
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            if self.ensure_indexes():
+                sql = "INSERT INTO addBook_AI (name, phone, phone_digits, phone_digits_rev) VALUES (%s, %s, %s, %s)"
+                result = cursor.execute(sql, (new_name, new_phone) + _phone_keys(new_phone))
+            else:
+                sql = "INSERT INTO addBook_AI (name, phone) VALUES (%s, %s)"
+                result = cursor.execute(sql, (new_name, new_phone))
+            conn.commit()
             return result
-    
+
     def update(self, name_key, new_phone):
-        with self.connection.cursor() as cursor:
-            sql = "UPDATE addBook_AI SET phone = %s WHERE name = %s"
-            result = cursor.execute(sql, (new_phone, name_key))
-            self.connection.commit()
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            if self.ensure_indexes():
+                sql = "UPDATE addBook_AI SET phone = %s, phone_digits = %s, phone_digits_rev = %s WHERE name = %s"
+                result = cursor.execute(sql, (new_phone,) + _phone_keys(new_phone) + (name_key,))
+            else:
+                sql = "UPDATE addBook_AI SET phone = %s WHERE name = %s"
+                result = cursor.execute(sql, (new_phone, name_key))
+            conn.commit()
             return result
-    
-    def delete(self, name_key):                
-        with self.connection.cursor() as cursor:
+
+    def delete(self, name_key):
+        with self.pool.connection() as conn, conn.cursor() as cursor:
             sql = "DELETE FROM addBook_AI WHERE name = %s"
             result = cursor.execute(sql, name_key)
-            self.connection.commit()
-            return result
-        
-    def search(self, any_key):                
-        with self.connection.cursor() as cursor:
-            sql = "SELECT * FROM addBook_AI WHERE name LIKE %s OR phone LIKE %s"
-            key = '%' + any_key + '%'
-            cursor.execute(sql, (key, key))
-            result = cursor.fetchall() # result = cursor.fetchone() 1개의 레코드
+            conn.commit()
             return result
+
+    def search(self, any_key, limit=None):
+        """
+        이름 또는 전화번호에 검색어가 들어 있는 행을 한 행씩 돌려주는 제너레이터
+        (서버 쪽 커서 SSDictCursor - 결과 전체를 메모리에 올리지 않는다). 전화번호의 앞/뒷자리만 인덱스로
+        빠르게 찾으려면 search_phone 을 쓴다.
+        """
+        key = '%' + str(any_key).strip() + '%'
+        limit_sql, limit_params = (" LIMIT %s", [int(limit)]) if limit else ("", [])
+        return self._stream("SELECT * FROM addBook_AI WHERE name LIKE %s OR phone LIKE %s" + limit_sql,
+                            [key, key] + limit_params)
+
+    def search_phone(self, phone_key, limit=None):
+        """
+        전화번호가 phone_key 로 시작하거나 끝나는 행 ('010-12' → 010-1234-..., '5678' → ...-5678).
+        구분자는 무시하고 숫자로 비교하며, phone_digits / phone_digits_rev 인덱스로 찾는다 (전체 스캔 없음).
+        가운데 숫자나 이름으로 찾으려면 search 를 쓴다. 인덱스 컬럼을 쓸 수 없으면 phone LIKE 로 찾는다.
+        """
+        phone_key = str(phone_key).strip()
+        digits = normalize_phone(phone_key)
+        if not digits or not _PHONE_KEY.fullmatch(phone_key):
+            return iter(())
+        limit_sql, limit_params = (" LIMIT %s", [int(limit)]) if limit else ("", [])
+        if self.ensure_indexes():
+            return self._stream("SELECT * FROM addBook_AI WHERE phone_digits LIKE %s "
+                                "UNION SELECT * FROM addBook_AI WHERE phone_digits_rev LIKE %s" + limit_sql,
+                                [digits + '%', digits[::-1] + '%'] + limit_params)
+        return self._stream("SELECT * FROM addBook_AI WHERE phone LIKE %s OR phone LIKE %s" + limit_sql,
+                            [phone_key + '%', '%' + phone_key] + limit_params)
+
+    def iter_all(self):
+        """주소록 전체를 한 행씩 (내보내기용)"""
+        return self._stream("SELECT name, phone FROM addBook_AI", [])
+
+    def _stream(self, sql, params):
+        conn = self.pool.acquire()
+        finished = False
+        try:
+            cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+            cursor.execute(sql, params)
+            for row in cursor:
+                yield row
+            cursor.close()
+            finished = True
+        finally:
+            # 끝까지 읽지 않고 멈추면 남은 결과가 연결에 걸려 있으므로 그 연결은 버린다
+            self.pool.release(conn, broken=not finished)
+
+    # ------------------------------------------------------------
+    # 일괄 처리: executemany 로 묶어 보내고 전체를 한 번만 커밋한다
+    # ------------------------------------------------------------
+    def insert_many(self, rows):
+        """rows: (name, phone) 또는 {'name', 'phone'} 의 목록/이터레이터. 넣은 행 수를 반환한다."""
+        return self._bulk(rows, upsert=False)
+
+    def upsert_many(self, rows):
+        """같은 이름이 있으면 전화번호를 바꾸고 없으면 넣는다. 처리한 행 수를 반환한다."""
+        return self._bulk(rows, upsert=True)
+
+    def _bulk(self, rows, upsert):
+        use_digits = self.ensure_indexes()
+        done = 0
+        # 도중에 실패하면 연결을 버리므로(커밋 전) 아무것도 반영되지 않는다
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                for batch in _batches(_contact_rows(rows), BULK_BATCH):
+                    done += len(batch)
+                    if upsert:
+                        batch = self._update_existing(cursor, batch, use_digits)
+                    if not batch:
+                        continue
+                    if use_digits:
+                        cursor.executemany(
+                            "INSERT INTO addBook_AI (name, phone, phone_digits, phone_digits_rev) "
+                            "VALUES (%s, %s, %s, %s)",
+                            [(name, phone) + _phone_keys(phone) for name, phone in batch]
+                        )
+                    else:
+                        cursor.executemany("INSERT INTO addBook_AI (name, phone) VALUES (%s, %s)", batch)
+            conn.commit()
+        return done
+
+    @staticmethod
+    def _update_existing(cursor, batch, use_digits):
+        """이미 있는 이름은 UPDATE 하고, 새로 넣을 (name, phone) 만 돌려준다 (같은 이름이 겹치면 마지막 것)"""
+        latest = dict(batch)
+        names = list(latest)
+        placeholders = ", ".join(["%s"] * len(names))
+        cursor.execute(f"SELECT DISTINCT name FROM addBook_AI WHERE name IN ({placeholders})", names)
+        existing = {row['name'] for row in cursor.fetchall()}
+        updates = [(name, phone) for name, phone in latest.items() if name in existing]
+        if updates:
+            if use_digits:
+                cursor.executemany("UPDATE addBook_AI SET phone = %s, phone_digits = %s, phone_digits_rev = %s "
+                                   "WHERE name = %s",
+                                   [(phone,) + _phone_keys(phone) + (name,) for name, phone in updates])
+            else:
+                cursor.executemany("UPDATE addBook_AI SET phone = %s WHERE name = %s",
+                                   [(phone, name) for name, phone in updates])
+        return [(name, phone) for name, phone in latest.items() if name not in existing]
+
+    # ------------------------------------------------------------
+    # 파일 가져오기 / 내보내기 (.csv: name,phone 열 / .jsonl: {"name": ..., "phone": ...})
+    # ------------------------------------------------------------
+    def import_file(self, path, upsert=False):
+        """파일의 연락처를 한 트랜잭션으로 넣는다 (upsert=True 면 같은 이름은 전화번호만 바꾼다). 처리한 행 수 반환."""
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            rows = _read_contacts(f, _file_format(path))
+            return self.upsert_many(rows) if upsert else self.insert_many(rows)
+
+    def export_file(self, path):
+        """주소록 전체를 파일로 쓴다 (한 행씩 읽어서 바로 쓴다). 쓴 행 수를 반환한다."""
+        fmt = _file_format(path)
+        count = 0
+        # CSV 는 엑셀에서 한글이 깨지지 않도록 BOM 을 붙인다
+        with open(path, 'w', encoding='utf-8-sig' if fmt == 'csv' else 'utf-8', newline='') as f:
+            writer = csv.writer(f) if fmt == 'csv' else None
+            if writer:
+                writer.writerow(['name', 'phone'])
+            for row in self.iter_all():
+                if writer:
+                    writer.writerow([row['name'], row['phone']])
+                else:
+                    f.write(json.dumps({'name': row['name'], 'phone': row['phone']}, ensure_ascii=False) + "\n")
+                count += 1
+        return count
+
+    def stats(self):
+        return self.pool.stats()
+
     def pause(self):
         input("다음 테스트를 진행하려면 Enter를 누르세요...")
+
+
+def _contact_rows(rows):
+    """(name, phone) / dict 를 (name, phone) 문자열 쌍으로 (이름 없는 행은 건너뛴다)"""
+    for row in rows:
+        if isinstance(row, dict):
+            name, phone = row.get('name'), row.get('phone')
+        else:
+            name, phone = row[0], row[1] if len(row) > 1 else ''
+        name = str(name or '').strip()
+        if name:
+            yield name, str(phone or '').strip()
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _file_format(path):
+    ext = str(path).lower().rsplit('.', 1)[-1]
+    if ext in ('jsonl', 'json', 'ndjson'):
+        return 'jsonl'
+    if ext == 'csv':
+        return 'csv'
+    raise ValueError(f"지원하지 않는 파일 형식입니다 (.csv / .jsonl): {path}")
+
+
+def _read_contacts(f, fmt):
+    if fmt == 'jsonl':
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+        return
+    reader = csv.reader(f)
+    first = next(reader, None)
+    if first is None:
+        return
+    header = [c.strip().lower() for c in first]
+    if 'name' in header:
+        # 머리글이 있으면 name/phone 열 위치를 따른다
+        name_col = header.index('name')
+        phone_col = header.index('phone') if 'phone' in header else None
+        for cols in reader:
+            if cols:
+                yield {'name': cols[name_col] if len(cols) > name_col else '',
+                       'phone': cols[phone_col] if phone_col is not None and len(cols) > phone_col else ''}
+    else:
+        yield first
+        yield from (cols for cols in reader if cols)
+
+
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     db = mysqlDB()
     # 추가 테스트
     # result = db.insert("홍길동fromPython1","010,0987,6543")
-    # print("Insert test: ", result)   
+    # print("Insert test: ", result)
     # result = db.insert("홍길동3","011-1234-6543")
-    # print("Insert test: ", result)   
+    # print("Insert test: ", result)
 
     # db.pause()
 
@@ -61,15 +328,21 @@ if __name__ == '__main__':
     # print("Update Test : ", result)
     # db.pause()
 
-    # 찾기 테스트
+    # # 일괄 가져오기 / 내보내기 테스트
+    # print("Import Test : ", db.import_file("contacts.csv", upsert=True))
+    # print("Export Test : ", db.export_file("contacts_backup.jsonl"))
+    # db.pause()
+
+    # 찾기 테스트 (결과는 한 행씩 읽어 온다)
 
-    result = db.search("홍")
+    result = list(db.search("홍"))
     print("Search Test : ", result)
+    print("Phone Search Test : ", list(db.search_phone("010-1234", limit=10)))
     db.pause()
 
     # 삭제 테스트
     result = db.delete("홍길동fromPython")
     print("Delete Test : ", result)
+    print("Pool stats : ", db.stats())
 
     exit(app.exec())
-
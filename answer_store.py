@@ -0,0 +1,117 @@
+# 긴 답변을 잘라내거나 요약하지 않고 그대로 저장하기 위한 분할 저장소
+# chat_history.answer 컬럼 길이를 넘는 답변은 앞부분(미리보기)만 answer 에 넣고,
+# 전체 답변은 chat_answer_parts 테이블에 조각으로 나눠 저장한다.
+# 검색 결과를 읽을 때 조각이 있는 행은 전체 답변으로 다시 합쳐서 돌려준다.
+import os
+import threading
+
+ANSWER_INLINE_LIMIT = int(os.getenv("ANSWER_INLINE_LIMIT", "500"))   # 컬럼 길이를 알아내기 전 기본값 (글자 수)
+ANSWER_CHAR_BYTES = 3                                               # 컬럼 바이트 수를 모를 때 글자당 바이트 (utf8)
+ANSWER_PART_SIZE = 8000                                             # 조각 하나의 글자 수
+
+SCHEMA_SQL = (
+    "CREATE TABLE IF NOT EXISTS chat_answer_parts ("
+    "  history_id INT NOT NULL,"
+    "  part_no INT NOT NULL,"
+    "  content TEXT NOT NULL,"
+    "  PRIMARY KEY (history_id, part_no)"
+    ") DEFAULT CHARSET=utf8mb4"
+)
+
+
+class AnswerStore:
+    """
+    - ensure_schema(): 조각 테이블을 만들고 chat_history.answer 의 실제 최대 길이(글자 수와 바이트 수)를 읽어 온다.
+                       TEXT 컬럼은 길이가 바이트로 정해지므로 한글(글자당 3바이트) 답변은 글자 수만 보면 넘칠 수 있다.
+                       한 번 성공하면 다시 조회하지 않는다 (ready, refresh=True 면 다시).
+    - split(answer)  : (answer 컬럼에 넣을 미리보기, 조각 목록). 짧은 답변이면 조각 목록은 비어 있다.
+                       아직 ensure_schema 가 끝나지 않았으면 먼저 부른다 (기본 길이로 잘못 나누지 않도록).
+                       호출한 쪽이 연결을 빌리기 전에 부른다 (ensure_schema 가 풀에서 연결을 하나 빌린다).
+    - fit(text)      : 글자 수와 utf-8 바이트 수 둘 다 컬럼에 들어가도록 자른 앞부분
+    - write_parts()  : 호출한 쪽의 커서로 조각을 넣는다 - chat_history INSERT 와 같은 트랜잭션으로 함께 커밋된다.
+                       (명사 색인은 커밋 뒤 저장 후처리에서 따로 한다)
+    - attach_full_answers(rows): 조각이 있는 행의 answer 를 전체 답변으로 바꾼다 (조회 1번).
+    """
+
+    def __init__(self, pool, inline_limit=ANSWER_INLINE_LIMIT, part_size=ANSWER_PART_SIZE):
+        self.pool = pool
+        self.inline_limit = inline_limit
+        self.inline_bytes = inline_limit * ANSWER_CHAR_BYTES
+        self.part_size = part_size
+        self.ready = False
+        self._schema_lock = threading.Lock()
+
+    def ensure_schema(self, refresh=False):
+        with self._schema_lock:
+            if refresh or not self.ready:
+                self._read_schema()
+                self.ready = True
+        return self.inline_limit
+
+    def _read_schema(self):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(SCHEMA_SQL)
+                cursor.execute(
+                    "SELECT CHARACTER_MAXIMUM_LENGTH AS max_len, CHARACTER_OCTET_LENGTH AS max_bytes "
+                    "FROM information_schema.COLUMNS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'chat_history' "
+                    "AND COLUMN_NAME = 'answer'"
+                )
+                row = cursor.fetchone()
+            conn.commit()
+        if row and row['max_len']:
+            self.inline_limit = int(row['max_len'])
+            self.inline_bytes = int(row.get('max_bytes') or self.inline_limit * ANSWER_CHAR_BYTES)
+
+    def is_long(self, answer):
+        answer = str(answer)
+        return len(answer) > self.inline_limit or len(answer.encode('utf-8')) > self.inline_bytes
+
+    def fit(self, text, inline_limit=None):
+        text = str(text)[:inline_limit or self.inline_limit]
+        encoded = text.encode('utf-8')
+        if len(encoded) > self.inline_bytes:
+            text = encoded[:self.inline_bytes].decode('utf-8', 'ignore')   # 글자 중간에서 잘린 바이트는 버린다
+        return text
+
+    def split(self, answer, inline_limit=None):
+        if not self.ready:
+            try:
+                self.ensure_schema()
+            except Exception as e:
+                print(f"answer 컬럼 길이를 읽지 못해 기본값({self.inline_limit}자)으로 나눕니다: {e}")
+        answer = str(answer)
+        preview = self.fit(answer, inline_limit)
+        if len(preview) == len(answer):
+            return answer, []
+        parts = [answer[i:i + self.part_size] for i in range(0, len(answer), self.part_size)]
+        return preview, parts
+
+    def write_parts(self, cursor, history_id, parts):
+        if parts:
+            cursor.executemany(
+                "INSERT INTO chat_answer_parts (history_id, part_no, content) VALUES (%s, %s, %s)",
+                [(history_id, i, part) for i, part in enumerate(parts)]
+            )
+
+    def attach_full_answers(self, rows):
+        ids = [row['id'] for row in rows if row.get('id')]
+        if not ids:
+            return rows
+        placeholders = ", ".join(["%s"] * len(ids))
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT history_id, content FROM chat_answer_parts "
+                f"WHERE history_id IN ({placeholders}) ORDER BY history_id, part_no", ids
+            )
+            parts = cursor.fetchall()
+        if not parts:
+            return rows
+        full = {}
+        for part in parts:
+            full.setdefault(part['history_id'], []).append(part['content'])
+        for row in rows:
+            if row.get('id') in full:
+                row['answer'] = "".join(full[row['id']])
+        return rows
@@ -0,0 +1,157 @@
+# 질문 파일을 GUI 없이 파이프라인(DB 검색 → Gemini 생성 → DB 저장)에 일괄로 넣는 명령줄 도구
+# 사용 예)
+#   python batch_runner.py faq.txt -o results.jsonl --concurrency 8 --rpm 60
+#   cat questions.txt | python batch_runner.py - > results.jsonl
+# 입력은 한 줄에 질문 하나(빈 줄과 '#' 으로 시작하는 줄은 무시) 또는 {"question": ...} JSONL 이다.
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+from resilient_gemini import GeminiUnavailable, ResilientGemini, GEMINI_TIMEOUT
+
+
+class RateLimiter:
+    """분당 요청 수 제한 (토큰 버킷). acquire() 는 토큰이 생길 때까지 기다린다."""
+
+    def __init__(self, per_minute, burst=1):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) / self.interval)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) * self.interval
+            time.sleep(wait)
+
+
+def read_questions(stream):
+    for line in stream:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            try:
+                line = str(json.loads(line).get("question", "")).strip()
+            except ValueError:
+                pass
+        if line:
+            yield line
+
+
+def process_question(pipeline, question, search=True, save=True):
+    """질문 하나를 처리해서 결과 dict 를 돌려준다 (작업자 스레드에서 실행됨 - 요청 수 제한은 pipeline.gemini 가 시도마다 건다)"""
+    started = time.perf_counter()
+    result = {'question': question}
+    try:
+        found = pipeline.search_mysql(question) if search else False
+        if found:
+            _, rows, _ = found
+            result.update(source='db', answer=str(rows[0].get('answer', '')), history_id=rows[0].get('id'))
+        else:
+            answer = pipeline.generate_answer(question)
+            result.update(source='gemini', answer=answer)
+            if save:
+                pipeline.save_to_mysql(question, answer)
+    except GeminiUnavailable as e:
+        # Gemini 장애/제한 시간 초과 - 기준을 낮춘 DB 검색 결과로 대신한다
+        found = pipeline.search_fallback(question)
+        if found:
+            _, rows, _ = found
+            result.update(source='fallback', answer=str(rows[0].get('answer', '')), history_id=rows[0].get('id'),
+                          error=str(e))
+        else:
+            result.update(source='error', error=str(e))
+    except Exception as e:
+        result.update(source='error', error=str(e))
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="질문 파일을 Gemini 파이프라인으로 일괄 처리하고 결과를 JSONL 로 쓴다.")
+    parser.add_argument("input", nargs="?", default="-", help="질문 파일 경로 ('-' 이면 표준 입력)")
+    parser.add_argument("-o", "--output", default="-", help="결과 JSONL 경로 ('-' 이면 표준 출력)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="동시에 처리할 질문 수")
+    parser.add_argument("--rpm", type=float, default=60, help="Gemini 분당 최대 요청 수 (0 이면 제한 없음)")
+    parser.add_argument("--burst", type=int, default=1, help="한꺼번에 보낼 수 있는 요청 수")
+    parser.add_argument("--no-search", action="store_true", help="DB 검색 없이 항상 Gemini 로 생성")
+    parser.add_argument("--no-save", action="store_true", help="생성한 답변을 DB 에 저장하지 않음")
+    parser.add_argument("--drain-timeout", type=float, default=60, help="끝낼 때 저장 스풀을 비우며 기다릴 최대 초")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        print("⚠️ GEMINI_API_KEY 가 설정되지 않았습니다. .env 파일을 확인해주세요.", file=sys.stderr)
+        return 2
+
+    from google import genai
+    from google.genai import types
+    from qa_pipeline import QAPipeline
+
+    out = sys.stdout if args.output == "-" else open(args.output, 'a', encoding='utf-8')
+    src = sys.stdin if args.input == "-" else open(args.input, 'r', encoding='utf-8')
+    write_lock = threading.Lock()
+    counts = {'db': 0, 'gemini': 0, 'fallback': 0, 'error': 0}
+    concurrency = max(1, args.concurrency)
+    pending = 0
+    started = time.perf_counter()
+
+    # 파이프라인의 진행 메시지는 표준 오류로 보내서 결과 JSONL 과 섞이지 않게 한다
+    with contextlib.redirect_stdout(sys.stderr):
+        # 명사 색인/해시 백필 등 준비 작업은 시작 전에 끝내 둔다 (처음 질문부터 색인 검색 사용)
+        client = genai.Client(api_key=api_key, http_options=types.HttpOptions(timeout=int(GEMINI_TIMEOUT * 1000)))
+        # 요청 수 제한은 재시도를 포함한 모든 API 호출에 걸고, 호출 스레드는 작업자 수만큼 둔다
+        limiter = RateLimiter(args.rpm, args.burst)
+        gemini = ResilientGemini(client, max_workers=concurrency, rate_limit=limiter.acquire)
+        # 질문들이 서로 이어지지 않으므로 대화 모드는 쓰지 않는다
+        # 저장은 바로 한다 (write-behind 스풀에 남긴 채 성공으로 끝나지 않도록)
+        pipeline = QAPipeline(client, run_background=lambda fn: fn(), write_behind=False, conversation=False,
+                              gemini=gemini)
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = [executor.submit(process_question, pipeline, q, not args.no_search, not args.no_save)
+                           for q in read_questions(src)]
+                for future in as_completed(futures):
+                    result = future.result()
+                    counts[result['source']] += 1
+                    with write_lock:
+                        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                        out.flush()
+        finally:
+            elapsed = time.perf_counter() - started
+            total = sum(counts.values())
+            print(f"📊 {total}건 처리 ({elapsed:.1f}초, {total / elapsed if elapsed else 0:.2f}건/초) - "
+                  f"DB {counts['db']} / Gemini {counts['gemini']} / DB 대체 {counts['fallback']} / 오류 {counts['error']}")
+            pipeline.print_stats()
+            # 복제본 저장소를 쓰면 저장 스풀을 그대로 쓰므로 끝까지 비우고, 남은 것은 실패로 알린다
+            pending = pipeline.close(drain_timeout=args.drain_timeout)
+            if args.output != "-":
+                out.close()
+            if args.input != "-":
+                src.close()
+    if pending:
+        print(f"⚠️ {pending}건이 아직 DB 에 저장되지 않았습니다 (다음 실행 때 스풀에서 저장).", file=sys.stderr)
+    return 1 if counts['error'] or pending else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,380 @@
+# 검색/생성/저장 파이프라인 벤치마크
+# 원격 MySQL 대신 로컬 SQLite 대역(sqlite_standin), genai.Client 대신 가짜 클라이언트(fake_gemini)를 넣고
+# 합성 한국어 chat_history 행(1k/10k/100k)을 채운 뒤 단계별 p50/p95 지연과 처리량을 잰다.
+# 사용 예)
+#   python benchmark.py                                  # 1000,10000 행 / 간단 토크나이저
+#   python benchmark.py --sizes 1000,10000,100000 --json bench.json
+#   python benchmark.py --tokenizer kkma --sizes 1000     # 실제 Kkma (JVM 필요, 느림)
+# 같은 옵션으로 변경 전/후 결과를 비교해서 성능 회귀를 확인한다.
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import sqlite_standin
+from db_pool import ConnectionPool
+from exact_cache import question_key
+from fake_gemini import FakeGeminiClient
+from noun_cache import NounExtractor
+from noun_index import row_nouns
+from qa_pipeline import QAPipeline
+from ranked_search import SEARCH_PAGE_SIZE
+from write_behind import WriteBehindQueue
+
+# ------------------------------------------------------------
+# 합성 데이터
+# ------------------------------------------------------------
+_SYLLABLES = ("가 나 다 라 마 바 사 아 자 차 카 타 파 하 고 노 도 로 모 보 소 오 조 호 구 누 두 루 무 부 "
+              "수 우 주 후 기 니 디 리 미 비 시 이 지 히 정 성 관 리 계 산 통 신 학 교").split()
+_QUESTION_TEMPLATES = [
+    "{0}에서 {1}를 {2}하는 방법은 무엇인가요?",
+    "{0}의 {1}와 {2}의 차이를 알려 주세요.",
+    "{0} {1}에 대해 {2} 관점에서 설명해 주세요.",
+    "{0}가 {1}에 주는 영향과 {2} 사례는?",
+]
+_PARTICLES = ("에서", "으로", "에게", "와", "과", "의", "를", "을", "는", "은", "이", "가", "에", "로", "도")
+_HANGUL_WORD = re.compile(r"[가-힣A-Za-z0-9]+")
+
+
+def make_vocabulary(rng, size=1500):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.choice((2, 2, 3)))))
+    return sorted(words)
+
+
+def make_question(rng, vocab):
+    # 자주 쓰는 단어와 드문 단어가 섞이도록 앞쪽 단어를 더 자주 고른다 (df 분포를 실제와 비슷하게)
+    picked = [vocab[min(int(rng.paretovariate(1.2)) - 1, len(vocab) - 1)] if rng.random() < 0.5
+              else rng.choice(vocab) for _ in range(3)]
+    return rng.choice(_QUESTION_TEMPLATES).format(*picked)
+
+
+def make_answer(rng, vocab, question, words=40):
+    body = " ".join(rng.choice(vocab) + rng.choice(_PARTICLES) for _ in range(words))
+    return f"{question} 에 대한 답변: {body}."
+
+
+class SimpleTokenizer:
+    """Kkma 대신 쓰는 빠른 명사 추출기: 어절에서 조사를 떼고 2자 이상만 남긴다 (Kkma 와 결과는 다르다)"""
+
+    def nouns(self, text):
+        result = []
+        for word in _HANGUL_WORD.findall(str(text)):
+            for particle in _PARTICLES:
+                if word.endswith(particle) and len(word) > len(particle) + 1:
+                    word = word[:-len(particle)]
+                    break
+            if len(word) > 1:
+                result.append(word)
+        return result
+
+
+def make_extractor(kind):
+    factory = SimpleTokenizer if kind == "simple" else None   # None 이면 NounExtractor 가 Kkma 사용
+    return NounExtractor(cache_file=None, kkma_factory=factory)
+
+
+def seed_database(path, size, extractor, rng, vocab):
+    """chat_history + chat_history_nouns 를 size 행으로 채운다. 저장된 질문 목록을 반환한다."""
+    sqlite_standin.init_db(path)
+    db = sqlite3.connect(path)
+    questions = []
+    base = datetime(2024, 1, 1).timestamp()
+    batch = []
+    for i in range(1, size + 1):
+        q = make_question(rng, vocab)
+        a = make_answer(rng, vocab, q)
+        created = datetime.fromtimestamp(base + i * 60).strftime('%Y-%m-%d %H:%M:%S')
+        batch.append((i, q, a, created, created, question_key(q)))
+        questions.append(q)
+        if len(batch) >= 5000 or i == size:
+            db.executemany("INSERT INTO chat_history (id, question, answer, create_at, created_at, question_hash) "
+                           "VALUES (?, ?, ?, ?, ?, ?)", batch)
+            db.executemany("INSERT OR IGNORE INTO chat_history_nouns (history_id, noun) VALUES (?, ?)",
+                           [(row[0], n) for row in batch for n in row_nouns(extractor, row[1], row[2])])
+            db.commit()
+            batch = []
+    db.close()
+    return questions
+
+
+# ------------------------------------------------------------
+# 측정
+# ------------------------------------------------------------
+class StageTimer:
+    def __init__(self):
+        self.samples = {}   # 단계 이름 -> [초, ...]
+
+    @contextlib.contextmanager
+    def measure(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples.setdefault(stage, []).append(time.perf_counter() - started)
+
+    def add(self, stage, seconds):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def summary(self):
+        result = {}
+        for stage, values in self.samples.items():
+            ordered = sorted(values)
+            total = sum(ordered)
+            result[stage] = {
+                'n': len(ordered),
+                'p50_ms': percentile(ordered, 50) * 1000,
+                'p95_ms': percentile(ordered, 95) * 1000,
+                'ops_per_sec': len(ordered) / total if total else 0.0,
+            }
+        return result
+
+
+class ResultRenderer:
+    """
+    검색 결과를 GUI 와 같은 경로(SearchResultModel → HtmlItemDelegate 배치)로 화면 없이(offscreen) 그린다.
+    - show(question, nouns, rows, has_more): 첫 페이지를 모델에 넣고 모든 항목을 배치한다 (sizeHint)
+    - fetch_more(): 목록 끝까지 스크롤했을 때처럼 fetchMore → 다음 페이지 검색 → append_rows → 새 항목 배치
+    PyQt6 가 없으면 create() 가 None 을 돌려주고 그리기 단계는 건너뛴다.
+    """
+
+    def __init__(self, pipeline):
+        from PyQt6.QtCore import QModelIndex
+        from PyQt6.QtWidgets import QApplication, QStyleOptionViewItem
+        from result_view import SearchResultModel, SearchResultView
+
+        self.app = QApplication.instance() or QApplication(sys.argv[:1])
+        self.pipeline = pipeline
+        self.model = SearchResultModel()
+        self.model.more_requested.connect(self._load_more)
+        self.view = SearchResultView()
+        self.view.setModel(self.model)
+        self.view.resize(800, 600)
+        self.delegate = self.view.itemDelegate()
+        self._root = QModelIndex()
+        self._option = QStyleOptionViewItem()
+
+    @classmethod
+    def create(cls, pipeline):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        try:
+            return cls(pipeline)
+        except ImportError:
+            return None
+
+    def show(self, question, nouns, rows, has_more=False):
+        self.model.reset(question, nouns, rows, has_more)
+        self._layout(0)
+
+    def fetch_more(self):
+        """다음 페이지를 덧붙이고 배치한다. 덧붙인 행 수를 반환한다 (더 없으면 0)."""
+        before = self.model.rowCount()
+        if not self.model.canFetchMore(self._root):
+            return 0
+        self.model.fetchMore(self._root)   # more_requested → _load_more (GUI 에서는 작업자 스레드)
+        self._layout(before)
+        return self.model.rowCount() - before
+
+    def _load_more(self):
+        found = self.pipeline.search_mysql(self.model.question, len(self.model.rows))
+        if not found:
+            self.model.stop_loading()
+            return
+        _, rows, has_more = found
+        self.model.append_rows(rows, has_more)
+
+    def _layout(self, first):
+        for i in range(first, self.model.rowCount()):
+            self.delegate.sizeHint(self._option, self.model.index(i))
+
+    def close(self):
+        self.view.deleteLater()
+
+
+def percentile(ordered, p):
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def search_nouns(pipeline, text):
+    """search_mysql 과 같은 기준으로 검색 명사를 고른다."""
+    nouns = [n for n in pipeline.noun_extractor.nouns(text) if len(n) > 1]
+    return nouns or [text]
+
+
+def run_size(size, args, workdir):
+    rng = random.Random(args.seed)
+    vocab = make_vocabulary(rng)
+    extractor = make_extractor(args.tokenizer)
+    db_path = os.path.join(workdir, f"bench_{size}.sqlite3")
+
+    started = time.perf_counter()
+    stored = seed_database(db_path, size, extractor, rng, vocab)
+    print(f"🌱 {size}행 준비 완료 ({time.perf_counter() - started:.1f}초)", file=sys.stderr)
+
+    # 검색 질문: 절반은 저장된 질문과 같은 것(같은 질문 경로), 절반은 새 질문
+    query_rng = random.Random(args.seed + size)
+    new_questions = [make_question(query_rng, vocab) for _ in range(args.queries)]
+    repeated = [query_rng.choice(stored) for _ in range(args.queries // 2)]
+    # 전체 경로용: 저장 단계에서 넣은 질문과 겹치지 않는 새 질문 + 저장된 질문
+    end_to_end = ([make_question(query_rng, vocab) for _ in range(args.gemini_calls)]
+                  + repeated[:args.gemini_calls])
+
+    pool = ConnectionPool(config={'database': db_path}, connect_fn=sqlite_standin.connect)
+    client = FakeGeminiClient(latency=args.latency, token_delay=args.token_delay)
+    timer = StageTimer()
+    # 파이프라인의 진행 메시지는 측정 결과와 섞이지 않도록 버린다
+    with contextlib.redirect_stdout(io.StringIO()):
+        pipeline = QAPipeline(client, run_background=lambda fn: fn(), write_behind=False,
+                              pool=pool, extractor=extractor)
+        queue = WriteBehindQueue(pipeline._insert_history_batch, pipeline._save_queued_row,
+                                 on_saved=pipeline._after_saved_batch,
+                                 spool_path=os.path.join(workdir, f"spool_{size}.sqlite3"),
+                                 flush_size=10 ** 9, flush_interval=3600)   # flush 는 직접 호출해서 잰다
+        renderer = ResultRenderer.create(pipeline)
+        if renderer is None:
+            print("PyQt6 가 없어 결과 목록 그리기 단계는 건너뜁니다.", file=sys.stderr)
+        try:
+            measure_stages(pipeline, queue, timer, new_questions, repeated, end_to_end, args, size, renderer)
+        finally:
+            if renderer is not None:
+                renderer.close()
+            queue.close()
+            pool.close()
+    return timer.summary()
+
+
+def measure_stages(pipeline, queue, timer, new_questions, repeated, end_to_end, args, size, renderer=None):
+    # 1) 형태소 분석 (처음 보는 문장 / 캐시 적중)
+    for q in new_questions:
+        with timer.measure("tokenize (cold)"):
+            pipeline.noun_extractor.nouns(q)
+    for q in new_questions:
+        with timer.measure("tokenize (cached)"):
+            pipeline.noun_extractor.nouns(q)
+
+    # 2) 검색: 명사 역색인 순위 검색 vs 예전 LIKE 전체 검색 + 3) 행마다 명사 겹침 필터
+    pages = []
+    for q in new_questions:
+        nouns = search_nouns(pipeline, q)
+        with timer.measure("retrieve (ranked)"):
+            rows, _ = pipeline.ranked_search.search(q, nouns, SEARCH_PAGE_SIZE, 0, min_ratio=0.8)
+        pages.append((nouns, rows))
+        if size <= args.like_max:
+            with timer.measure("retrieve (LIKE)"):
+                candidates = pipeline._like_candidates(nouns)
+            with timer.measure("filter (overlap)"):
+                pipeline._filter_by_overlap(candidates, nouns)
+    for q in repeated:
+        with timer.measure("retrieve (exact)"):
+            pipeline.exact_store.lookup(q)
+
+    # 4) 결과 목록 그리기 (GUI 와 같은 모델/델리게이트, offscreen): 첫 페이지 / 다음 페이지(fetchMore)
+    if renderer is not None:
+        for q, (nouns, rows) in zip(new_questions, pages):
+            with timer.measure("render (page)"):
+                renderer.show(q, nouns, rows)
+        for q in new_questions:
+            found = pipeline.search_mysql(q)
+            if not found or not found[2]:
+                continue
+            renderer.show(q, *found)
+            with timer.measure("render (fetch more)"):
+                renderer.fetch_more()
+
+    # 5) Gemini (가짜 클라이언트: 지연/스트리밍 간격은 옵션으로)
+    for q in new_questions[:args.gemini_calls]:
+        started = time.perf_counter()
+        first = None
+        for _ in pipeline.stream_answer(q):
+            if first is None:
+                first = time.perf_counter() - started
+        timer.add("gemini stream (first chunk)", first or 0.0)
+        timer.add("gemini stream (full)", time.perf_counter() - started)
+
+    # 6) 저장: 바로 저장 vs write-behind (스풀 기록 + 묶음 flush)
+    answers = [f"{q} 에 대한 벤치마크 답변입니다." for q in new_questions]
+    for q, a in zip(new_questions, answers):
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with timer.measure("persist (sync)"):
+            pipeline._after_saved(*pipeline._save_row(q, a, now))
+    for q, a in zip(new_questions, answers):
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with timer.measure("persist (enqueue)"):
+            queue.enqueue(q, a, now)
+    started = time.perf_counter()
+    queue.flush()
+    flushed = time.perf_counter() - started
+    for _ in new_questions:
+        timer.add("persist (flush, per row)", flushed / max(len(new_questions), 1))
+
+    # 7) 전체: 검색 → (없으면) 생성 → 저장 → 결과 표시
+    for q in end_to_end:
+        with timer.measure("end-to-end"):
+            found = pipeline.search_mysql(q)
+            if found:
+                if renderer is not None:
+                    renderer.show(q, *found)
+            else:
+                answer = pipeline.generate_answer(q)
+                queue.enqueue(q, answer, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+
+
+def print_table(results, out):
+    out.write(f"{'rows':>8}  {'stage':<28} {'n':>5} {'p50 ms':>10} {'p95 ms':>10} {'ops/s':>10}\n")
+    for size, stages in results.items():
+        for stage, s in stages.items():
+            out.write(f"{size:>8}  {stage:<28} {s['n']:>5} {s['p50_ms']:>10.2f} "
+                      f"{s['p95_ms']:>10.2f} {s['ops_per_sec']:>10.1f}\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="가짜 Gemini + SQLite 대역으로 파이프라인 단계별 성능을 잰다.")
+    parser.add_argument("--sizes", default="1000,10000", help="chat_history 행 수 목록 (쉼표로 구분)")
+    parser.add_argument("--tokenizer", choices=("simple", "kkma"), default="simple",
+                        help="명사 추출기 (kkma 는 JVM 이 필요하고 큰 데이터에서는 매우 느리다)")
+    parser.add_argument("--queries", type=int, default=50, help="단계별 측정 질문 수")
+    parser.add_argument("--gemini-calls", type=int, default=10, help="Gemini/전체 경로 측정 질문 수")
+    parser.add_argument("--latency", type=float, default=0.3, help="가짜 Gemini 응답 지연(초)")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="가짜 스트리밍 조각 간격(초)")
+    parser.add_argument("--like-max", type=int, default=10000, help="이 행 수보다 크면 LIKE 검색 측정을 건너뜀")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="결과를 JSON 으로도 저장할 경로")
+    parser.add_argument("--keep", action="store_true", help="생성한 대역 DB 파일을 지우지 않음")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    workdir = tempfile.mkdtemp(prefix="mygemini_bench_")
+    results = {}
+    try:
+        for size in sizes:
+            results[size] = run_size(size, args, workdir)
+    finally:
+        if args.keep:
+            print(f"📁 대역 DB: {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(results, sys.stdout)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'options': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
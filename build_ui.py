@@ -0,0 +1,39 @@
+# mygemini.ui 를 파이썬 모듈(mygemini_ui.py)로 미리 변환한다.
+# 실행할 때마다 uic.loadUiType 으로 XML 을 해석하지 않도록, .ui 를 고친 뒤에는 한 번 실행해 둔다:
+#   python build_ui.py
+# 생성된 모듈에는 원본 .ui 의 해시(UI_SOURCE_SHA1)가 들어가며,
+# mygemini.py 는 해시가 다르면(변환하지 않고 .ui 만 고친 경우) loadUiType 으로 대신 읽는다.
+import hashlib
+import io
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+UI_FILE = os.path.join(BASE_DIR, "mygemini.ui")
+UI_MODULE = os.path.join(BASE_DIR, "mygemini_ui.py")
+
+
+def ui_source_sha1(path=UI_FILE):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def build(ui_file=UI_FILE, module_file=UI_MODULE):
+    from PyQt6.uic import compileUi
+
+    code = io.StringIO()
+    with open(ui_file, 'r', encoding='utf-8') as src:
+        compileUi(src, code)
+    # 생성 코드 머리말의 절대 경로는 파일 이름만 남긴다 (PC마다 달라지지 않도록)
+    text = code.getvalue().replace(ui_file, os.path.basename(ui_file))
+    tmp_path = module_file + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        out.write(text)
+        out.write(f"\n\nUI_SOURCE_SHA1 = \"{ui_source_sha1(ui_file)}\"\n")
+    os.replace(tmp_path, module_file)
+    return module_file
+
+
+if __name__ == "__main__":
+    print(f"✅ UI 모듈 생성: {build()}")
+    sys.exit(0)
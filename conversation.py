@@ -0,0 +1,315 @@
+# 대화 모드 (CONVERSATION_MODE=1): 이어지는 질문에 앞선 대화 맥락을 붙여서 Gemini 에 보낸다.
+# 대화 전체를 매번 다시 보내지 않도록
+#  - 최근 대화(턴)는 토큰 예산(CONTEXT_TOKEN_BUDGET)에서 앞부분 몫을 뺀 만큼만 그대로 넣고
+#  - 넘치면 오래된 턴을 '보관 턴'으로 옮긴다 (최근 몫의 절반 아래로 내려갈 때까지 - 앞부분이 몇 턴 동안 그대로 유지되도록)
+#  - 시스템 지시문 + 이전 대화 요약 + 보관 턴은 자주 바뀌지 않는 앞부분(prefix)으로 항상 맨 앞에 두고,
+#    CONTEXT_CACHE_MIN_TOKENS 이상이면 SDK 의 컨텍스트 캐시(client.caches)에 올려 재사용한다.
+#    (그보다 짧으면 캐시를 만들 수 없으므로 그대로 보낸다 - 앞부분이 같으면 모델 쪽 암묵적 캐시가 적용된다)
+#  - 앞부분이 CONTEXT_PREFIX_TOKENS 를 넘으면 백그라운드에서 보관 턴을 요약에 합친다.
+# 요청 형식은 dict 로 만들므로 google.genai 없이도 FakeGeminiClient 로 확인할 수 있다.
+import hashlib
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from metrics import span
+
+CONVERSATION_MODE = os.getenv("CONVERSATION_MODE", "0") == "1"
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "4000"))        # 요약 + 최근 턴 + 질문 토큰 상한
+CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "800"))     # 이전 대화 요약 토큰 상한
+CONTEXT_PREFIX_TOKENS = int(os.getenv("CONTEXT_PREFIX_TOKENS", "0"))       # 앞부분 토큰 상한 (0 이면 캐시 최소의 2배)
+# chat_history 는 사용자/프로세스 구분 없이 함께 쓰므로, 다른 사람의 대화가 섞이지 않도록 시작할 때 이어 붙이기는 기본으로 끈다
+CONTEXT_SEED = os.getenv("CONTEXT_SEED", "0") == "1"
+CONTEXT_SESSION_MINUTES = int(os.getenv("CONTEXT_SESSION_MINUTES", "30"))    # 시작할 때 이어 붙일 최근 대화 범위
+CONTEXT_SEED_TURNS = 20                      # 시작할 때 chat_history 에서 읽어 올 최대 턴 수
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("CONTEXT_CACHE_MIN_TOKENS", "1024"))  # 모델의 캐시 최소 토큰 수
+CONTEXT_CACHE_TTL_SEC = int(os.getenv("CONTEXT_CACHE_TTL_SEC", "1800"))
+CHARS_PER_TOKEN = 2.0                        # 토큰 수 어림값 (한국어/영어 섞인 글 기준, 넉넉하게)
+
+SYSTEM_INSTRUCTION = os.getenv(
+    "CONVERSATION_SYSTEM_PROMPT",
+    "당신은 한국어로 답하는 도우미입니다. 앞선 대화 요약과 최근 대화를 참고해서, "
+    "이어지는 질문이 무엇을 가리키는지 파악한 뒤 답하세요.")
+
+
+def estimate_tokens(text):
+    """토큰 수 어림값 (count_tokens API 를 부르지 않는다)"""
+    return math.ceil(len(str(text or "")) / CHARS_PER_TOKEN) if text else 0
+
+
+def _content(role, text):
+    return {'role': role, 'parts': [{'text': text}]}
+
+
+def _parse_time(value):
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d %H:%M:%S')
+    except (TypeError, ValueError):
+        return None
+
+
+class ConversationContext:
+    """
+    - seed(db_pool)          : 최근 CONTEXT_SESSION_MINUTES 분 안의 chat_history 턴으로 대화를 시작한다
+                               (CONTEXT_SEED=1 일 때만 - 이 DB 를 나 혼자 쓸 때)
+    - build(question)        : (contents, config) - generate_content(contents=..., config=...) 에 그대로 넘긴다
+    - remember(question, answer): Gemini 로 답한 턴을 대화에 덧붙인다
+    - reset()                : 대화를 처음부터 다시 시작한다
+    gemini 는 ResilientGemini (요약 생성용), client 는 캐시 생성용 (client.caches).
+    """
+
+    def __init__(self, gemini, run_background, budget=CONTEXT_TOKEN_BUDGET, summary_tokens=CONTEXT_SUMMARY_TOKENS,
+                 system_instruction=SYSTEM_INSTRUCTION, cache_min_tokens=CONTEXT_CACHE_MIN_TOKENS,
+                 cache_ttl=CONTEXT_CACHE_TTL_SEC, prefix_tokens=CONTEXT_PREFIX_TOKENS):
+        self.gemini = gemini
+        self.run_background = run_background
+        self.budget = budget
+        self.summary_tokens = summary_tokens
+        self.system_instruction = system_instruction
+        self.cache_min_tokens = cache_min_tokens
+        self.cache_ttl = cache_ttl
+        # 앞부분 상한은 캐시 최소보다 넉넉해야 보관 턴이 쌓여 캐시를 만들 수 있고, 요약보다 커야 요약 뒤에 다시 쌓인다
+        # (최근 턴 몫이 남도록 예산의 절반을 넘지 않는다)
+        self.prefix_tokens = min(prefix_tokens or max(cache_min_tokens * 2, summary_tokens * 2), budget // 2)
+        self.turns = []                # [(question, answer)] - 오래된 것부터, 요청에 그대로 넣는 최근 턴
+        self.archive = []              # [(question, answer)] - 앞부분(캐시 대상)에 들어간 보관 턴
+        self.summary = ""
+        self._summarizing = False
+        self._cache = None             # {'key', 'name', 'expires'}
+        self._caching = None           # 마지막으로 캐시를 만들어 본 앞부분 key (같은 앞부분으로 다시 만들지 않는다)
+        self._retired = []             # 바로 전 캐시 이름 - 그 캐시로 만든 요청이 아직 진행 중일 수 있다
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'cached_requests': 0, 'summaries': 0, 'archived_turns': 0,
+                      'evicted_turns': 0, 'caches_created': 0}
+
+    # ------------------------------------------------------------
+    # 대화 기록
+    # ------------------------------------------------------------
+    def seed(self, db_pool):
+        """
+        최근 chat_history 행으로 대화를 채운다 (작업자 스레드에서 실행됨)
+        chat_history 에는 누가 저장한 행인지 구분이 없으므로 DB 를 혼자 쓸 때만 사용한다 (CONTEXT_SEED=1).
+        """
+        with db_pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT id, question, answer, created_at FROM chat_history ORDER BY id DESC LIMIT %s",
+                           (CONTEXT_SEED_TURNS,))
+            rows = cursor.fetchall()
+        since = datetime.now() - timedelta(minutes=CONTEXT_SESSION_MINUTES)
+        seeded = []
+        for row in rows:
+            created = _parse_time(row.get('created_at'))
+            if created is None or created < since:
+                break
+            seeded.append((str(row.get('question', '')), str(row.get('answer', ''))))
+        with self._lock:
+            self.turns[:0] = reversed(seeded)
+        if seeded:
+            print(f"💬 최근 대화 {len(seeded)}턴을 이어서 사용합니다.")
+
+    def remember(self, question, answer):
+        with self._lock:
+            self.turns.append((str(question), str(answer)))
+
+    def reset(self):
+        with self._lock:
+            self.turns = []
+            self.archive = []
+            self.summary = ""
+            self._caching = None
+        self._drop_cache()
+
+    # ------------------------------------------------------------
+    # 요청 만들기
+    # ------------------------------------------------------------
+    def build(self, question):
+        """
+        토큰 예산 안에서 [앞부분: 요약 + 보관 턴] + 최근 턴 + 질문 을 만든다.
+        최근 턴이 제 몫(예산 - 앞부분 상한)을 넘으면 오래된 턴을 보관 턴으로 옮기고,
+        앞부분이 상한을 넘으면 보관 턴을 요약에 합친다(백그라운드).
+        """
+        with span("context.build") as info, self._lock:
+            recent_budget = self.budget - self.prefix_tokens - estimate_tokens(question)
+            costs = [estimate_tokens(q) + estimate_tokens(a) for q, a in self.turns]
+            archived = 0
+            if sum(costs) > recent_budget:
+                # 절반 아래로 내려갈 때까지 옮긴다 - 다음 몇 턴은 앞부분(캐시)이 바뀌지 않는다
+                while len(self.turns) - archived > 1 and sum(costs[archived:]) > recent_budget // 2:
+                    archived += 1
+                self.archive.extend(self.turns[:archived])
+                del self.turns[:archived]
+                self.stats['archived_turns'] += archived
+            recent = list(self.turns)
+            if recent and estimate_tokens(recent[-1][0]) + estimate_tokens(recent[-1][1]) > recent_budget:
+                # 직전 턴 하나도 들지 않으면 답변 앞부분만 넣는다
+                q, a = recent[-1]
+                recent[-1] = (q, a[:max(int((recent_budget - estimate_tokens(q)) * CHARS_PER_TOKEN), 0)])
+
+            summary, archive = self.summary, list(self.archive)
+            prefix_cost = self._prefix_cost(summary, archive)
+            summarize = prefix_cost > self.prefix_tokens
+            if summarize:
+                # 요약이 끝날 때까지는 상한 안에 드는 최근 보관 턴만 넣는다 (캐시 없이)
+                while archive and self._prefix_cost(summary, archive) > self.prefix_tokens:
+                    archive.pop(0)
+            key = self._cache_key(summary, archive)
+            info.update(turns=len(recent), archived=len(archive),
+                        tokens=self._prefix_cost(summary, archive)
+                        + sum(estimate_tokens(q) + estimate_tokens(a) for q, a in recent) + estimate_tokens(question))
+
+            contents = []
+            cache_name = self._cache_name(key)
+            if cache_name:
+                config = {'cached_content': cache_name}
+                self.stats['cached_requests'] += 1
+            else:
+                config = {'system_instruction': self.system_instruction}
+                contents.extend(self._prefix_contents(summary, archive))
+            for q, a in recent:
+                contents.append(_content('user', q))
+                contents.append(_content('model', a))
+            contents.append(_content('user', question))
+            self.stats['requests'] += 1
+            expired = self._cache is not None and self._cache['key'] == key
+            refresh = (not cache_name and not summarize and (self._caching != key or expired)
+                       and self._prefix_cost(summary, archive) >= self.cache_min_tokens)
+            if refresh:
+                self._caching = key
+
+        if summarize:
+            self._schedule_summary()
+        elif refresh:
+            self.run_background(lambda: self._refresh_cache(summary, archive))
+        return contents, config
+
+    def _prefix_cost(self, summary, archive):
+        return (estimate_tokens(self.system_instruction) + estimate_tokens(summary)
+                + sum(estimate_tokens(q) + estimate_tokens(a) for q, a in archive))
+
+    @staticmethod
+    def _prefix_contents(summary, archive):
+        contents = []
+        if summary:
+            contents.append(_content('user', f"[이전 대화 요약]\n{summary}"))
+        for q, a in archive:
+            contents.append(_content('user', q))
+            contents.append(_content('model', a))
+        return contents
+
+    # ------------------------------------------------------------
+    # 보관 턴 요약
+    # ------------------------------------------------------------
+    def _schedule_summary(self):
+        with self._lock:
+            if self._summarizing:
+                return
+            self._summarizing = True
+        self.run_background(self._summarize_archive)
+
+    def _summarize_archive(self):
+        """보관 턴을 요약에 합치고 앞부분에서 뺀다 (작업자 스레드에서 실행됨)"""
+        try:
+            with self._lock:
+                old_turns = list(self.archive)
+                summary = self.summary
+            limit = int(self.summary_tokens * CHARS_PER_TOKEN)
+            lines = [f"Q: {q}\nA: {a}" for q, a in old_turns]
+            prompt = (f"아래 '기존 요약'과 '대화'를 합쳐서, 이어지는 질문에 필요한 사실과 맥락만 한국어로 "
+                      f"{limit}자 이내로 요약해 주세요.\n\n[기존 요약]\n{summary or '(없음)'}\n\n[대화]\n"
+                      + "\n\n".join(lines))
+            try:
+                with span("context.summarize", turns=len(old_turns)):
+                    new_summary = self.gemini.generate(prompt).strip()[:limit]
+            except Exception as e:
+                # 요약하지 못해도 예산은 지켜야 하므로 보관 턴은 그대로 버린다
+                print(f"이전 대화 요약 실패 - 오래된 {len(old_turns)}턴을 버립니다: {e}")
+                new_summary = summary
+            with self._lock:
+                # 요약하는 동안 reset() 되었으면 반영하지 않는다
+                if self.archive[:len(old_turns)] == old_turns:
+                    del self.archive[:len(old_turns)]
+                    self.summary = new_summary
+                    self.stats['summaries'] += 1
+                    self.stats['evicted_turns'] += len(old_turns)
+                    summary, archive = self.summary, list(self.archive)
+                    self._caching = self._cache_key(summary, archive)
+                    changed = True
+                else:
+                    changed = False
+            if changed:
+                self._refresh_cache(summary, archive)
+        finally:
+            with self._lock:
+                self._summarizing = False
+
+    # ------------------------------------------------------------
+    # 앞부분(시스템 지시문 + 요약 + 보관 턴) 컨텍스트 캐시
+    # ------------------------------------------------------------
+    def _cache_key(self, summary, archive):
+        text = "\n".join([self.gemini.model, self.system_instruction, summary]
+                         + [f"{q}\n{a}" for q, a in archive])
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def _cache_name(self, key):
+        """지금 앞부분에 맞는 캐시가 준비돼 있으면 그 이름 (없으면 None - 캐시를 기다리지 않는다)"""
+        cache = self._cache
+        if cache and cache['key'] == key and cache['expires'] > time.monotonic():
+            return cache['name']
+        return None
+
+    def _refresh_cache(self, summary, archive):
+        """앞부분이 바뀌었을 때 새 캐시를 만들고 이전 캐시를 지운다 (작업자 스레드에서 실행됨)"""
+        if self._prefix_cost(summary, archive) < self.cache_min_tokens:
+            self._retire_cache()
+            return
+        client = self.gemini.client
+        if client is None or not hasattr(client, 'caches'):
+            return
+        try:
+            with span("context.cache_create", turns=len(archive)):
+                cached = client.caches.create(model=self.gemini.model, config={
+                    'system_instruction': self.system_instruction,
+                    'contents': self._prefix_contents(summary, archive),
+                    'display_name': 'mygemini-conversation',
+                    'ttl': f"{self.cache_ttl}s",
+                })
+        except Exception as e:
+            print(f"컨텍스트 캐시 생성 실패 - 앞부분을 그대로 보냅니다: {e}")
+            return
+        self._retire_cache()
+        with self._lock:
+            # 만료 직전에 쓰지 않도록 TTL 보다 조금 일찍 버린다
+            self._cache = {'key': self._cache_key(summary, archive), 'name': cached.name,
+                           'expires': time.monotonic() + self.cache_ttl * 0.9}
+            self.stats['caches_created'] += 1
+
+    def _retire_cache(self):
+        """지금 캐시를 더 쓰지 않는다. 한 세대 전 캐시는 지우고, 지금 캐시는 다음 교체 때 지운다."""
+        with self._lock:
+            old, self._retired = self._retired, []
+            if self._cache is not None:
+                self._retired.append(self._cache['name'])
+                self._cache = None
+        self._delete_caches(old)
+
+    def _drop_cache(self):
+        with self._lock:
+            names = self._retired + ([self._cache['name']] if self._cache else [])
+            self._retired, self._cache = [], None
+        self._delete_caches(names)
+
+    def _delete_caches(self, names):
+        client = self.gemini.client
+        if not names or client is None:
+            return
+        for name in names:
+            try:
+                client.caches.delete(name=name)
+            except Exception as e:
+                print(f"이전 컨텍스트 캐시 삭제 실패 (TTL 이 지나면 사라집니다): {e}")
+
+    def close(self):
+        self._drop_cache()
@@ -0,0 +1,237 @@
+# MySQL 접속 설정과 공용 커넥션 풀
+# mygemini.py 와 addBookMySQL.py 가 같은 설정/같은 풀을 사용한다.
+# 질문마다 원격 DB(3307)에 새로 TCP 연결 + 인증을 하지 않도록 연결을 재사용한다.
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pymysql
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ------------------------------------------------------------
+# 접속 설정 (한 곳에서만 관리) - .env 의 MYSQL_* 값이 있으면 그것을 사용
+# ------------------------------------------------------------
+DB_CONFIG = {
+    'host': os.getenv("MYSQL_HOST", 'bitnmeta2.synology.me'),
+    'user': os.getenv("MYSQL_USER", 'iyrc'),
+    'passwd': os.getenv("MYSQL_PASSWORD", 'Dodan1004!'),
+    'db': os.getenv("MYSQL_DB", 'gemini_ai'),
+    'charset': os.getenv("MYSQL_CHARSET", 'utf8'),
+    'port': int(os.getenv("MYSQL_PORT", "3307")),
+    'cursorclass': pymysql.cursors.DictCursor,
+}
+
+POOL_MAX_SIZE = int(os.getenv("MYSQL_POOL_MAX", "4"))              # 동시에 열 수 있는 최대 연결 수
+POOL_IDLE_TIMEOUT = float(os.getenv("MYSQL_POOL_IDLE_SEC", "300"))  # 이 시간 이상 쉬던 연결은 닫는다
+POOL_PING_AFTER = float(os.getenv("MYSQL_POOL_PING_SEC", "30"))     # 이 시간 이상 쉬던 연결은 꺼낼 때 ping
+POOL_CHECKOUT_TIMEOUT = float(os.getenv("MYSQL_POOL_WAIT_SEC", "10"))  # 빈 연결을 기다리는 최대 시간
+
+SERVER_STATUS_IN_TRANS = 1   # pymysql.constants.SERVER_STATUS - 서버가 알려 주는 "트랜잭션 진행 중" 비트
+
+
+class PoolTimeout(Exception):
+    """풀의 모든 연결이 사용 중이고 제한 시간 안에 반납되지 않았을 때"""
+
+
+class PoolClosed(RuntimeError):
+    """프로그램 종료 등으로 풀이 이미 닫혔을 때 - 접속 문제와 같이 나중에 다시 시도할 수 있다"""
+
+
+class ConnectionPool:
+    """
+    pymysql 연결을 재사용하는 간단한 스레드 안전 풀.
+    - max_size   : 동시에 열 수 있는 최대 연결 수 (넘으면 반납될 때까지 기다린다)
+    - idle_timeout: 오래 쉬던 연결은 꺼낼 때/반납할 때 닫는다 (idle eviction)
+    - ping_after : 일정 시간 이상 쉬던 연결은 꺼낼 때 ping으로 확인하고 끊겼으면 다시 연결한다
+    사용법:
+        with pool.connection() as conn:
+            with conn.cursor() as cursor: ...
+    블록 안에서 예외가 나면 연결을 닫아 버리고, 정상 종료면 풀에 돌려준다.
+    돌려줄 때 커밋/롤백하지 않은 트랜잭션이 남아 있을 때만(서버 상태의 IN_TRANS 비트) 롤백한다.
+    """
+
+    def __init__(self, config=None, max_size=POOL_MAX_SIZE, idle_timeout=POOL_IDLE_TIMEOUT,
+                 ping_after=POOL_PING_AFTER, checkout_timeout=POOL_CHECKOUT_TIMEOUT, connect_fn=None):
+        self.config = dict(config or DB_CONFIG)
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+        self.checkout_timeout = checkout_timeout
+        self._connect_fn = connect_fn or pymysql.connect
+        self._idle = []                       # [(conn, 반납 시각)] - 마지막이 가장 최근
+        self._lock = threading.Lock()
+        self._available = threading.Semaphore(max_size)
+        self._closed = False
+        # 통계
+        self._stats = {
+            'checkouts': 0,        # 연결을 꺼낸 횟수
+            'reused': 0,           # 기존 연결을 재사용한 횟수
+            'created': 0,          # 새로 연결한 횟수
+            'reconnects': 0,       # ping 실패로 다시 연결한 횟수
+            'evicted': 0,          # 오래 쉬어서 닫은 연결 수
+            'discarded': 0,        # 오류로 버린 연결 수
+            'rollbacks': 0,        # 반납할 때 열린 트랜잭션을 롤백한 횟수
+            'wait_total': 0.0,     # 연결을 기다린 총 시간(초)
+            'wait_max': 0.0,       # 가장 오래 기다린 시간(초)
+        }
+
+    # ------------------------------------------------------------
+    # 꺼내기 / 돌려주기
+    # ------------------------------------------------------------
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, broken=True)
+            raise
+        else:
+            self.release(conn)
+
+    def acquire(self):
+        if self._closed:
+            raise PoolClosed("커넥션 풀이 이미 닫혔습니다.")
+        started = time.monotonic()
+        if not self._available.acquire(timeout=self.checkout_timeout):
+            raise PoolTimeout(f"DB 연결을 {self.checkout_timeout}초 안에 얻지 못했습니다.")
+        waited = time.monotonic() - started
+
+        try:
+            conn = self._take_idle()
+            with self._lock:
+                self._stats['checkouts'] += 1
+                self._stats['wait_total'] += waited
+                self._stats['wait_max'] = max(self._stats['wait_max'], waited)
+                if conn is not None:
+                    self._stats['reused'] += 1
+            if conn is None:
+                conn = self._new_connection()
+            return conn
+        except Exception:
+            self._available.release()
+            raise
+
+    def release(self, conn, broken=False):
+        try:
+            if broken or self._closed:
+                self._close_quietly(conn)
+                if broken:
+                    with self._lock:
+                        self._stats['discarded'] += 1
+                return
+            if self._in_transaction(conn):
+                try:
+                    conn.rollback()   # 커밋하지 않은 트랜잭션이 다음 사용자에게 넘어가지 않도록
+                except Exception:
+                    self._close_quietly(conn)
+                    with self._lock:
+                        self._stats['discarded'] += 1
+                    return
+                with self._lock:
+                    self._stats['rollbacks'] += 1
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+            self._evict_idle()
+        finally:
+            self._available.release()
+
+    def warm_up(self, count=1):
+        """연결을 미리 count 개 열어서 풀에 넣어 둔다 (첫 질문이 TCP 연결 + 인증을 기다리지 않도록)"""
+        conns = []
+        try:
+            for _ in range(min(count, self.max_size)):
+                conns.append(self.acquire())
+        finally:
+            for conn in conns:
+                self.release(conn)
+        return len(conns)
+
+    def _take_idle(self):
+        """쉬고 있는 연결 중 가장 최근 것을 꺼낸다. 오래된 것은 닫고, 필요하면 ping으로 확인한다."""
+        self._evict_idle()
+        with self._lock:
+            if not self._idle:
+                return None
+            conn, since = self._idle.pop()
+        if time.monotonic() - since >= self.ping_after:
+            try:
+                conn.ping(reconnect=True)
+            except Exception:
+                self._close_quietly(conn)
+                with self._lock:
+                    self._stats['reconnects'] += 1
+                return None   # acquire()에서 새로 연결한다
+        return conn
+
+    def _new_connection(self):
+        conn = self._connect_fn(**self.config)
+        with self._lock:
+            self._stats['created'] += 1
+        return conn
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            keep = []
+            for conn, since in self._idle:
+                if now - since >= self.idle_timeout:
+                    expired.append(conn)
+                else:
+                    keep.append((conn, since))
+            self._idle = keep
+            self._stats['evicted'] += len(expired)
+        for conn in expired:
+            self._close_quietly(conn)
+
+    @staticmethod
+    def _in_transaction(conn):
+        """커밋/롤백하지 않은 트랜잭션이 열려 있는지 (서버 상태를 알 수 없으면 열려 있다고 본다)"""
+        status = getattr(conn, 'server_status', None)
+        if status is None:
+            return True
+        return bool(status & SERVER_STATUS_IN_TRANS)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    # ------------------------------------------------------------
+    # 통계 / 종료
+    # ------------------------------------------------------------
+    def stats(self):
+        """풀 사용 통계(dict). reuse_rate = 재사용 / 꺼낸 횟수, wait_avg = 평균 대기 시간(초)"""
+        with self._lock:
+            s = dict(self._stats)
+            s['idle'] = len(self._idle)
+        s['max_size'] = self.max_size
+        s['reuse_rate'] = (s['reused'] / s['checkouts']) if s['checkouts'] else 0.0
+        s['wait_avg'] = (s['wait_total'] / s['checkouts']) if s['checkouts'] else 0.0
+        return s
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """프로세스 공용 풀 (처음 호출할 때 만든다)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+        return _pool
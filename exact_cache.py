@@ -0,0 +1,136 @@
+# 완전히 같은 질문(정규화 기준)에 대한 빠른 응답 경로
+# 공백/문장부호/대소문자를 정리한 질문의 해시를 chat_history.question_hash(인덱스)에 저장해 두고,
+# 형태소 분석이나 LIKE 검색 전에 프로세스 내 LRU → 인덱스 조회 순서로 먼저 찾아본다.
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+EXACT_LRU_SIZE = int(os.getenv("EXACT_LRU_SIZE", "2048"))   # 메모리에 둘 최근 질문 수
+BACKFILL_BATCH = 1000
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_question(text):
+    """비교용 정규화: 유니코드 NFKC, 대소문자 무시, 공백/문장부호 제거"""
+    text = unicodedata.normalize("NFKC", str(text)).casefold()
+    return _NON_WORD.sub("", text)
+
+
+def question_key(text):
+    return hashlib.sha1(normalize_question(text).encode('utf-8')).hexdigest()
+
+
+class QuestionLRU:
+    """question_key -> chat_history 행(dict) 의 크기 제한 LRU (스레드 안전)"""
+
+    def __init__(self, max_size=EXACT_LRU_SIZE):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            row = self._items.get(key)
+            if row is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return row
+
+    def put(self, key, row):
+        with self._lock:
+            self._items[key] = row
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._items),
+                    'hit_rate': (self.hits / total) if total else 0.0}
+
+
+class ExactMatchStore:
+    """
+    chat_history.question_hash 컬럼 관리 + 조회.
+    ensure_schema() 가 끝나 ready 가 True 가 되면 save_to_mysql 이 해시를 함께 저장한다.
+    """
+
+    def __init__(self, pool, lru=None):
+        self.pool = pool
+        self.lru = lru or QuestionLRU()
+        self.ready = False
+        self.db_hits = 0
+
+    def ensure_schema(self):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT COUNT(*) AS cnt FROM information_schema.COLUMNS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'chat_history' "
+                    "AND COLUMN_NAME = 'question_hash'"
+                )
+                if not cursor.fetchone()['cnt']:
+                    print("🔑 chat_history 에 question_hash 컬럼/인덱스를 추가하는 중...")
+                    cursor.execute(
+                        "ALTER TABLE chat_history ADD COLUMN question_hash CHAR(40) NULL, "
+                        "ADD INDEX idx_question_hash (question_hash)"
+                    )
+            conn.commit()
+        self.ready = True
+
+    def backfill(self, batch_size=BACKFILL_BATCH):
+        """question_hash 가 비어 있는 기존 행을 채운다. 처리한 행 수를 반환한다."""
+        done = 0
+        last_id = 0
+        while True:
+            with self.pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT id, question FROM chat_history "
+                        "WHERE id > %s AND question_hash IS NULL ORDER BY id LIMIT %s",
+                        (last_id, batch_size)
+                    )
+                    rows = cursor.fetchall()
+                    if rows:
+                        cursor.executemany(
+                            "UPDATE chat_history SET question_hash = %s WHERE id = %s",
+                            [(question_key(r['question'] or ''), r['id']) for r in rows]
+                        )
+                conn.commit()
+            if not rows:
+                return done
+            done += len(rows)
+            last_id = rows[-1]['id']
+
+    def lookup(self, question):
+        """같은 질문으로 저장된 가장 최근 행. LRU → DB 인덱스 순서로 찾고, 없으면 None."""
+        if not normalize_question(question):
+            return None   # 문장부호만 있는 질문은 모두 같은 키가 되므로 제외
+        key = question_key(question)
+        row = self.lru.get(key)
+        if row is not None or not self.ready:
+            return row
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT id, question, answer, created_at FROM chat_history "
+                "WHERE question_hash = %s ORDER BY id DESC LIMIT 1", (key,)
+            )
+            row = cursor.fetchone()
+        if row:
+            self.db_hits += 1
+            self.lru.put(key, row)
+        return row
+
+    def remember(self, history_id, question, answer, created_at):
+        """방금 저장한 질문/답변을 LRU 에 넣는다."""
+        self.lru.put(question_key(question), {'id': history_id, 'question': question,
+                                              'answer': answer, 'created_at': created_at})
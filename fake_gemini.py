@@ -0,0 +1,136 @@
+# genai.Client 대신 쓰는 가짜 Gemini 클라이언트 (벤치마크/오프라인 확인용)
+# client.models.generate_content / generate_content_stream / embed_content 와
+# client.caches.create / delete (컨텍스트 캐시)만 흉내 낸다.
+# 같은 질문에는 항상 같은 답을 돌려주고(결정적), 응답 지연과 토큰 간격은 설정할 수 있다.
+import hashlib
+import threading
+import time
+
+_WORDS = ["데이터베이스", "검색", "질문", "답변", "형태소", "분석", "저장", "캐시", "색인", "연결",
+          "속도", "결과", "사용자", "화면", "서버", "요청", "응답", "처리", "시간", "방법"]
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeCachedContent:
+    def __init__(self, name, model, config):
+        self.name = name
+        self.model = model
+        self.config = config
+
+
+class FakeCaches:
+    """client.caches - 만든 캐시를 기억해 두고, 없는 캐시를 쓰면 404 를 낸다."""
+
+    def __init__(self):
+        self.created = []             # 만든 순서대로 FakeCachedContent
+        self.live = {}                # name -> FakeCachedContent
+        self._lock = threading.Lock()
+
+    def create(self, model, config=None):
+        with self._lock:
+            cached = FakeCachedContent(f"cachedContents/fake-{len(self.created) + 1}", model, config)
+            self.created.append(cached)
+            self.live[cached.name] = cached
+        return cached
+
+    def delete(self, name, config=None):
+        with self._lock:
+            if self.live.pop(name, None) is None:
+                raise FakeAPIError(f"없는 캐시입니다: {name}", code=404)
+
+    def check(self, config):
+        name = config.get('cached_content') if isinstance(config, dict) else getattr(config, 'cached_content', None)
+        if name and name not in self.live:
+            raise FakeAPIError(f"없는 캐시입니다: {name}", code=404)
+
+
+class FakeEmbedding:
+    def __init__(self, values):
+        self.values = values
+
+
+class FakeEmbedResponse:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+
+class FakeAPIError(RuntimeError):
+    """google.genai.errors.APIError 처럼 HTTP 상태 코드(code)를 가진 예외 (503: 일시적 장애)"""
+
+    def __init__(self, message, code=503):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+def fake_answer(contents, words=60):
+    """contents 로 정해지는 가짜 한국어 답변 (words 개 단어)"""
+    seed = hashlib.sha1(str(contents).encode('utf-8')).digest()
+    picked = [_WORDS[seed[i % len(seed)] % len(_WORDS)] for i in range(words)]
+    return f"'{str(contents)[:40]}' 에 대한 답변입니다. " + " ".join(picked) + "."
+
+
+class FakeModels:
+    """
+    - latency     : 응답 전체(또는 첫 조각)까지 걸리는 시간(초)
+    - token_delay : 스트리밍에서 조각 사이 간격(초)
+    - answer_words: 답변 단어 수
+    - fail_every  : N 번째 호출마다 503 예외 (0 이면 실패 없음)
+    """
+
+    def __init__(self, latency=0.5, token_delay=0.02, answer_words=60, chunk_words=4, fail_every=0, caches=None):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.answer_words = answer_words
+        self.chunk_words = chunk_words
+        self.fail_every = fail_every
+        self.calls = 0
+        self.requests = []            # [(종류, model, contents)] - 보낸 요청 기록
+        self.configs = []             # 요청마다 넘긴 config (requests 와 같은 순서)
+        self.caches = caches
+        self._lock = threading.Lock()
+
+    def _record(self, kind, model, contents, config=None):
+        with self._lock:
+            self.calls += 1
+            self.requests.append((kind, model, contents))
+            self.configs.append(config)
+            failed = self.fail_every and self.calls % self.fail_every == 0
+        if failed:
+            raise FakeAPIError("fake Gemini: 설정된 실패 (fail_every)")
+        if config is not None and self.caches is not None:
+            self.caches.check(config)
+
+    def generate_content(self, model, contents, config=None):
+        self._record('generate', model, contents, config)
+        time.sleep(self.latency)
+        return FakeResponse(fake_answer(contents, self.answer_words))
+
+    def generate_content_stream(self, model, contents, config=None):
+        self._record('stream', model, contents, config)
+        words = fake_answer(contents, self.answer_words).split(" ")
+        time.sleep(self.latency)
+        for i in range(0, len(words), self.chunk_words):
+            if i:
+                time.sleep(self.token_delay)
+            yield FakeResponse(" ".join(words[i:i + self.chunk_words]) + " ")
+
+    def embed_content(self, model, contents, config=None):
+        self._record('embed', model, contents)
+        dim = getattr(config, 'output_dimensionality', None) or 768
+        embeddings = []
+        for text in contents:
+            seed = hashlib.sha1(str(text).encode('utf-8')).digest()
+            embeddings.append(FakeEmbedding([(seed[i % len(seed)] - 128) / 128.0 for i in range(dim)]))
+        return FakeEmbedResponse(embeddings)
+
+
+class FakeGeminiClient:
+    """genai.Client(api_key=...) 자리에 넣어 쓴다: FakeGeminiClient(latency=0.2).models.generate_content(...)"""
+
+    def __init__(self, **options):
+        self.caches = FakeCaches()
+        self.models = FakeModels(caches=self.caches, **options)
@@ -0,0 +1,176 @@
+# 질문 처리 파이프라인(DB 검색 → Gemini 생성 → DB 저장)을
+# GUI 스레드 밖(QThreadPool)에서 실행하는 작업자 모듈
+import threading
+
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+from metrics import get_metrics
+from resilient_gemini import GeminiUnavailable
+
+
+class WorkerSignals(QObject):
+    """
+    작업자 스레드 → GUI 스레드로 결과를 전달하는 시그널 모음.
+    모든 시그널의 첫 인자는 요청 번호(request_id)이며,
+    GUI 쪽에서는 현재 활성 요청의 결과만 반영한다.
+    """
+    db_result = pyqtSignal(int, str, object)   # (request_id, 질문, search_mysql 결과)
+    answer = pyqtSignal(int, str, str)         # (request_id, 질문, Gemini 응답)
+    stream_started = pyqtSignal(int, str)      # (request_id, 질문) - 스트리밍 시작
+    chunk = pyqtSignal(int, str)               # (request_id, 응답 조각)
+    stream_done = pyqtSignal(int, str, str)    # (request_id, 질문, 전체 응답)
+    notice = pyqtSignal(int, str)              # (request_id, 안내 HTML)
+    page = pyqtSignal(int, object)             # (request_id, search_mysql 다음 페이지 결과)
+    error = pyqtSignal(int, str, str)          # (request_id, 질문, 오류 메시지)
+    finished = pyqtSignal(int)                 # (request_id)
+
+
+class GeminiTask(QRunnable):
+    """
+    질문 하나를 처리하는 작업 단위.
+    - search_fn(question)  : DB 검색 결과(없으면 None/False)
+    - generate_fn(question): Gemini 응답 텍스트
+    - save_fn(question, answer): 저장 후 사용자에게 보여줄 안내 HTML(없으면 None)
+    - stream_fn(question)  : (선택) 응답 조각을 차례로 돌려주는 이터레이터.
+                             주어지면 generate_fn 대신 스트리밍으로 응답을 받는다.
+    - fallback_fn(question): (선택) Gemini 를 쓸 수 없을 때(GeminiUnavailable) 대신 보여줄 DB 검색 결과
+    새 질문이 들어오면 cancel()로 취소되며, 각 단계 사이에서 취소 여부를 확인한다.
+    (이미 진행 중인 네트워크 호출 자체는 중단할 수 없으므로 결과만 버린다.)
+    """
+
+    def __init__(self, request_id, question, search_fn, generate_fn, save_fn, stream_fn=None, fallback_fn=None):
+        super().__init__()
+        self.request_id = request_id
+        self.question = question
+        self.search_fn = search_fn
+        self.generate_fn = generate_fn
+        self.save_fn = save_fn
+        self.stream_fn = stream_fn
+        self.fallback_fn = fallback_fn
+        self.signals = WorkerSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def run(self):
+        rid = self.request_id
+        metrics = get_metrics()
+        try:
+            # 요청 번호를 붙여서 단계별 시간을 기록한다 (전체 소요 시간은 'request')
+            with metrics.request(rid), metrics.span("request") as info:
+                info['source'] = self._process(rid, self.question)
+        finally:
+            self.signals.finished.emit(rid)
+
+    def _process(self, rid, question):
+        """검색 → 생성 → 저장. 답을 어디서 얻었는지('db', 'gemini', 'fallback', 'cancelled', 'error')를 반환한다."""
+        try:
+            # 1) 먼저 DB에서 검색 시도
+            found = self.search_fn(question)
+            if self.is_cancelled():
+                return 'cancelled'
+            if found:
+                self.signals.db_result.emit(rid, question, found)
+                return 'db'  # 검색 결과가 있으면 Gemini 호출 생략
+
+            # 2) Gemini 호출
+            if self.stream_fn is not None:
+                answer = self._run_stream(rid, question)
+                if answer is None:
+                    return 'cancelled'  # 새 질문으로 대체됨 → 저장하지 않음
+            else:
+                answer = self.generate_fn(question)
+                if self.is_cancelled():
+                    return 'cancelled'  # 새 질문으로 대체됨 → 표시/저장하지 않음
+                self.signals.answer.emit(rid, question, answer)
+
+            # 3) (답변 표시 후) DB 저장 - 스트리밍은 전체 응답을 받은 뒤에만 저장
+            notice = self.save_fn(question, answer)
+            if notice and not self.is_cancelled():
+                self.signals.notice.emit(rid, notice)
+            return 'gemini'
+
+        except GeminiUnavailable as e:
+            # Gemini 장애/제한 시간 초과 - 기준을 낮춘 DB 검색 결과로 대신한다
+            if self.is_cancelled():
+                return 'cancelled'
+            return self._fall_back(rid, question, e)
+
+        except Exception as e:
+            if not self.is_cancelled():
+                self.signals.error.emit(rid, question, f"API 호출 중 오류 발생: {e}")
+            return 'error'
+
+    def _fall_back(self, rid, question, reason):
+        found = False
+        if self.fallback_fn is not None:
+            try:
+                found = self.fallback_fn(question)
+            except Exception as e:
+                print(f"DB 대체 검색 중 오류: {e}")
+        if self.is_cancelled():
+            return 'cancelled'
+        if found:
+            self.signals.db_result.emit(rid, question, found)
+            return 'fallback'
+        self.signals.error.emit(rid, question, f"지금은 Gemini 를 사용할 수 없고, 비슷한 저장 답변도 없습니다. ({reason})")
+        return 'error'
+
+    def _run_stream(self, rid, question):
+        """응답 조각을 받는 대로 chunk 시그널로 보내고, 전체 응답을 반환한다. 취소되면 None."""
+        parts = []
+        started = False
+        for piece in self.stream_fn(question):
+            if self.is_cancelled():
+                return None
+            if piece:
+                if not started:
+                    # 첫 조각이 온 뒤에 시작을 알린다 (그 전에 GeminiUnavailable 이면 DB 답변으로 대신할 수 있도록)
+                    self.signals.stream_started.emit(rid, question)
+                    started = True
+                parts.append(piece)
+                self.signals.chunk.emit(rid, piece)
+        if not started:
+            self.signals.stream_started.emit(rid, question)
+        answer = "".join(parts)
+        self.signals.stream_done.emit(rid, question, answer)
+        return answer
+
+
+class SearchPageTask(QRunnable):
+    """
+    이미 보여준 DB 검색 결과의 다음 페이지를 가져오는 작업 단위.
+    - search_fn(question, offset): search_mysql 과 같은 형식의 결과(없으면 False)
+    결과는 page 시그널로, 오류는 error 시그널로 보낸다.
+    """
+
+    def __init__(self, request_id, question, offset, search_fn):
+        super().__init__()
+        self.request_id = request_id
+        self.question = question
+        self.offset = offset
+        self.search_fn = search_fn
+        self.signals = WorkerSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def run(self):
+        rid = self.request_id
+        try:
+            found = self.search_fn(self.question, self.offset)
+            if not self.is_cancelled():
+                self.signals.page.emit(rid, found)
+        except Exception as e:
+            if not self.is_cancelled():
+                self.signals.error.emit(rid, self.question, f"DB 검색 중 오류 발생: {e}")
+        finally:
+            self.signals.finished.emit(rid)
@@ -0,0 +1,397 @@
+# chat_history 로컬 읽기 복제본 (STORAGE_BACKEND=replica)
+# 질문마다 원격 MySQL(3307)까지 검색하러 가지 않도록, 같은 테이블 구성의 SQLite 파일에
+# chat_history / chat_history_nouns / chat_answer_parts 를 복제해 두고 검색은 로컬에서 한다.
+#  - 동기화: 원격의 id 워터마크 이후 행만 묶음으로 가져온다 (처음에는 전체, 이후에는 새 행만)
+#            id 순서와 다르게 늦게 커밋된 행은 created_at 이 최근 REPLICA_SYNC_OVERLAP_SEC 안인 행을 다시 읽어 채우고,
+#            원격의 UPDATE(요약 미리보기 등)/DELETE 는 REPLICA_RECONCILE_SEC 마다 행별 MD5(질문+답변) 을 비교해 맞춘다.
+#  - 쓰기  : 원격으로 그대로 보낸다 (write-behind 큐). 저장된 행은 바로 로컬에도 반영하고,
+#            아직 원격에 들어가지 않은 답변은 '대기' 행(음수 id)으로 먼저 넣어 오프라인에서도 보이게 한다.
+#  - 검색  : 파이프라인의 ExactMatchStore / RankedSearch / AnswerStore 를 로컬 풀에 그대로 붙여 쓰고,
+#            순위는 FTS5 bm25() 점수로 매긴다 (원격의 FULLTEXT 대신).
+# 원격에 접속할 수 없으면 동기화만 미루고, 이미 복제된 데이터로 계속 검색한다.
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import sqlite_standin
+from db_pool import ConnectionPool
+from exact_cache import ExactMatchStore, question_key
+from noun_index import NounIndex
+from ranked_search import RankedSearch
+from answer_store import AnswerStore
+from metrics import span
+
+REPLICA_PATH = os.getenv(
+    "REPLICA_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "chat_replica.sqlite3"))
+REPLICA_SYNC_SEC = float(os.getenv("REPLICA_SYNC_SEC", "60"))      # 원격에서 새 행을 가져오는 간격(초)
+REPLICA_SYNC_BATCH = 1000                                           # 한 번에 가져올 행 수
+REPLICA_SYNC_OVERLAP_SEC = float(os.getenv("REPLICA_SYNC_OVERLAP_SEC", "600"))   # 늦게 커밋된 행을 다시 찾는 범위(초)
+REPLICA_RECONCILE_SEC = float(os.getenv("REPLICA_RECONCILE_SEC", "1800"))        # 원격 수정/삭제를 맞춰 보는 간격(초)
+REPLICA_RECONCILE_BATCH = 5000                                      # 맞춰 볼 때 한 번에 비교할 행 수 (id, MD5 만 읽는다)
+# 행 비교용 MD5 - 질문과 답변을 구분 문자(파라미터로 넘기는 '\0')로 이어 붙인다 (원격 MySQL / 로컬 SQLite 에서 같은 값)
+_ROW_DIGEST = "MD5(CONCAT(COALESCE(question, ''), %s, COALESCE(answer, ''))) AS digest"
+_DIGEST_SEP = "\0"
+
+REPLICA_SCHEMA = [
+    # chat_history 본문을 색인하는 FTS5 (외부 content 테이블 + 트리거로 함께 갱신)
+    "CREATE VIRTUAL TABLE IF NOT EXISTS chat_history_fts USING fts5("
+    " question, answer, content='chat_history', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS chat_history_fts_ai AFTER INSERT ON chat_history BEGIN"
+    " INSERT INTO chat_history_fts (rowid, question, answer) VALUES (new.id, new.question, new.answer); END",
+    "CREATE TRIGGER IF NOT EXISTS chat_history_fts_ad AFTER DELETE ON chat_history BEGIN"
+    " INSERT INTO chat_history_fts (chat_history_fts, rowid, question, answer)"
+    " VALUES ('delete', old.id, old.question, old.answer); END",
+    "CREATE TRIGGER IF NOT EXISTS chat_history_fts_au AFTER UPDATE ON chat_history BEGIN"
+    " INSERT INTO chat_history_fts (chat_history_fts, rowid, question, answer)"
+    " VALUES ('delete', old.id, old.question, old.answer);"
+    " INSERT INTO chat_history_fts (rowid, question, answer) VALUES (new.id, new.question, new.answer); END",
+    # 동기화 워터마크 (한 행만 쓴다)
+    "CREATE TABLE IF NOT EXISTS replica_state ("
+    " id INTEGER PRIMARY KEY CHECK (id = 1), last_id INTEGER NOT NULL DEFAULT 0,"
+    " last_created_at TEXT, synced_at TEXT)",
+    "INSERT OR IGNORE INTO replica_state (id, last_id) VALUES (1, 0)",
+]
+
+
+def init_replica(path=REPLICA_PATH):
+    """복제본 파일에 원격과 같은 테이블 + FTS5 색인 + 워터마크 테이블을 만든다."""
+    sqlite_standin.init_db(path)
+    db = sqlite3.connect(path)
+    for sql in REPLICA_SCHEMA:
+        db.execute(sql)
+    db.commit()
+    db.close()
+
+
+class LocalReplica:
+    """
+    - start()   : 첫 동기화 후 REPLICA_SYNC_SEC 마다 동기화하는 스레드를 띄운다 (작업자 스레드에서 실행됨)
+    - sync()    : 원격에서 워터마크 이후 행과 늦게 커밋된 행을 가져오고, 때가 되면 수정/삭제를 맞춘다.
+                  새로 들어온 행 수를 반환한다.
+    - add_pending(question, answer, created_at): 원격 저장 전의 답변을 로컬에 먼저 넣는다
+    - apply_saved(history_id, question, answer, created_at): 원격에 저장된 행을 바로 반영한다
+    검색은 exact_store / ranked_search / answer_store / noun_index 속성을 파이프라인과 같은 방식으로 쓴다.
+    한 번이라도 동기화된 복제본이어야 ready 가 True 가 된다 (빈 복제본으로 검색하지 않도록).
+    """
+
+    def __init__(self, remote_pool, extractor, lru=None, path=REPLICA_PATH, sync_interval=REPLICA_SYNC_SEC):
+        init_replica(path)
+        self.remote_pool = remote_pool
+        self.path = path
+        self.sync_interval = sync_interval
+        self.pool = ConnectionPool(config={'database': path}, connect_fn=sqlite_standin.connect)
+
+        # 파이프라인과 같은 검색 부품을 로컬 풀에 붙인다 (같은 질문 LRU 는 원격 쪽과 함께 쓴다)
+        self.exact_store = ExactMatchStore(self.pool, lru=lru)
+        self.exact_store.ensure_schema()
+        self.noun_index = NounIndex(self.pool, extractor)
+        self.ranked_search = RankedSearch(self.pool, ranking="fts5")
+        self.answer_store = AnswerStore(self.pool)
+
+        self.ready = self._state()['synced_at'] is not None
+        self.noun_index.ready = self.ready
+        self.last_error = None
+        self._reconciled_at = None     # 마지막으로 원격과 맞춰 본 시각 (monotonic) - 시작 후 첫 동기화 때 한 번 맞춘다
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------------------------
+    # 동기화
+    # ------------------------------------------------------------
+    def start(self):
+        self.sync_quietly()
+        try:
+            # 이전 버전 복제본에 색인 없이 남은 행만 한 번 채운다 (이후에는 동기화한 행만 그때그때 색인)
+            self.noun_index.backfill()
+        except Exception as e:
+            print(f"로컬 복제본 명사 색인 백필 실패: {e}")
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="replica-sync", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.sync_interval):
+            self.sync_quietly()
+
+    def sync_quietly(self):
+        try:
+            return self.sync()
+        except Exception as e:
+            if self.last_error is None:
+                print(f"📴 원격 DB 와 동기화하지 못했습니다 - 로컬 복제본으로 계속 검색합니다: {e}")
+            self.last_error = e
+            return 0
+
+    def sync(self, batch_size=REPLICA_SYNC_BATCH):
+        with self._sync_lock, span("replica.sync") as info:
+            state = self._state()
+            total = 0
+            last_id = state['last_id']
+            while True:
+                rows, nouns, parts = self._fetch_remote("id > %s ORDER BY id LIMIT %s", (last_id, batch_size))
+                if not rows:
+                    break
+                self._apply_remote(rows, nouns, parts, advance=True)
+                total += len(rows)
+                last_id = rows[-1]['id']
+            late = self._sync_late(state['last_id'], state['last_created_at'])
+            reconciled = 0
+            if self._reconciled_at is None or time.monotonic() - self._reconciled_at >= REPLICA_RECONCILE_SEC:
+                reconciled = self._reconcile()
+                self._reconciled_at = time.monotonic()
+            self._mark_synced()
+            info.update(rows=total, late=late, reconciled=reconciled)
+        if self.last_error is not None:
+            print("✅ 원격 DB 와 다시 동기화했습니다.")
+            self.last_error = None
+        if total or late or reconciled:
+            print(f"🔁 로컬 복제본 동기화: 새 행 {total}, 늦게 커밋된 행 {late}, 수정/삭제 반영 {reconciled} "
+                  f"(워터마크 id={last_id})")
+        return total + late
+
+    def _sync_late(self, old_last_id, old_last_created_at):
+        """
+        지난 워터마크 이하인데 아직 없는 행 (다른 트랜잭션이 작은 id 를 잡고 늦게 커밋한 행).
+        created_at 이 지난 워터마크 시각 - REPLICA_SYNC_OVERLAP_SEC 이후인 행만 다시 읽는다.
+        """
+        since = _parse_time(old_last_created_at)
+        if not old_last_id or since is None:
+            return 0
+        since = (since - timedelta(seconds=REPLICA_SYNC_OVERLAP_SEC)).strftime('%Y-%m-%d %H:%M:%S')
+        rows, nouns, parts = self._fetch_remote("created_at >= %s AND id <= %s ORDER BY id",
+                                                (since, old_last_id))
+        known = self._local_ids([row['id'] for row in rows])
+        missing = [row for row in rows if row['id'] not in known]
+        if missing:
+            ids = {row['id'] for row in missing}
+            self._apply_remote(missing, [n for n in nouns if n['history_id'] in ids],
+                               [p for p in parts if p['history_id'] in ids])
+        return len(missing)
+
+    def _reconcile(self, batch_size=REPLICA_RECONCILE_BATCH):
+        """
+        원격과 로컬의 행별 MD5(질문 + 답변) 을 id 구간마다 비교해서, 달라진 행은 다시 가져오고
+        원격에서 지워진 행은 로컬에서도 지운다. 바뀌거나 지운 행 수를 반환한다.
+        """
+        changed = 0
+        after_id = 0
+        while True:
+            with self.remote_pool.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(f"SELECT id, {_ROW_DIGEST} FROM chat_history WHERE id > %s ORDER BY id LIMIT %s",
+                               (_DIGEST_SEP, after_id, batch_size))
+                remote = {row['id']: row['digest'] for row in cursor.fetchall()}
+            last = max(remote) if remote else None
+            with self.pool.connection() as conn, conn.cursor() as cursor:
+                if last is None:
+                    cursor.execute(f"SELECT id, {_ROW_DIGEST} FROM chat_history WHERE id > %s",
+                                   (_DIGEST_SEP, after_id))
+                else:
+                    cursor.execute(f"SELECT id, {_ROW_DIGEST} FROM chat_history WHERE id > %s AND id <= %s",
+                                   (_DIGEST_SEP, after_id, last))
+                local = {row['id']: row['digest'] for row in cursor.fetchall()}
+            stale = [i for i, digest in remote.items() if i in local and local[i] != digest]
+            gone = [i for i in local if i not in remote]
+            if stale:
+                placeholders = ", ".join(["%s"] * len(stale))
+                rows, nouns, parts = self._fetch_remote(f"id IN ({placeholders}) ORDER BY id", stale)
+                if rows:
+                    self._apply_remote(rows, nouns, parts, refresh=True)
+            if gone:
+                self._delete_local(gone)
+            changed += len(stale) + len(gone)
+            if last is None:
+                return changed
+            after_id = last
+
+    def _fetch_remote(self, where, params):
+        with self.remote_pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, question, answer, created_at, question_hash FROM chat_history WHERE {where}", params
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                return [], [], []
+            ids = [row['id'] for row in rows]
+            placeholders = ", ".join(["%s"] * len(ids))
+            nouns = self._fetch_optional(
+                cursor, f"SELECT history_id, noun FROM chat_history_nouns WHERE history_id IN ({placeholders})", ids)
+            parts = self._fetch_optional(
+                cursor, "SELECT history_id, part_no, content FROM chat_answer_parts "
+                        f"WHERE history_id IN ({placeholders})", ids)
+        return rows, nouns, parts
+
+    @staticmethod
+    def _fetch_optional(cursor, sql, params):
+        """색인/조각 테이블이 아직 없는 원격 DB 면 빈 목록 (명사는 로컬에서 다시 색인한다)"""
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        except Exception as e:
+            print(f"원격 보조 테이블을 읽지 못했습니다 (로컬에서 대신 채웁니다): {e}")
+            return []
+
+    def _apply_remote(self, rows, nouns, parts, advance=False, refresh=False):
+        """
+        원격 행을 로컬에 넣거나 고친다. advance=True 면 워터마크를 마지막 행으로 옮긴다.
+        refresh=True 면 (원격에서 바뀐 행) 로컬의 명사 색인과 답변 조각을 지우고 다시 채운다.
+        """
+        indexed = {n['history_id'] for n in nouns}
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                if refresh:
+                    placeholders = ", ".join(["%s"] * len(rows))
+                    ids = [row['id'] for row in rows]
+                    cursor.execute(f"DELETE FROM chat_history_nouns WHERE history_id IN ({placeholders})", ids)
+                    cursor.execute(f"DELETE FROM chat_answer_parts WHERE history_id IN ({placeholders})", ids)
+                cursor.executemany(
+                    "INSERT INTO chat_history (id, question, answer, created_at, question_hash) "
+                    "VALUES (%s, %s, %s, %s, %s) ON CONFLICT (id) DO UPDATE SET question = excluded.question, "
+                    "answer = excluded.answer, created_at = excluded.created_at, "
+                    "question_hash = excluded.question_hash",
+                    [(row['id'], row['question'], row['answer'], _time_text(row['created_at']),
+                      row['question_hash'] or question_key(row['question'] or '')) for row in rows]
+                )
+                if nouns:
+                    cursor.executemany(
+                        "INSERT IGNORE INTO chat_history_nouns (history_id, noun) VALUES (%s, %s)",
+                        [(n['history_id'], n['noun']) for n in nouns]
+                    )
+                # 원격에 명사 색인이 아직 없는 행은 (로컬에도 없으면) 여기서 색인한다 - 전체 백필은 하지 않는다
+                unindexed = [row for row in rows if row['id'] not in indexed]
+                if unindexed:
+                    placeholders = ", ".join(["%s"] * len(unindexed))
+                    cursor.execute("SELECT DISTINCT history_id FROM chat_history_nouns "
+                                   f"WHERE history_id IN ({placeholders})", [row['id'] for row in unindexed])
+                    indexed.update(r['history_id'] for r in cursor.fetchall())
+                    for row in unindexed:
+                        if row['id'] not in indexed:
+                            self.noun_index.index_row(cursor, row['id'], row['question'], row['answer'])
+                if parts:
+                    cursor.executemany(
+                        "INSERT OR REPLACE INTO chat_answer_parts (history_id, part_no, content) VALUES (%s, %s, %s)",
+                        [(p['history_id'], p['part_no'], p['content']) for p in parts]
+                    )
+                self._drop_pending(cursor, {row['question_hash'] or question_key(row['question'] or '')
+                                            for row in rows})
+                if advance:
+                    last = rows[-1]
+                    cursor.execute("UPDATE replica_state SET last_id = %s, last_created_at = %s WHERE id = 1",
+                                   (last['id'], _time_text(last['created_at'])))
+            conn.commit()
+
+    def _local_ids(self, ids):
+        if not ids:
+            return set()
+        placeholders = ", ".join(["%s"] * len(ids))
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(f"SELECT id FROM chat_history WHERE id IN ({placeholders})", ids)
+            return {row['id'] for row in cursor.fetchall()}
+
+    def _delete_local(self, ids):
+        """원격에서 지워진 행을 로컬에서도 지운다 (대기 행 = 음수 id 는 건드리지 않는다)"""
+        ids = [i for i in ids if i > 0]
+        for start in range(0, len(ids), REPLICA_SYNC_BATCH):
+            chunk = ids[start:start + REPLICA_SYNC_BATCH]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            with self.pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(f"DELETE FROM chat_history_nouns WHERE history_id IN ({placeholders})", chunk)
+                    cursor.execute(f"DELETE FROM chat_answer_parts WHERE history_id IN ({placeholders})", chunk)
+                    cursor.execute(f"DELETE FROM chat_history WHERE id IN ({placeholders})", chunk)
+                conn.commit()
+
+    def _mark_synced(self):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("UPDATE replica_state SET synced_at = %s WHERE id = 1",
+                               (datetime.now().strftime('%Y-%m-%d %H:%M:%S'),))
+            conn.commit()
+        self.ready = True
+        self.noun_index.ready = True
+
+    def _state(self):
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT last_id, last_created_at, synced_at FROM replica_state WHERE id = 1")
+            return cursor.fetchone()
+
+    # ------------------------------------------------------------
+    # 쓰기 반영
+    # ------------------------------------------------------------
+    def add_pending(self, question, answer, created_at):
+        """원격에 아직 저장되지 않은 답변 - 음수 id 로 넣고, 원격 행이 들어오면 지운다."""
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT MIN(id) AS min_id FROM chat_history")
+                pending_id = min((cursor.fetchone() or {}).get('min_id') or 0, 0) - 1
+                cursor.execute(
+                    "INSERT INTO chat_history (id, question, answer, created_at, question_hash) "
+                    "VALUES (%s, %s, %s, %s, %s)",
+                    (pending_id, question, answer, created_at, question_key(question))
+                )
+                self.noun_index.index_row(cursor, pending_id, question, answer)
+            conn.commit()
+        return pending_id
+
+    def apply_saved(self, history_id, question, answer, created_at):
+        """원격에 저장된 행을 다음 동기화를 기다리지 않고 반영한다 (같은 질문의 대기 행은 지운다)."""
+        if not history_id:
+            return
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                key = question_key(question)
+                self._drop_pending(cursor, {key})
+                cursor.execute(
+                    "INSERT INTO chat_history (id, question, answer, created_at, question_hash) "
+                    "VALUES (%s, %s, %s, %s, %s) ON CONFLICT (id) DO NOTHING",
+                    (history_id, question, answer, created_at, key)
+                )
+                self.noun_index.index_row(cursor, history_id, question, answer)
+            conn.commit()
+
+    @staticmethod
+    def _drop_pending(cursor, keys):
+        keys = [k for k in keys if k]
+        if not keys:
+            return
+        placeholders = ", ".join(["%s"] * len(keys))
+        cursor.execute(f"SELECT id FROM chat_history WHERE id < 0 AND question_hash IN ({placeholders})", keys)
+        ids = [row['id'] for row in cursor.fetchall()]
+        if ids:
+            id_marks = ", ".join(["%s"] * len(ids))
+            cursor.execute(f"DELETE FROM chat_history_nouns WHERE history_id IN ({id_marks})", ids)
+            cursor.execute(f"DELETE FROM chat_history WHERE id IN ({id_marks})", ids)
+
+    # ------------------------------------------------------------
+    # 통계 / 종료
+    # ------------------------------------------------------------
+    def stats(self):
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) AS rows_total, SUM(CASE WHEN id < 0 THEN 1 ELSE 0 END) AS pending "
+                           "FROM chat_history")
+            counts = cursor.fetchone()
+        state = self._state()
+        return {'rows': counts['rows_total'], 'pending': counts['pending'] or 0, 'last_id': state['last_id'],
+                'last_created_at': state['last_created_at'], 'synced_at': state['synced_at'],
+                'online': self.last_error is None}
+
+    def close(self):
+        self._stop.set()
+        self.pool.close()
+
+
+def _parse_time(value):
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d %H:%M:%S')
+    except (TypeError, ValueError):
+        return None
+
+
+def _time_text(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value) if value is not None else None
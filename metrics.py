@@ -0,0 +1,251 @@
+# 단계별 소요 시간 측정 (형태소 분석 / DB 검색 / 필터 / Gemini / 화면 표시 / 저장)
+# 측정값은
+#  - 단계별 최근 샘플(p50/p95)과 누적 히스토그램(Prometheus 형식)에 모이고
+#  - METRICS_LOG 가 있으면 한 줄에 하나씩 JSON 으로 기록되며
+#  - METRICS_PROM_FILE 이 있으면 종료할 때 Prometheus 텍스트로 저장되고
+#  - METRICS_HTTP_PORT 가 있으면 http://127.0.0.1:포트/metrics 에서 읽을 수 있다.
+# 사용법:
+#     with span("search.retrieve", mode="bm25"):
+#         ...
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_LOG = os.getenv("METRICS_LOG", "")                      # JSON 로그 파일 경로 (비우면 기록 안 함)
+METRICS_PROM_FILE = os.getenv("METRICS_PROM_FILE", "")          # 종료 시 Prometheus 텍스트를 저장할 경로
+METRICS_HTTP_PORT = int(os.getenv("METRICS_HTTP_PORT", "0"))     # 0 이면 HTTP 엔드포인트 사용 안 함
+METRICS_STATUS_BAR = os.getenv("METRICS_STATUS_BAR", "0") == "1"  # 1 이면 창 상태 표시줄에 단계별 시간 표시
+METRICS_WINDOW = 1000          # 단계별로 p50/p95 계산에 쓰는 최근 샘플 수
+METRICS_RECENT_REQUESTS = 50   # 요청별 단계 시간을 기억해 둘 최근 요청 수
+
+# 히스토그램 구간 상한(초)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 지금 처리 중인 요청 번호 (작업자 스레드마다 따로 유지된다)
+_current_request = contextvars.ContextVar("metrics_request_id", default=None)
+
+
+class StageStats:
+    """한 단계의 누적 히스토그램 + 최근 샘플"""
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.buckets = [0] * len(BUCKETS)
+        self.recent = deque(maxlen=window)
+        self.last = 0.0
+
+    def add(self, seconds, ok=True):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if not ok:
+            self.errors += 1
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+        self.recent.append(seconds)
+
+    def quantile(self, q):
+        ordered = sorted(self.recent)
+        if not ordered:
+            return 0.0
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class Metrics:
+    """
+    - span(stage, **fields): with 블록의 소요 시간을 stage 로 기록한다 (예외가 나면 ok=False 로 기록 후 다시 올림)
+    - record(stage, seconds, **fields): 직접 잰 시간을 기록한다 (스트리밍 첫 조각 등)
+    - request(request_id): 이 블록 안에서 기록되는 측정값에 요청 번호를 붙인다
+    - snapshot() / request_summary() / prometheus_text(): 조회용
+    """
+
+    def __init__(self, log_path=METRICS_LOG, window=METRICS_WINDOW):
+        self.window = window
+        self._stages = {}
+        self._requests = OrderedDict()   # request_id -> {stage: 초}
+        self._lock = threading.Lock()
+        self._log_path = log_path
+        self._log_file = None
+        self._server = None
+
+    # ------------------------------------------------------------
+    # 기록
+    # ------------------------------------------------------------
+    @contextmanager
+    def request(self, request_id):
+        token = _current_request.set(request_id)
+        try:
+            yield
+        finally:
+            _current_request.reset(token)
+
+    @contextmanager
+    def span(self, stage, **fields):
+        started = time.perf_counter()
+        try:
+            yield fields   # 블록 안에서 fields['rows'] = ... 처럼 결과 정보를 덧붙일 수 있다
+        except BaseException:
+            self.record(stage, time.perf_counter() - started, ok=False, **fields)
+            raise
+        self.record(stage, time.perf_counter() - started, **fields)
+
+    def record(self, stage, seconds, ok=True, **fields):
+        request_id = _current_request.get()
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = StageStats(self.window)
+            stats.add(seconds, ok)
+            if request_id is not None:
+                per_request = self._requests.setdefault(request_id, {})
+                per_request[stage] = per_request.get(stage, 0.0) + seconds
+                self._requests.move_to_end(request_id)
+                while len(self._requests) > METRICS_RECENT_REQUESTS:
+                    self._requests.popitem(last=False)
+            if self._log_path:
+                self._write_log(stage, seconds, ok, request_id, fields)
+
+    def _write_log(self, stage, seconds, ok, request_id, fields):
+        entry = {'ts': round(time.time(), 3), 'stage': stage, 'ms': round(seconds * 1000, 2), 'ok': ok}
+        if request_id is not None:
+            entry['request_id'] = request_id
+        entry.update(fields)
+        try:
+            if self._log_file is None:
+                self._log_file = open(self._log_path, 'a', encoding='utf-8')
+            self._log_file.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+            self._log_file.flush()
+        except OSError as e:
+            print(f"측정 로그 기록 실패 - 로그 기록을 끕니다: {e}")
+            self._log_path = ""
+
+    # ------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------
+    def snapshot(self):
+        """{단계: {count, errors, avg_ms, p50_ms, p95_ms, last_ms}}"""
+        with self._lock:
+            return {
+                stage: {
+                    'count': s.count,
+                    'errors': s.errors,
+                    'avg_ms': s.total / s.count * 1000 if s.count else 0.0,
+                    'p50_ms': s.quantile(0.5) * 1000,
+                    'p95_ms': s.quantile(0.95) * 1000,
+                    'last_ms': s.last * 1000,
+                }
+                for stage, s in sorted(self._stages.items())
+            }
+
+    def request_summary(self, request_id):
+        """요청 하나에서 단계별로 걸린 시간(ms)"""
+        with self._lock:
+            return {stage: seconds * 1000 for stage, seconds in self._requests.get(request_id, {}).items()}
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP mygemini_stage_seconds Time spent per pipeline stage.",
+            "# TYPE mygemini_stage_seconds histogram",
+        ]
+        with self._lock:
+            for stage, s in sorted(self._stages.items()):
+                label = stage.replace("\\", "\\\\").replace('"', '\\"')
+                for bound, count in zip(BUCKETS, s.buckets):
+                    lines.append(f'mygemini_stage_seconds_bucket{{stage="{label}",le="{bound}"}} {count}')
+                lines.append(f'mygemini_stage_seconds_bucket{{stage="{label}",le="+Inf"}} {s.count}')
+                lines.append(f'mygemini_stage_seconds_sum{{stage="{label}"}} {s.total:.6f}')
+                lines.append(f'mygemini_stage_seconds_count{{stage="{label}"}} {s.count}')
+            lines.append("# HELP mygemini_stage_errors_total Failed runs per pipeline stage.")
+            lines.append("# TYPE mygemini_stage_errors_total counter")
+            for stage, s in sorted(self._stages.items()):
+                label = stage.replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'mygemini_stage_errors_total{{stage="{label}"}} {s.errors}')
+        return "\n".join(lines) + "\n"
+
+    def print_summary(self):
+        for stage, s in self.snapshot().items():
+            print(f"⏱️ {stage}: {s['count']}회, p50 {s['p50_ms']:.1f}ms / p95 {s['p95_ms']:.1f}ms"
+                  + (f", 실패 {s['errors']}회" if s['errors'] else ""))
+
+    # ------------------------------------------------------------
+    # 내보내기
+    # ------------------------------------------------------------
+    def dump_prometheus(self, path=METRICS_PROM_FILE):
+        if not path:
+            return
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def serve(self, port=METRICS_HTTP_PORT, host="127.0.0.1"):
+        """로컬 HTTP 엔드포인트(/metrics)를 데몬 스레드로 띄운다."""
+        if not port or self._server is not None:
+            return
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            print(f"측정 엔드포인트를 열 수 없습니다 (포트 {port}): {e}")
+            return
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"📈 측정값 엔드포인트: http://{host}:{port}/metrics")
+
+    def close(self):
+        """Prometheus 파일을 남기고 엔드포인트/로그 파일을 닫는다."""
+        try:
+            self.dump_prometheus()
+        except OSError as e:
+            print(f"측정값 파일 저장 실패: {e}")
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        with self._lock:
+            if self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """프로세스 공용 Metrics (처음 호출할 때 만들고, METRICS_HTTP_PORT 가 있으면 엔드포인트도 띄운다)"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                metrics = Metrics()
+                metrics.serve()
+                _metrics = metrics
+    return _metrics
+
+
+def span(stage, **fields):
+    return get_metrics().span(stage, **fields)
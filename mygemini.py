@@ -1,27 +1,64 @@
+import time
+LAUNCHED_AT = time.perf_counter()   # 실행 시작 시각 (첫 답변까지 걸린 시간 측정용)
 import sys
 import os
-import pymysql
-from datetime import datetime
 import html
+import threading
 from PyQt6.QtWidgets import QApplication, QMainWindow, QMessageBox
-from PyQt6 import uic
 from dotenv import load_dotenv 
-from konlpy.tag import Kkma
 from PyQt6.QtCore import QPropertyAnimation, QEasingCurve   # 애니메이션용
 from PyQt6.QtCore import QPoint # QPoint 임포트 추가
-
-# Google GenAI 라이브러리 임포트
-try:
-    # 'google-genai' 라이브러리 시도
-    from google import genai
-except ImportError:
-    print("🚨 오류: 'google-genai' 라이브러리를 찾을 수 없습니다.")
-    print("설치하려면 터미널에서 'pip install google-genai' 명령을 실행하세요.")
-    sys.exit(1)
+from PyQt6.QtCore import QThreadPool, QTimer  # 백그라운드 작업 / 스트리밍 출력용
+from PyQt6.QtGui import QTextCursor, QTextCharFormat, QColor, QDesktopServices
+from gemini_worker import GeminiTask, SearchPageTask
+from qa_pipeline import QAPipeline
+from result_html import render_row_html
+from result_view import SearchResultModel, SearchResultView
+from metrics import get_metrics, METRICS_STATUS_BAR
+from startup import Warmup
+from resilient_gemini import GEMINI_TIMEOUT
+from build_ui import ui_source_sha1
+
+# 빠른 시작: 창을 먼저 띄우고 google.genai 임포트/클라이언트, 파이프라인(DB 연결, Kkma)은 백그라운드에서 준비한다.
+# FAST_STARTUP=0 이면 기존처럼 창을 띄우기 전에 모두 준비한다.
+FAST_STARTUP = os.getenv("FAST_STARTUP", "1") != "0"
+
+# 스트리밍 응답 설정
+# GEMINI_STREAM=0 이면 기존처럼 전체 응답을 받은 뒤 한 번에 표시합니다.
+STREAM_RESPONSES = os.getenv("GEMINI_STREAM", "1") != "0"
+STREAM_FLUSH_MS = 80   # 응답 조각을 모아서 화면에 붙이는 간격(ms)
+
+# 상태 표시줄에 보여줄 단계 (METRICS_STATUS_BAR=1): (이름, 합산할 측정 단계들)
+STATUS_STAGES = (
+    ("전체", ("request",)),
+    ("검색", ("search",)),
+    ("형태소", ("search.tokenize",)),
+    ("첫 조각", ("gemini.first_chunk",)),
+    ("Gemini", ("gemini.generate", "gemini.stream")),
+    ("저장", ("save.enqueue", "save.insert", "save.index", "save.semantic")),
+    ("표시", ("render.search", "render.answer", "render.stream", "render.notice")),
+)
+
+def load_form_class():
+    """미리 변환한 mygemini_ui.py 를 쓰고, 없거나 .ui 가 바뀌었으면 loadUiType 으로 직접 읽는다."""
+    try:
+        import mygemini_ui
+    except ImportError:
+        mygemini_ui = None
+    if mygemini_ui is not None:
+        try:
+            current = ui_source_sha1("mygemini.ui")
+        except OSError:
+            current = None   # .ui 파일이 없으면 변환된 모듈을 그대로 쓴다
+        if current is None or current == getattr(mygemini_ui, 'UI_SOURCE_SHA1', None):
+            return mygemini_ui.Ui_geminiByNoh
+        print("ℹ️ mygemini.ui 가 변환된 뒤 수정되어 직접 읽습니다. (python build_ui.py 로 다시 변환하세요)")
+    from PyQt6 import uic
+    return uic.loadUiType("mygemini.ui")[0]
 
 # UI 파일 로드
 try:
-    form_class = uic.loadUiType("mygemini.ui")[0]
+    form_class = load_form_class()
 except Exception as e:
     app = QApplication(sys.argv)
     QMessageBox.critical(None, "UI 파일 오류", f"UI 파일을 찾을 수 없습니다.\n\n에러 내용: {e}")
@@ -35,18 +72,30 @@ class GeminiApp(QMainWindow, form_class):
         
         # [수정] QTextBrowser 설정 추가
         # QTextBrowser는 기본적으로 읽기 전용입니다.
-        # 링크가 포함된 답변이 올 경우 브라우저로 열리게 설정합니다.
+        # 링크는 직접 처리한다: 'list:' 는 검색 결과 목록으로 돌아가기, 나머지는 브라우저로 연다.
         try:
-            self.answerDisplay.setOpenExternalLinks(True)
+            self.answerDisplay.setOpenLinks(False)
+            self.answerDisplay.anchorClicked.connect(self.on_anchor_clicked)
         except AttributeError:
             pass # UI 파일에 해당 위젯이 없으면 무시
 
+        # DB 검색 결과는 answerDisplay 자리에 목록(모델/뷰)으로 보여준다.
+        # 화면에 보이는 항목만 그리고, 목록 끝까지 스크롤하면 다음 페이지를 가져와 끝에 덧붙인다.
+        self.result_model = SearchResultModel(self)
+        self.result_model.more_requested.connect(self.load_more_results)
+        self.resultView = SearchResultView(self.answerDisplay.parentWidget())
+        self.resultView.setGeometry(self.answerDisplay.geometry())
+        self.resultView.setModel(self.result_model)
+        self.resultView.row_activated.connect(self.show_result_row)
+        self.resultView.hide()
+
         # --- [수정된 부분] API 키 설정 (NameError 해결을 위해 함수 내부로 이동) ---
         # 1. .env 파일에서 환경 변수를 불러옵니다.
         load_dotenv()
         
         # 2. 환경 변수에서 GEMINI_API_KEY 값을 읽어옵니다
         api_key = os.getenv("GEMINI_API_KEY")
+        self._api_key = api_key
         self.client = None
         
         if not api_key: 
@@ -58,17 +107,7 @@ class GeminiApp(QMainWindow, form_class):
                 ".env 파일에 GEMINI_API_KEY가 올바르게 있는지 확인해주세요."
             )
             # 클라이언트를 None으로 둡니다.
-        else:
-            try:
-                # 환경 변수에서 API 키를 사용하여 클라이언트 초기화
-                # 명시적으로 api_key를 전달하는 것이 안전합니다.
-                self.client = genai.Client(api_key=api_key)
-            except Exception as e:
-                # API 초기화 실패 시 처리
-                error_msg = f"Gemini API 클라이언트 초기화 오류: {e}"
-                QMessageBox.critical(self, "API 오류", "Gemini API 클라이언트 초기화에 실패했습니다.\n\n" + error_msg)
-                print(error_msg)
-                self.client = None
+        # 3. 클라이언트 생성은 start_warmup → create_client 에서 합니다 (빠른 시작이면 창을 띄운 뒤 백그라운드로)
             
         # 4. 버튼 클릭 시그널 연결
         self.btnSent.clicked.connect(self.ask_gemini) 
@@ -90,7 +129,97 @@ class GeminiApp(QMainWindow, form_class):
         self.label2_anim.setStartValue(self.label2_origin)
         self.label2_anim.setKeyValueAt(0.5, self.label2_origin + QPoint(10, 0))
         self.label2_anim.setEndValue(self.label2_origin)
+
+        # 백그라운드 작업 설정 (검색 → 생성 → 저장을 GUI 스레드 밖에서 실행)
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(4)
+        self._request_seq = 0          # 질문마다 1씩 증가하는 요청 번호
+        self._active_request_id = 0    # 화면에 반영할 현재 요청 번호
+        self._tasks = {}               # 실행 중인 작업 (request_id -> GeminiTask)
+        self._page_task = None         # 검색 결과 다음 페이지를 가져오는 작업
+
+        # 단계별 소요 시간 측정 (METRICS_LOG / METRICS_PROM_FILE / METRICS_HTTP_PORT / METRICS_STATUS_BAR)
+        self.metrics = get_metrics()
+
+        # 검색/생성/저장 파이프라인 (DB 풀, 형태소 분석기, 색인, 캐시, 저장 큐)과 Gemini 클라이언트 준비
+        # 빠른 시작이면 창이 뜬 직후(이벤트 루프 시작 후) 백그라운드에서 시작하고,
+        # 첫 질문은 그때까지 끝나지 않은 준비 작업만 기다린다.
+        self.pipeline = None
+        self.warmup = Warmup()
+        self._client_lock = threading.Lock()
+        self._first_asked_at = None
+        self._first_answer_shown = False
+        if FAST_STARTUP:
+            QTimer.singleShot(0, self.start_warmup)
+        else:
+            self.start_warmup(run_background=lambda fn: fn())
+
+        # 스트리밍 출력 버퍼: 조각마다 다시 그리지 않고 STREAM_FLUSH_MS 간격으로 모아서 붙인다
+        self._stream_buffer = []
+        self._stream_timer = QTimer(self)
+        self._stream_timer.setSingleShot(True)
+        self._stream_timer.setInterval(STREAM_FLUSH_MS)
+        self._stream_timer.timeout.connect(self.flush_stream_buffer)
+        self._stream_format = QTextCharFormat()
+        self._stream_format.setForeground(QColor("green"))
     
+    # ------------------------------------------------------------
+    # 준비 작업 (빠른 시작)
+    # ------------------------------------------------------------
+    def start_warmup(self, run_background=None):
+        run = run_background or self.thread_pool.start
+        if self._api_key:
+            self.warmup.start("client", self.create_client, run)
+        self.warmup.start("pipeline", self.create_pipeline, run)
+
+    def create_client(self):
+        """google.genai 임포트 + 클라이언트 생성 (무거우므로 창을 띄운 뒤 작업자 스레드에서 실행됨)"""
+        try:
+            # 'google-genai' 라이브러리 시도
+            from google import genai
+            from google.genai import types
+        except ImportError:
+            print("🚨 오류: 'google-genai' 라이브러리를 찾을 수 없습니다.")
+            print("설치하려면 터미널에서 'pip install google-genai' 명령을 실행하세요.")
+            raise
+        try:
+            # 명시적으로 api_key를 전달하는 것이 안전합니다.
+            # HTTP 요청 자체에도 제한 시간을 둔다 (ms) - 재시도/차단은 ResilientGemini 가 맡는다
+            client = genai.Client(api_key=self._api_key,
+                                  http_options=types.HttpOptions(timeout=int(GEMINI_TIMEOUT * 1000)))
+        except Exception as e:
+            print(f"Gemini API 클라이언트 초기화 오류: {e}")
+            raise
+        with self._client_lock:
+            self.client = client
+            if self.pipeline is not None:
+                self.pipeline.set_client(client)
+        return client
+
+    def create_pipeline(self):
+        """파이프라인 생성 - DB 연결/Kkma/색인 준비는 파이프라인이 스레드 풀에서 이어서 한다"""
+        pipeline = QAPipeline(self.client, run_background=self.thread_pool.start)
+        with self._client_lock:
+            self.pipeline = pipeline
+            if self.client is not None and pipeline.client is not self.client:
+                pipeline.set_client(self.client)
+        return pipeline
+
+    def get_pipeline(self):
+        """준비가 끝난 파이프라인 (아직 준비 중이면 기다린다 - 작업자 스레드에서 호출됨)"""
+        return self.warmup.wait("pipeline")
+
+    def mark_first_answer(self):
+        """실행 후 처음으로 답변(검색 결과/생성 응답)을 화면에 보여준 시점을 기록한다."""
+        if self._first_answer_shown:
+            return
+        self._first_answer_shown = True
+        now = time.perf_counter()
+        since_launch = now - LAUNCHED_AT
+        self.metrics.record("startup.first_answer", since_launch)
+        since_ask = now - self._first_asked_at if self._first_asked_at else 0.0
+        print(f"🚀 실행 후 첫 답변까지 {since_launch:.2f}초 (첫 질문 후 {since_ask:.2f}초)")
+
     def start_label2_animation(self):
         self.label2_anim.start()
 
@@ -99,8 +228,8 @@ class GeminiApp(QMainWindow, form_class):
         self.label_2.move(self.label2_origin)   # 위치 원위치 복귀
 
     def ask_gemini(self): 
-        # API 클라이언트 초기화 실패 시 처리
-        if not self.client:
+        # API 클라이언트 초기화 실패 시 처리 (아직 준비 중이면 생성 단계에서 기다린다)
+        if not self._api_key or self.warmup.error("client") is not None:
             self.answerDisplay.setText("Gemini API 클라이언트가 초기화되지 않았습니다. API 키를 확인하세요. [제미나이nh]")
             return      
 
@@ -112,307 +241,265 @@ class GeminiApp(QMainWindow, form_class):
         
         # 질문 입력창 비우기
         self.lineEditMyQuestion.clear()
-        
-        # 먼저 DB에서 검색 시도
-        self.start_label2_animation()  # 애니메이션 시작
-        if self.search_mysql(search_text=question) == True:
-            self.stop_label2_animation()  # 애니메이션 중지 
-            return  # 검색 결과가 있으면 새 질문 처리 중단
-
+        if self._first_asked_at is None:
+            self._first_asked_at = time.perf_counter()
+
+        # 아직 처리 중인 이전 질문은 취소 (결과가 와도 화면에 반영하지 않음)
+        for task in self._tasks.values():
+            task.cancel()
+        self._stream_timer.stop()
+        self._stream_buffer = []
+        if self._page_task is not None:
+            self._page_task.cancel()
+        self.result_model.clear()
+        self.show_answer_display()
 
         # 응답 대기 메시지 표시 (HTML)
         waiting_html = f"<div>➡️ 질문: <b>{html.escape(question)}</b></div>" \
-                   f"<div style='color:gray;'>Gemini가 응답을 생성하는 중입니다... 잠시만 기다려주세요.</div>"
+                   f"<div style='color:gray;'>답변을 찾는 중입니다... 잠시만 기다려주세요.</div>"
         self.answerDisplay.setPlainText("")             # 먼저 지우고
         self.answerDisplay.setHtml(waiting_html)
-        QApplication.processEvents() # UI 갱신 (반드시 필요)
-
-        try:
-            # API 호출
-            response = self.client.models.generate_content(
-                model='gemini-2.5-flash',
-                contents=question
-            )
+        self.start_label2_animation()  # 애니메이션 시작
 
-            # 응답 표시 및 [제미나이nh] 추가
-            esc_question = html.escape(question).replace('\n', '<br>')
-            esc_response = html.escape(response.text).replace('\n', '<br>')
-            html_content = (
-                f"<div style='color:#1E90FF; font-weight:bold;'>[Gemini 생성 응답]</div>"                
-                f"<div>➡️ 질문: <b><span style='color:red;'>{esc_question}</span></b></div>"
-                f"<hr>"
-                f"<div style='color:green; white-space:pre-wrap;'>{esc_response}</div>"
-                f"<div style='color:gray; margin-top:8px;'>[제미나이nh]</div>"
-            )
+        # 작업자 생성 후 스레드 풀에서 실행
+        self._request_seq += 1
+        request_id = self._request_seq
+        self._active_request_id = request_id
+
+        stream_fn = self.stream_answer if STREAM_RESPONSES else None
+        task = GeminiTask(request_id, question, self.search_mysql, self.generate_answer, self.save_to_mysql,
+                          stream_fn=stream_fn, fallback_fn=self.search_fallback)
+        task.signals.db_result.connect(self.on_db_result)
+        task.signals.answer.connect(self.on_answer)
+        task.signals.stream_started.connect(self.on_stream_started)
+        task.signals.chunk.connect(self.on_chunk)
+        task.signals.stream_done.connect(self.on_stream_done)
+        task.signals.notice.connect(self.on_notice)
+        task.signals.error.connect(self.on_error)
+        task.signals.finished.connect(self.on_task_finished)
+        self._tasks[request_id] = task
+        self.thread_pool.start(task)
+
+    def generate_answer(self, question):
+        """Gemini API 호출 (작업자 스레드에서 실행됨)"""
+        self.warmup.wait("client")
+        return self.get_pipeline().generate_answer(question)
+
+    def stream_answer(self, question):
+        """Gemini 스트리밍 API 호출 - 응답 조각(텍스트)을 차례로 돌려준다. (작업자 스레드에서 실행됨)"""
+        self.warmup.wait("client")
+        return self.get_pipeline().stream_answer(question)
+
+    # ------------------------------------------------------------
+    # 작업자 시그널 처리 (GUI 스레드에서 실행됨)
+    # ------------------------------------------------------------
+    def _is_active(self, request_id):
+        return request_id == self._active_request_id
+
+    def on_db_result(self, request_id, question, found):
+        if not self._is_active(request_id):
+            return
+        nouns, rows, has_more = found
+        with self.metrics.request(request_id), self.metrics.span("render.search", rows=len(rows)):
+            self.result_model.reset(question, nouns, rows, has_more)
+            self.resultView.scrollToTop()
+            self.show_result_list()
+        self.mark_first_answer()
+
+    def show_result_list(self):
+        self.answerDisplay.hide()
+        self.resultView.show()
+
+    def show_answer_display(self):
+        self.resultView.hide()
+        self.answerDisplay.show()
+
+    def show_result_row(self, i, row):
+        """목록에서 고른 결과 한 건을 전체 답변과 함께 answerDisplay에 보여준다."""
+        self.answerDisplay.setHtml(
+            "<div><a href='list:'>◀ 검색 결과 목록으로</a></div><hr>" + render_row_html(i, row))
+        self.show_answer_display()
+
+    def on_anchor_clicked(self, url):
+        if url.scheme() == "list":
+            self.show_result_list()
+        else:
+            QDesktopServices.openUrl(url)
 
+    def load_more_results(self):
+        """목록 끝까지 스크롤했을 때 - 검색 결과의 다음 페이지를 작업자 스레드에서 가져온다."""
+        model = self.result_model
+        if not model.has_more:
+            return
+        task = SearchPageTask(self._active_request_id, model.question, len(model.rows), self.search_mysql)
+        task.signals.page.connect(self.on_page_result)
+        task.signals.error.connect(self.on_page_error)
+        task.signals.finished.connect(lambda _rid, t=task: self.on_page_task_finished(t))
+        self._page_task = task
+        self.thread_pool.start(task)
+
+    def on_page_result(self, request_id, found):
+        if not self._is_active(request_id):
+            return
+        if not found:
+            self.result_model.stop_loading()
+            return
+        _, rows, has_more = found
+        # 기존 항목은 그대로 두고 새 행만 끝에 덧붙인다
+        with self.metrics.span("render.page", rows=len(rows)):
+            self.result_model.append_rows(rows, has_more)
+
+    def on_page_error(self, request_id, question, error_message):
+        print(error_message)
+        if self._is_active(request_id):
+            self.result_model.stop_loading()
+
+    def on_page_task_finished(self, task):
+        if self._page_task is task:
+            self._page_task = None
+
+    def on_answer(self, request_id, question, answer):
+        if not self._is_active(request_id):
+            return
+        # 응답 표시 및 [제미나이nh] 추가
+        esc_question = html.escape(question).replace('\n', '<br>')
+        esc_response = html.escape(answer).replace('\n', '<br>')
+        html_content = (
+            f"<div style='color:#1E90FF; font-weight:bold;'>[Gemini 생성 응답]</div>"                
+            f"<div>➡️ 질문: <b><span style='color:red;'>{esc_question}</span></b></div>"
+            f"<hr>"
+            f"<div style='color:green; white-space:pre-wrap;'>{esc_response}</div>"
+            f"<div style='color:gray; margin-top:8px;'>[제미나이nh]</div>"
+        )
+
+        with self.metrics.request(request_id), self.metrics.span("render.answer"):
             self.answerDisplay.setPlainText("")                   # 먼저 지우고
             self.answerDisplay.setHtml(html_content )   # 새 결과 출력
-            
-            # (답변 표시 후)
-            self.save_to_mysql(question, response.text)
-            
-        except Exception as e:
-            # API 호출 중 예외 처리
-            error_message = f"API 호출 중 오류 발생: {e}"
-            print(error_message)
-            err_html = f"<div>➡️ 질문: <b>{html.escape(question)}</b></div>" \
-                       f"<div style='color:red;'>🚨 오류: {html.escape(str(error_message))}</div>" \
-                       f"<div style='color:gray; margin-top:8px;'>[by geminiNoh]</div>"
-            self.answerDisplay.setPlainText("")            # 먼저 지우고
-            self.answerDisplay.setHtml(err_html)
-        finally:
+        self.mark_first_answer()
+
+    def on_stream_started(self, request_id, question):
+        if not self._is_active(request_id):
+            return
+        # 머리말만 먼저 그리고, 본문은 조각이 도착하는 대로 끝에 덧붙인다
+        esc_question = html.escape(question).replace('\n', '<br>')
+        header_html = (
+            f"<div style='color:#1E90FF; font-weight:bold;'>[Gemini 생성 응답]</div>"
+            f"<div>➡️ 질문: <b><span style='color:red;'>{esc_question}</span></b></div>"
+            f"<hr>"
+        )
+        self.answerDisplay.setPlainText("")            # 먼저 지우고
+        self.answerDisplay.setHtml(header_html)
+        cursor = self.answerDisplay.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertBlock()
+        self.answerDisplay.setTextCursor(cursor)
+
+    def on_chunk(self, request_id, piece):
+        if not self._is_active(request_id):
+            return
+        self._stream_buffer.append(piece)
+        if not self._stream_timer.isActive():
+            self._stream_timer.start()
+
+    def flush_stream_buffer(self):
+        """모아 둔 응답 조각을 문서 끝에 한 번에 붙인다 (전체 setHtml 없이 증분 추가)"""
+        if not self._stream_buffer:
+            return
+        text = "".join(self._stream_buffer)
+        self._stream_buffer = []
+        with self.metrics.request(self._active_request_id), self.metrics.span("render.stream"):
+            cursor = QTextCursor(self.answerDisplay.document())
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            cursor.insertText(text, self._stream_format)
+            scroll_bar = self.answerDisplay.verticalScrollBar()
+            scroll_bar.setValue(scroll_bar.maximum())
+        self.mark_first_answer()
+
+    def on_stream_done(self, request_id, question, answer):
+        if not self._is_active(request_id):
+            return
+        self._stream_timer.stop()
+        self.flush_stream_buffer()
+        cursor = QTextCursor(self.answerDisplay.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertBlock()
+        cursor.insertHtml("<span style='color:gray;'>[제미나이nh]</span>")
+
+    def on_notice(self, request_id, notice_html):
+        if not self._is_active(request_id):
+            return
+        # 문서 전체를 toHtml/setHtml 로 다시 만들지 않고 끝에만 덧붙인다
+        with self.metrics.request(request_id), self.metrics.span("render.notice"):
+            cursor = QTextCursor(self.answerDisplay.document())
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            cursor.insertBlock()
+            cursor.insertHtml(notice_html)
+
+    def on_error(self, request_id, question, error_message):
+        print(error_message)
+        if not self._is_active(request_id):
+            return
+        err_html = f"<div>➡️ 질문: <b>{html.escape(question)}</b></div>" \
+                   f"<div style='color:red;'>🚨 오류: {html.escape(str(error_message))}</div>" \
+                   f"<div style='color:gray; margin-top:8px;'>[by geminiNoh]</div>"
+        self.show_answer_display()
+        self.answerDisplay.setPlainText("")            # 먼저 지우고
+        self.answerDisplay.setHtml(err_html)
+
+    def on_task_finished(self, request_id):
+        self._tasks.pop(request_id, None)
+        if self._is_active(request_id):
             self.stop_label2_animation()  # 애니메이션 중지
+            if METRICS_STATUS_BAR:
+                self.show_stage_times(request_id)
+
+    def show_stage_times(self, request_id):
+        """방금 끝난 요청의 단계별 소요 시간을 상태 표시줄에 보여준다."""
+        times = self.metrics.request_summary(request_id)
+        parts = []
+        for label, stages in STATUS_STAGES:
+            measured = [times[stage] for stage in stages if stage in times]
+            if measured:
+                parts.append(f"{label} {sum(measured):.0f}ms")
+        if parts:
+            self.statusBar().showMessage(" · ".join(parts))
+
+    def closeEvent(self, event):
+        # 종료 시 풀/캐시 통계를 남기고 저장 큐와 연결을 정리한다
+        try:
+            pipeline = self.warmup.wait("pipeline", timeout=10)
+        except Exception:
+            pipeline = None   # 준비 전에 닫았거나 준비에 실패함
+        if pipeline is not None:
+            pipeline.print_stats()
+        self.thread_pool.waitForDone(3000)
+        if pipeline is not None:
+            pipeline.close()
+        super().closeEvent(event)
 
     def save_to_mysql(self, question, answer):
-        conn = None
-        conn2 = None
-        try:
-            # 1. 현재 시간 구하기
-            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-            # 2. DB 연결
-            conn = pymysql.connect( 
-                host='bitnmeta2.synology.me',
-                user='iyrc',
-                passwd='Dodan1004!',
-                db='gemini_ai',
-                charset='utf8',
-                port=3307,  
-                cursorclass=pymysql.cursors.DictCursor
-            )
+        """질문/답변 저장 (작업자 스레드에서 실행됨) - 안내 HTML이 있으면 반환"""
+        return self.get_pipeline().save_to_mysql(question, answer)
 
-            with conn.cursor() as cursor:
-                sql = "INSERT INTO chat_history (question, answer, create_at) VALUES (%s, %s, %s)"
-                cursor.execute(sql, (question, answer, current_time))
-            
-            conn.commit()
-            print(f"✅ MySQL 저장 성공: {current_time}")
-        
-        except Exception as e:
-            # MySQL Data too long for column -> 에러코드 1406 처리
-            err_str = str(e)
-            print(f"❌ 데이터를 요약하고 있습니다.: {err_str}")
-
-            is_data_too_long = False
-            try:
-                if hasattr(e, 'args') and e.args:
-                    if isinstance(e.args[0], int) and e.args[0] == 1406:
-                        is_data_too_long = True
-                if '1406' in err_str or 'Data too long' in err_str:
-                    is_data_too_long = True
-            except Exception:
-                is_data_too_long = False
-
-            if is_data_too_long:
-                # 기존 연결 안전하게 종료
-                if conn:
-                    try: conn.close()
-                    except: pass
-                    conn = None
-
-                # 요약 시도
-                summarized = None
-                try:
-                    if self.client:
-                        prompt = ("아래 텍스트를 한국어로 500자 이내로 요약해 주세요.\n\n" + str(answer))
-                        summ_resp = self.client.models.generate_content(
-                            model='gemini-2.5-flash',
-                            contents=prompt
-                        )
-                        summarized = summ_resp.text.strip()
-                except Exception as se:
-                    print(f"요약 시도 중 오류: {se}")
-
-                if not summarized:
-                    summarized = str(answer)[:500]
-                if len(summarized) > 500:
-                    summarized = summarized[:500]
-
-                # 재시도: 새 연결로 안전하게 INSERT
-                try:
-                    conn2 = pymysql.connect(
-                        host='bitnmeta2.synology.me',
-                        user='iyrc',
-                        passwd='Dodan1004!',
-                        db='gemini_ai',
-                        charset='utf8',
-                        port=3307,
-                        cursorclass=pymysql.cursors.DictCursor
-                    )
-                    with conn2.cursor() as cursor2:
-                        sql = "INSERT INTO chat_history (question, answer, create_at) VALUES (%s, %s, %s)"
-                        cursor2.execute(sql, (question, summarized, current_time))
-                    conn2.commit()
-                    print(f"✅ MySQL 요약 저장 성공: {current_time}")
-                    
-                    # 사용자에게 알림
-                    notice_html = f"<div style='color:gray;'>원문이 길어 요약(500자 이내)으로 저장했습니다.</div>"
-                    try:
-                        prev_html = self.answerDisplay.toHtml() # 기존 내용 가져오기가 필요 없을땐 생략 가능
-                        self.answerDisplay.setPlainText("")            # 먼저 지우고
-                        self.answerDisplay.setHtml(prev_html + notice_html)
-                    except Exception:
-                        self.answerDisplay.append("원문이 길어 요약(500자 이내)으로 저장했습니다.")
-                        
-                except Exception as re:
-                    print(f"❌ 요약 재저장 실패: {re}")
-        
-        finally:
-            if conn:
-                try: conn.close()
-                except: pass
-            if conn2:
-                try: conn2.close()
-                except: pass
-
-    def search_mysql(self, search_text=None):
+    def search_mysql(self, search_text=None, offset=0):
         """
-        DB 검색 함수(명사 추출 기반 다중 검색).
-        - search_text가 있으면 그것 기반으로 수행.
-        - 없으면 lineEditMyQuestion 내용으로 검색.
-        - konlpy를 이용해 명사를 추출하고, 각 명사를 LIKE 검색 조건으로 사용한다.
+        DB 검색 (작업자 스레드에서 실행됨).
+        - search_text가 없으면 lineEditMyQuestion 내용으로 검색.
+        - 결과가 있으면 (nouns, rows, has_more)를, 없으면 False를 반환한다.
         """
-        if search_text is not None:
-            text = search_text.strip()
-        else:
-            text = self.lineEditMyQuestion.text().strip()
-
-        # ---------------------------
-        # 1) konlpy로 명사 추출
-        # ---------------------------
-        kkma = Kkma()
-        nouns = kkma.nouns(text)
-
-        # 명사가 없으면 원래 단일 검색어로 사용
-        if not nouns:
-            nouns = [text]
-
-        # 너무 짧은(1자) 명사는 보통 의미가 약하므로 필터링(원하면 제거 가능)
-        nouns = [n for n in nouns if len(n) > 1]
-
-
-
-
-        # 명사가 하나도 안 남으면 전체 문장을 사용
-        if not nouns:
-            nouns = [text]
-
-        try:
-            conn = pymysql.connect(
-                host='bitnmeta2.synology.me',
-                user='iyrc',
-                passwd='Dodan1004!',
-                db='gemini_ai',
-                charset='utf8',
-                port=3307,
-                cursorclass=pymysql.cursors.DictCursor
-            )
-
-            with conn.cursor() as cursor:
-                if nouns:
-                    # --------------------------------------------
-                    # 2) 명사들로 다중 LIKE 조건 생성
-                    # --------------------------------------------
-                    # question LIKE '%키워드%' OR answer LIKE '%키워드%'
-                    conditions = []
-                    params = []
-
-                    for n in nouns:
-                        like_n = f"%{n}%"
-                        conditions.append("(question LIKE %s OR answer LIKE %s)")
-                        params.extend([like_n, like_n])
-
-                    where_clause = " OR ".join(conditions)
-
-                    sql = (
-                        "SELECT * "
-                        "FROM chat_history "
-                        f"WHERE {where_clause} "
-                        
-                    )
-
-                    cursor.execute(sql, params)
-
-                else:
-                    return False
-
-            rows = cursor.fetchall()
-            if not rows:
-                return False
-
-            # --- 2차 필터: 명사 80% 이상 겹치는 row만 선별 ---
-            kkma = Kkma()
-            filtered_rows = []
-
-            for row in rows:
-                q_text = str(row.get('question', ''))
-                a_text = str(row.get('answer', ''))
-
-                row_q_n = kkma.nouns(q_text)
-                row_a_n = kkma.nouns(a_text)
-                row_nouns = set([n for n in row_q_n + row_a_n if len(n) > 1])
-
-                # 교집합 개수
-                overlap = len(row_nouns.intersection(set(nouns)))
-
-                # *** 추가: 겹침 비율 계산 ***
-                if len(nouns) > 0:
-                    overlap_ratio = overlap / len(nouns)
-                else:
-                    overlap_ratio = 0
-
-                # *** 조건: 겹침 비율이 0.8 이상일 때만 인정 ***
-                if overlap_ratio >= 0.8:
-                    filtered_rows.append(row)
-
-            
-            # 필터 후 결과 없으면 Gemini 호출로 이동
-            if not filtered_rows:
-                return False
-
-            # 결과 표시
-            lines = []
-            lines.append(
-                f"<div style='color:#8A2BE2; font-weight:bold;'>[DB 검색 응답]</div>"
-                f"<div style='color:gray;'>검색어: {', '.join(nouns)}</div><hr>"
-            )
-
-            for i, row in enumerate(filtered_rows, start=1):
-                print("created_at raw value:", row['created_at'], type(row['created_at']))
-                created = row.get('created_at', '')              
-                # created_at이 None이거나 빈 문자열인 경우 처리
-                if created is None or created == '':
-                    created = "저장된 날짜가 없어서 " + datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                q = row.get('question', '')
-                a = row.get('answer', '')
-                esc_q = html.escape(str(q)).replace('\n', '<br>')
-                esc_a = html.escape(str(a)).replace('\n', '<br>')
-
-                block = (
-                    f"<div style='color:blue; margin-bottom:15px;'>"
-                    f"<div><b>{i}. [{html.escape(str(created))}]</b></div>"
-                    f"<div><b>Q:</b> <span style='color:red;'>{esc_q}</span></div>"
-                    f"<div><b>A:</b> {esc_a}</div>"
-                    f"</div>"
-                )
-                lines.append(block)
-            result_html = "".join(lines)
-            self.answerDisplay.setPlainText("")            # 먼저 지우고
-            self.answerDisplay.setHtml(result_html)
-            return True
-
-        except Exception as e:
-            err = f"DB 검색 중 오류 발생: {e}"
-            print(err)
-            self.answerDisplay.setText(err)
-            return False
+        if search_text is None:
+            search_text = self.lineEditMyQuestion.text()
+        return self.get_pipeline().search_mysql(search_text, offset)
 
-        finally:
-            if 'conn' in locals() and conn:
-                conn.close()
+    def search_fallback(self, question):
+        """Gemini 를 쓸 수 없을 때 대신 보여줄 DB 답변 (작업자 스레드에서 실행됨)"""
+        return self.get_pipeline().search_fallback(question)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = GeminiApp()
     window.show()
+    shown = time.perf_counter() - LAUNCHED_AT
+    get_metrics().record("startup.window_shown", shown)
+    print(f"🪟 실행 후 창 표시까지 {shown:.2f}초")
     sys.exit(app.exec())
\ No newline at end of file
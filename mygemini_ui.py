@@ -0,0 +1,59 @@
+# Form implementation generated from reading ui file 'mygemini.ui'
+#
+# Created by: PyQt6 UI code generator 6.11.0
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic6 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt6 import QtCore, QtGui, QtWidgets
+
+
+class Ui_geminiByNoh(object):
+    def setupUi(self, geminiByNoh):
+        geminiByNoh.setObjectName("geminiByNoh")
+        geminiByNoh.resize(449, 431)
+        icon = QtGui.QIcon()
+        icon.addPixmap(QtGui.QPixmap("search.png"), QtGui.QIcon.Mode.Normal, QtGui.QIcon.State.Off)
+        geminiByNoh.setWindowIcon(icon)
+        geminiByNoh.setIconSize(QtCore.QSize(128, 128))
+        self.centralwidget = QtWidgets.QWidget(parent=geminiByNoh)
+        self.centralwidget.setObjectName("centralwidget")
+        self.label = QtWidgets.QLabel(parent=self.centralwidget)
+        self.label.setGeometry(QtCore.QRect(330, 280, 111, 31))
+        font = QtGui.QFont()
+        font.setFamily("맑은 고딕")
+        font.setPointSize(12)
+        font.setBold(False)
+        font.setWeight(50)
+        self.label.setFont(font)
+        self.label.setObjectName("label")
+        self.btnSent = QtWidgets.QPushButton(parent=self.centralwidget)
+        self.btnSent.setEnabled(False)
+        self.btnSent.setGeometry(QtCore.QRect(310, 370, 91, 31))
+        self.btnSent.setObjectName("btnSent")
+        self.answerDisplay = QtWidgets.QTextBrowser(parent=self.centralwidget)
+        self.answerDisplay.setGeometry(QtCore.QRect(10, 10, 281, 361))
+        self.answerDisplay.setObjectName("answerDisplay")
+        self.label_2 = QtWidgets.QLabel(parent=self.centralwidget)
+        self.label_2.setGeometry(QtCore.QRect(300, 320, 101, 91))
+        self.label_2.setText("")
+        self.label_2.setPixmap(QtGui.QPixmap("G:/내 드라이브/90. 우송대학교/43. 로고/3D캐릭터예진이.PNG"))
+        self.label_2.setScaledContents(True)
+        self.label_2.setObjectName("label_2")
+        self.lineEditMyQuestion = QtWidgets.QLineEdit(parent=self.centralwidget)
+        self.lineEditMyQuestion.setGeometry(QtCore.QRect(10, 380, 281, 31))
+        self.lineEditMyQuestion.setObjectName("lineEditMyQuestion")
+        geminiByNoh.setCentralWidget(self.centralwidget)
+
+        self.retranslateUi(geminiByNoh)
+        QtCore.QMetaObject.connectSlotsByName(geminiByNoh)
+
+    def retranslateUi(self, geminiByNoh):
+        _translate = QtCore.QCoreApplication.translate
+        geminiByNoh.setWindowTitle(_translate("geminiByNoh", "MainWindow"))
+        self.label.setText(_translate("geminiByNoh", "안녕! 써니에요~~"))
+        self.btnSent.setText(_translate("geminiByNoh", "보내기"))
+
+
+UI_SOURCE_SHA1 = "fc62bd9a111f01d1e3e052804d70d64149b7087b"
@@ -0,0 +1,145 @@
+# Kkma 형태소 분석기 싱글톤 + 명사 추출 결과 캐시
+# Kkma는 생성(JVM 로딩)과 분석 모두 느리므로 프로세스 전체에서 하나만 만들어 쓰고,
+# 같은 텍스트의 명사 추출 결과는 LRU 캐시(디스크에 저장)에서 바로 돌려준다.
+import atexit
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+NOUN_CACHE_SIZE = int(os.getenv("NOUN_CACHE_SIZE", "20000"))   # 캐시에 보관할 최대 텍스트 수
+NOUN_CACHE_FILE = os.getenv(
+    "NOUN_CACHE_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "noun_cache.json"))
+NOUN_CACHE_SAVE_EVERY = 200   # 새로 분석한 텍스트가 이만큼 쌓이면 디스크에 저장
+
+
+def text_key(text):
+    """캐시 키: 텍스트의 sha1 해시 (긴 답변도 키 크기가 일정하다)"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class NounExtractor:
+    """
+    Kkma 하나를 공유하면서 nouns() 결과를 메모이제이션한다.
+    - Kkma는 처음 필요할 때(또는 warm_up() 호출 시) 한 번만 만든다.
+    - JVM 호출은 lock으로 한 번에 하나씩만 실행한다 (작업자 스레드 여러 개에서 호출됨).
+    - 캐시는 크기 제한이 있는 LRU이며 cache_file에 JSON으로 저장/복원된다.
+    """
+
+    def __init__(self, max_size=NOUN_CACHE_SIZE, cache_file=NOUN_CACHE_FILE, kkma_factory=None):
+        self.max_size = max_size
+        self.cache_file = cache_file
+        self._kkma_factory = kkma_factory
+        self._kkma = None
+        self._kkma_lock = threading.Lock()     # Kkma 생성/분석용
+        self._cache_lock = threading.Lock()    # 캐시/통계용
+        self._cache = OrderedDict()            # text_key -> [명사, ...]
+        self._dirty = 0
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    # ------------------------------------------------------------
+    # Kkma
+    # ------------------------------------------------------------
+    def _get_kkma(self):
+        if self._kkma is None:
+            if self._kkma_factory is None:
+                from konlpy.tag import Kkma   # JVM을 띄우므로 실제로 필요할 때만 임포트
+                self._kkma_factory = Kkma
+            self._kkma = self._kkma_factory()
+        return self._kkma
+
+    def warm_up(self):
+        """Kkma 생성 + 첫 분석(사전 로딩)을 미리 해 둔다."""
+        with self._kkma_lock:
+            self._get_kkma().nouns("형태소 분석기 준비")
+
+    # ------------------------------------------------------------
+    # 명사 추출
+    # ------------------------------------------------------------
+    def nouns(self, text):
+        """kkma.nouns(text)와 같은 결과를 돌려준다 (캐시에 있으면 분석하지 않음)."""
+        text = str(text)
+        key = text_key(text)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return list(cached)
+            self.misses += 1
+
+        with self._kkma_lock:
+            result = list(self._get_kkma().nouns(text))
+
+        with self._cache_lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+            self._dirty += 1
+            need_save = self._dirty >= NOUN_CACHE_SAVE_EVERY
+        if need_save:
+            self.save()
+        return list(result)
+
+    def stats(self):
+        with self._cache_lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / total) if total else 0.0,
+                'size': len(self._cache),
+                'max_size': self.max_size,
+            }
+
+    # ------------------------------------------------------------
+    # 디스크 저장 / 복원
+    # ------------------------------------------------------------
+    def _load(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # 파일에는 오래된 것 → 최근 것 순서로 저장되어 있다
+            for key, value in data.items():
+                self._cache[key] = value
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        except Exception as e:
+            print(f"명사 캐시 파일을 읽지 못했습니다: {e}")
+            self._cache.clear()
+
+    def save(self):
+        if not self.cache_file:
+            return
+        with self._cache_lock:
+            if not self._dirty:
+                return
+            snapshot = dict(self._cache)
+            self._dirty = 0
+        tmp_path = self.cache_file + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_file)   # 저장 도중 종료돼도 기존 파일은 깨지지 않는다
+        except Exception as e:
+            print(f"명사 캐시 저장 실패: {e}")
+
+
+_extractor = None
+_extractor_lock = threading.Lock()
+
+
+def get_extractor():
+    """프로세스 공용 NounExtractor (처음 호출할 때 만든다)"""
+    global _extractor
+    with _extractor_lock:
+        if _extractor is None:
+            _extractor = NounExtractor()
+            atexit.register(_extractor.save)
+        return _extractor
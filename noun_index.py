@@ -0,0 +1,95 @@
+# chat_history 역색인(명사 → 행) 관리
+# 저장할 때 한 번만 명사를 뽑아 chat_history_nouns 테이블에 넣어 두고,
+# 검색할 때는 LIKE 전체 스캔 + 행마다 재분석 대신 색인 테이블에서 집계 쿼리 한 번으로
+# "질문 명사 중 몇 개가 겹치는지"를 계산한다.
+import threading
+
+NOUN_MAX_LEN = 100          # chat_history_nouns.noun 컬럼 길이
+BACKFILL_BATCH = 500        # 기존 행 색인 시 한 번에 처리할 행 수
+# 색인할 명사(2자 이상)가 하나도 없는 행에 넣는 표시 - 검색어 명사와는 절대 겹치지 않고,
+# 백필이 이 행을 '아직 색인 안 됨'으로 보고 시작할 때마다 다시 분석하지 않게 한다
+NO_NOUNS_MARKER = ""
+
+SCHEMA_SQL = (
+    "CREATE TABLE IF NOT EXISTS chat_history_nouns ("
+    "  history_id INT NOT NULL,"
+    f"  noun VARCHAR({NOUN_MAX_LEN}) NOT NULL,"
+    "  PRIMARY KEY (noun, history_id),"
+    "  KEY idx_history_id (history_id)"
+    ") DEFAULT CHARSET=utf8mb4"
+)
+
+
+def row_nouns(extractor, question, answer):
+    """행의 질문+답변에서 색인할 명사 집합 (search_mysql 의 2차 필터와 같은 기준: 2자 이상)"""
+    nouns = extractor.nouns(str(question or '')) + extractor.nouns(str(answer or ''))
+    return sorted({n[:NOUN_MAX_LEN] for n in nouns if len(n) > 1})
+
+
+class NounIndex:
+    """
+    chat_history_nouns 테이블을 채운다. (조회는 RankedSearch 가 이 테이블로 한다)
+    - ensure_schema(): 테이블이 없으면 만든다.
+    - index_row()    : 저장이 커밋된 뒤 저장 후처리(_after_saved)에서 별도 연결로 호출한다.
+                       색인하기 전에 실패/종료하면 그 행은 다음 백필이 채운다.
+    - backfill()     : 아직 색인되지 않은 기존 행을 채운다. 끝나면 ready 가 True 가 된다.
+    ready 가 False 인 동안(백필 전/실패)에는 호출하는 쪽이 기존 LIKE 검색을 사용한다.
+    """
+
+    def __init__(self, pool, extractor):
+        self.pool = pool
+        self.extractor = extractor
+        self.ready = False
+        self._backfill_lock = threading.Lock()
+
+    def ensure_schema(self):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(SCHEMA_SQL)
+            conn.commit()
+
+    def index_row(self, cursor, history_id, question, answer):
+        nouns = row_nouns(self.extractor, question, answer)
+        cursor.executemany(
+            "INSERT IGNORE INTO chat_history_nouns (history_id, noun) VALUES (%s, %s)",
+            [(history_id, n) for n in nouns or [NO_NOUNS_MARKER]]
+        )
+        return len(nouns)
+
+    def backfill(self, batch_size=BACKFILL_BATCH):
+        """색인되지 않은 chat_history 행을 id 순서로 색인한다. 처리한 행 수를 반환한다."""
+        with self._backfill_lock:
+            self.ensure_schema()
+            done = 0
+            last_id = 0
+            while True:
+                with self.pool.connection() as conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute(
+                            "SELECT h.id, h.question, h.answer FROM chat_history h "
+                            "WHERE h.id > %s AND NOT EXISTS "
+                            "(SELECT 1 FROM chat_history_nouns n WHERE n.history_id = h.id) "
+                            "ORDER BY h.id LIMIT %s",
+                            (last_id, batch_size)
+                        )
+                        rows = cursor.fetchall()
+                        for row in rows:
+                            self.index_row(cursor, row['id'], row['question'], row['answer'])
+                    conn.commit()
+                if not rows:
+                    break
+                done += len(rows)
+                last_id = rows[-1]['id']
+                print(f"🔎 명사 색인 백필: {done}행 완료")
+            self.ready = True
+            return done
+
+
+if __name__ == "__main__":
+    # 기존 chat_history 전체를 한 번에 색인: python noun_index.py
+    from db_pool import get_pool
+    from noun_cache import get_extractor
+
+    index = NounIndex(get_pool(), get_extractor())
+    count = index.backfill()
+    print(f"✅ 색인 완료: {count}행")
@@ -0,0 +1,612 @@
+# 질문 처리 파이프라인 (DB 검색 → Gemini 생성 → DB 저장) - GUI 없이 쓸 수 있는 핵심 부분
+# mygemini.py(GeminiApp)와 batch_runner.py(명령줄 일괄 처리)가 같은 파이프라인을 사용한다.
+import os
+import threading
+import time
+from datetime import datetime
+
+from db_pool import get_pool
+from noun_cache import get_extractor
+from noun_index import NounIndex
+from ranked_search import RankedSearch, SEARCH_PAGE_SIZE
+from exact_cache import ExactMatchStore, question_key
+from write_behind import WriteBehindQueue
+from answer_store import AnswerStore
+from metrics import get_metrics, span
+from resilient_gemini import ResilientGemini
+from conversation import ConversationContext, CONTEXT_SEED, CONVERSATION_MODE
+from local_replica import LocalReplica
+
+# Gemini 를 쓸 수 없을 때(장애/제한 시간 초과) DB 답변을 찾는 명사 겹침 기준 (평소 0.8)
+FALLBACK_MIN_RATIO = float(os.getenv("FALLBACK_MIN_RATIO", "0.5"))
+
+# 저장 방식: WRITE_BEHIND=0 이면 답변마다 바로 DB에 저장합니다.
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "1") != "0"
+# 검색 저장소: mysql(원격에서 바로 검색) | replica(로컬 SQLite 복제본에서 검색, 쓰기만 원격으로)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mysql")
+# LONG_ANSWER_SUMMARY=1 이면 긴 답변 저장 후 백그라운드에서 answer 미리보기를 요약문으로 바꿉니다.
+LONG_ANSWER_SUMMARY = os.getenv("LONG_ANSWER_SUMMARY", "0") == "1"
+# 의미 캐시(semantic_cache.py, NumPy 사용)는 SEMANTIC_CACHE=1 일 때만 불러온다 (시작 시간에 NumPy 로딩이 들지 않도록)
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "0") == "1"
+SEMANTIC_EMBEDDER = os.getenv("SEMANTIC_EMBEDDER", "hashing")
+
+
+def _start_thread(fn):
+    threading.Thread(target=fn, daemon=True).start()
+
+
+class QAPipeline:
+    """
+    검색/생성/저장에 필요한 DB 풀, 형태소 분석기, 색인, 캐시, 저장 큐를 한데 묶은 객체.
+    - client        : genai.Client (없으면 생성 단계를 쓸 수 없다) - 호출은 ResilientGemini 로 감싼다
+    - run_background: 준비 작업을 실행할 함수 (GUI는 QThreadPool.start, 기본은 데몬 스레드)
+    - pool / extractor: 벤치마크 등에서 DB 풀과 형태소 분석기를 바꿔 끼울 때 사용 (기본은 공용 객체)
+    - gemini        : 미리 만든 ResilientGemini (동시 호출 수/요청 수 제한을 바꿀 때, 기본은 client 로 새로 만든다)
+    - conversation  : True 면 앞선 대화를 토큰 예산 안에서 붙여 보낸다 (기본 CONVERSATION_MODE)
+    - storage       : 'mysql' 또는 'replica' (기본 STORAGE_BACKEND) - 검색을 어느 저장소에서 할지
+    search_mysql / generate_answer / stream_answer / save_to_mysql 는 작업자 스레드에서 호출된다.
+    """
+
+    def __init__(self, client, run_background=None, write_behind=WRITE_BEHIND,
+                 pool=None, extractor=None, conversation=CONVERSATION_MODE, storage=STORAGE_BACKEND, gemini=None):
+        self.client = client
+        # 제한 시간 / 재시도 / 같은 질문 묶기 / 회로 차단기 (차단되면 GeminiUnavailable → search_fallback)
+        self.gemini = gemini or ResilientGemini(client)
+        self.run_background = run_background or _start_thread
+
+        # DB 연결은 공용 커넥션 풀에서 빌려 쓴다 (질문마다 새로 접속하지 않음) - 첫 연결은 미리 열어 둔다
+        self.db_pool = pool or get_pool()
+        self.run_background(self.warm_up_db)
+
+        # (선택) 대화 모드: 최근 대화 + 이전 대화 요약을 질문 앞에 붙인다
+        # CONTEXT_SEED=1 이면 시작할 때 최근 chat_history 로 채운다 (DB 를 혼자 쓸 때만 - 다른 사람의 대화가 섞인다)
+        self.conversation = None
+        if conversation:
+            self.conversation = ConversationContext(self.gemini, self.run_background)
+            if CONTEXT_SEED:
+                self.run_background(self.seed_conversation)
+
+        # 형태소 분석기는 프로세스 전체에서 하나만 쓰고, 미리 백그라운드에서 준비해 둔다
+        self.noun_extractor = extractor or get_extractor()
+        self.run_background(self.noun_extractor.warm_up)
+
+        # chat_history 명사 역색인: 기존 행 백필이 끝나면 검색이 색인 테이블을 사용한다
+        self.noun_index = NounIndex(self.db_pool, self.noun_extractor)
+        self.ranked_search = RankedSearch(self.db_pool)
+
+        # 완전히 같은 질문은 형태소 분석/검색 전에 해시(LRU → question_hash 인덱스)로 바로 찾는다
+        self.exact_store = ExactMatchStore(self.db_pool)
+        self.run_background(self.prepare_exact_match)
+
+        # 컬럼보다 긴 답변은 요약하지 않고 chat_answer_parts 에 나눠서 그대로 저장한다
+        self.answer_store = AnswerStore(self.db_pool)
+        self.run_background(self.prepare_answer_store)
+
+        # (선택) 로컬 읽기 복제본: 검색은 로컬 SQLite 에서 하고, 원격과는 백그라운드에서 동기화한다
+        # 원격에 접속할 수 없어도 복제본으로 검색하고, 저장은 write-behind 스풀에 모아 둔다.
+        self.replica = None
+        if storage == "replica":
+            try:
+                self.replica = LocalReplica(self.db_pool, self.noun_extractor, lru=self.exact_store.lru)
+                self.run_background(self.replica.start)
+            except Exception as e:
+                print(f"❌ 로컬 복제본을 열 수 없어 원격 DB 에서 검색합니다: {e}")
+
+        # 저장은 write-behind 큐로: 로컬 스풀에 먼저 기록하고 백그라운드에서 묶어서 DB에 넣는다
+        # WRITE_BEHIND=0 이면 기존처럼 답변 직후 바로 저장한다. (복제본을 쓰면 오프라인 저장을 위해 항상 큐를 쓴다)
+        self.write_queue = None
+        if write_behind or self.replica is not None:
+            try:
+                self.write_queue = WriteBehindQueue(self._insert_history_batch, self._save_queued_row,
+                                                    on_saved=self._after_saved_batch,
+                                                    prepare_fn=self.prepare_storage)
+            except Exception as e:
+                print(f"❌ 저장 스풀을 열 수 없어 바로 저장합니다: {e}")
+
+        # (선택) 의미 기반 답변 캐시: SEMANTIC_CACHE=1 일 때 명사 검색에 없으면 비슷한 질문을 찾는다
+        # gemini 임베딩은 클라이언트가 필요하므로 클라이언트가 나중에 오면 set_client() 에서 만든다
+        self.semantic_cache = None
+        if SEMANTIC_CACHE and (client is not None or SEMANTIC_EMBEDDER != "gemini"):
+            self._open_semantic_cache()
+        self.run_background(self.backfill_noun_index)
+
+    def set_client(self, client):
+        """(빠른 시작) 백그라운드에서 만든 Gemini 클라이언트를 나중에 넣는다."""
+        self.client = client
+        self.gemini.client = client
+        if self.semantic_cache is None and client is not None:
+            self._open_semantic_cache()
+
+    def _open_semantic_cache(self):
+        if not SEMANTIC_CACHE:
+            return
+        try:
+            import semantic_cache
+            embedder = semantic_cache.make_embedder(client=self.client)
+            self.semantic_cache = semantic_cache.SemanticCache(embedder)
+        except Exception as e:
+            print(f"❌ 의미 캐시를 사용할 수 없습니다: {e}")
+
+    def generate_answer(self, question):
+        """Gemini API 호출 (작업자 스레드에서 실행됨)"""
+        with span("gemini.generate"):
+            if self.conversation is not None:
+                contents, config = self.conversation.build(question)
+                return self.gemini.generate(contents, config=config)
+            return self.gemini.generate(question)
+
+    def stream_answer(self, question):
+        """Gemini 스트리밍 API 호출 - 응답 조각(텍스트)을 차례로 돌려준다. (작업자 스레드에서 실행됨)"""
+        metrics = get_metrics()
+        started = time.perf_counter()
+        first_chunk = True
+        ok = False
+        try:
+            if self.conversation is not None:
+                contents, config = self.conversation.build(question)
+                chunks = self.gemini.stream(contents, config=config)
+            else:
+                chunks = self.gemini.stream(question)
+            for chunk in chunks:
+                if chunk.text:
+                    if first_chunk:
+                        metrics.record("gemini.first_chunk", time.perf_counter() - started)
+                        first_chunk = False
+                    yield chunk.text
+            ok = True
+        finally:
+            # 중간에 취소되면(제너레이터 종료) ok=False 로 기록된다
+            metrics.record("gemini.stream", time.perf_counter() - started, ok=ok)
+
+    # ------------------------------------------------------------
+    # 준비 작업 / 저장 후처리
+    # ------------------------------------------------------------
+    def warm_up_db(self):
+        """DB 연결 하나를 미리 열어 둔다 (작업자 스레드에서 실행됨)"""
+        try:
+            self.db_pool.warm_up()
+        except Exception as e:
+            print(f"❌ DB 연결 준비 실패 - 첫 질문 때 다시 연결합니다: {e}")
+
+    def seed_conversation(self):
+        """최근 대화로 대화 모드를 시작한다 (작업자 스레드에서 실행됨)"""
+        try:
+            self.conversation.seed(self.db_pool)
+        except Exception as e:
+            print(f"최근 대화를 불러오지 못했습니다 - 새 대화로 시작합니다: {e}")
+
+    def backfill_noun_index(self):
+        """기존 chat_history 행을 명사 색인에 채운다 (작업자 스레드에서 실행됨)"""
+        try:
+            count = self.noun_index.backfill()
+            print(f"✅ 명사 색인 준비 완료 (새로 색인한 행: {count})")
+        except Exception as e:
+            print(f"❌ 명사 색인 백필 실패 - LIKE 검색을 계속 사용합니다: {e}")
+            return
+        try:
+            mode = self.ranked_search.ensure_ranking()
+            print(f"✅ 검색 순위 방식: {mode}")
+        except Exception as e:
+            print(f"❌ 검색 순위 준비 실패: {e}")
+
+    def prepare_exact_match(self):
+        """question_hash 컬럼을 준비하고 기존 행의 해시를 채운다 (작업자 스레드에서 실행됨)"""
+        try:
+            self.exact_store.ensure_schema()
+            count = self.exact_store.backfill()
+            print(f"✅ 질문 해시 준비 완료 (새로 채운 행: {count})")
+        except Exception as e:
+            print(f"❌ 질문 해시 준비 실패 - 메모리 캐시만 사용합니다: {e}")
+
+    def prepare_answer_store(self, refresh=False):
+        """답변 조각 테이블을 준비하고 answer 컬럼 길이를 읽어 온다 (작업자 스레드에서 실행됨)"""
+        try:
+            limit = self.answer_store.ensure_schema(refresh)
+            print(f"✅ 답변 저장소 준비 완료 (answer 컬럼 {limit}자 초과분은 나눠 저장)")
+        except Exception as e:
+            print(f"❌ 답변 조각 테이블 준비 실패: {e}")
+
+    def prepare_storage(self):
+        """저장할 때 테이블/컬럼이 없다는 오류가 나면 write-behind 큐가 다시 시도하기 전에 부른다"""
+        self.prepare_exact_match()
+        self.prepare_answer_store(refresh=True)
+
+    def summarize_preview(self, history_id, answer):
+        """
+        (선택, LONG_ANSWER_SUMMARY=1) 긴 답변의 answer 컬럼 미리보기를 요약문으로 바꾼다.
+        전체 답변은 이미 조각으로 저장되어 있으므로 실패해도 잃는 것은 없다. (작업자 스레드에서 실행됨)
+        """
+        try:
+            prompt = (f"아래 텍스트를 한국어로 {self.answer_store.inline_limit}자 이내로 요약해 주세요.\n\n"
+                      + str(answer))
+            summarized = self.answer_store.fit(self.gemini.generate(prompt).strip())
+            with self.db_pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("UPDATE chat_history SET answer = %s WHERE id = %s", (summarized, history_id))
+                conn.commit()
+            print(f"✅ 긴 답변 미리보기를 요약문으로 교체 (id={history_id})")
+        except Exception as e:
+            print(f"요약 미리보기 갱신 실패 (id={history_id}): {e}")
+
+    def index_saved_row(self, history_id, question, answer):
+        """방금 저장한 행을 명사 색인에 추가한다. 실패해도 다음 백필에서 다시 채워진다."""
+        if not history_id:
+            return
+        try:
+            with self.db_pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    self.noun_index.index_row(cursor, history_id, question, answer)
+                conn.commit()
+        except Exception as e:
+            print(f"❌ 명사 색인 추가 실패 (id={history_id}): {e}")
+
+    def add_pending_to_replica(self, question, answer, created_at):
+        try:
+            self.replica.add_pending(question, answer, created_at)
+        except Exception as e:
+            print(f"❌ 로컬 복제본에 답변을 먼저 넣지 못했습니다 (동기화 때 들어옵니다): {e}")
+
+    def apply_to_replica(self, history_id, question, answer, created_at):
+        try:
+            self.replica.apply_saved(history_id, question, answer, created_at)
+        except Exception as e:
+            print(f"❌ 로컬 복제본 반영 실패 (다음 동기화 때 들어옵니다): {e}")
+
+    def add_to_semantic_cache(self, history_id, question, answer, created_at):
+        if self.semantic_cache is None:
+            return
+        try:
+            self.semantic_cache.add(history_id, question, answer, created_at)
+        except Exception as e:
+            print(f"❌ 의미 캐시 추가 실패: {e}")
+
+    def search_semantic(self, text):
+        """의미 캐시에서 비슷한 질문을 찾아 search_mysql 결과 형식의 행 목록으로 돌려준다."""
+        if self.semantic_cache is None:
+            return []
+        try:
+            matches = self.semantic_cache.lookup(text)
+        except Exception as e:
+            print(f"❌ 의미 캐시 조회 실패: {e}")
+            return []
+        return [dict(entry, similarity=similarity) for similarity, entry in matches]
+
+    # ------------------------------------------------------------
+    # 통계 / 종료
+    # ------------------------------------------------------------
+    def print_stats(self):
+        stats = self.db_pool.stats()
+        print(f"📊 DB 풀 통계: 연결 {stats['checkouts']}회 (재사용률 {stats['reuse_rate']:.0%}), "
+              f"새 연결 {stats['created']}개, 평균 대기 {stats['wait_avg'] * 1000:.1f}ms, "
+              f"최대 대기 {stats['wait_max'] * 1000:.1f}ms")
+        exact_stats = self.exact_store.lru.stats()
+        print(f"📊 같은 질문 캐시: 메모리 적중 {exact_stats['hits']}회, DB 적중 {self.exact_store.db_hits}회")
+        noun_stats = self.noun_extractor.stats()
+        print(f"📊 명사 캐시: hit {noun_stats['hits']} / miss {noun_stats['misses']} "
+              f"(적중률 {noun_stats['hit_rate']:.0%}, {noun_stats['size']}개 보관)")
+        if self.semantic_cache is not None:
+            sc_stats = self.semantic_cache.stats()
+            print(f"📊 의미 캐시: {sc_stats['entries']}개, 적중률 {sc_stats['hit_rate']:.0%}")
+        gemini_stats = self.gemini.stats
+        print(f"📊 Gemini 호출: {gemini_stats['calls']}회, 재시도 {gemini_stats['retries']}회, "
+              f"시간 초과 {gemini_stats['timeouts']}회, 같은 질문 묶음 {gemini_stats['shared']}회, "
+              f"차단 {gemini_stats['rejected']}회 (회로 {self.gemini.breaker.state})")
+        if self.conversation is not None:
+            conv_stats = self.conversation.stats
+            print(f"📊 대화 맥락: 요청 {conv_stats['requests']}회 (캐시 사용 {conv_stats['cached_requests']}회), "
+                  f"보관 {conv_stats['archived_turns']}턴, 요약 {conv_stats['summaries']}회 ({conv_stats['evicted_turns']}턴), "
+                  f"캐시 생성 {conv_stats['caches_created']}회")
+        if self.replica is not None:
+            try:
+                r_stats = self.replica.stats()
+                print(f"📊 로컬 복제본: {r_stats['rows']}행 (대기 {r_stats['pending']}행), "
+                      f"워터마크 id={r_stats['last_id']}, 마지막 동기화 {r_stats['synced_at'] or '-'}"
+                      + ("" if r_stats['online'] else " - 오프라인"))
+            except Exception as e:
+                print(f"로컬 복제본 통계를 읽지 못했습니다: {e}")
+        get_metrics().print_summary()
+
+    def close(self, drain_timeout=5.0):
+        """
+        저장 큐를 비우고(drain_timeout 초 안에 못 넣은 것은 스풀에 남김) 캐시를 저장한 뒤 DB 연결을 정리한다.
+        스풀에 남은 항목 수를 반환한다.
+        """
+        pending = 0
+        if self.write_queue is not None:
+            pending = self.write_queue.close(drain_timeout)
+            if pending:
+                print(f"⏳ 저장하지 못한 {pending}건은 스풀에 남겨 다음 실행 때 저장합니다.")
+        if self.conversation is not None:
+            self.conversation.close()
+        self.gemini.close()
+        if self.replica is not None:
+            self.replica.close()
+        self.noun_extractor.save()
+        self.db_pool.close()
+        get_metrics().close()
+        return pending
+
+    def save_to_mysql(self, question, answer):
+        """
+        질문/답변을 chat_history에 저장한다. (작업자 스레드에서 실행됨)
+        - write-behind 큐를 쓰면 로컬 스풀에 기록만 하고 바로 돌아간다 (DB 저장은 백그라운드에서 묶어서).
+        - 화면에 덧붙일 안내 HTML이 있으면 반환하고, 없으면 None을 반환한다.
+        """
+        if self.conversation is not None:
+            self.conversation.remember(question, answer)
+
+        # 1. 현재 시간 구하기
+        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if self.write_queue is not None:
+            try:
+                with span("save.enqueue"):
+                    self.write_queue.enqueue(question, answer, current_time)
+                if self.replica is not None:
+                    # 원격에 들어가기 전에도 다음 검색에서 보이도록 복제본에 먼저 넣는다
+                    self.run_background(lambda: self.add_pending_to_replica(question, answer, current_time))
+                return None
+            except Exception as e:
+                print(f"❌ 저장 스풀 기록 실패 - 바로 저장합니다: {e}")
+
+        try:
+            # 2. 풀에서 연결을 빌려 저장
+            with span("save.insert", answer_len=len(answer)):
+                saved = self._save_row(question, answer, current_time)
+            self._after_saved(*saved)
+        except Exception as e:
+            print(f"❌ MySQL 저장 실패: {e}")
+        return None
+
+    def _save_row(self, question, answer, current_time):
+        """
+        한 행을 바로 저장한다. 반환: (history_id, question, answer, current_time)
+        컬럼보다 긴 답변은 answer_store 가 조각으로 나눠 전체를 그대로 저장한다. 오류는 호출한 쪽으로 올린다.
+        """
+        history_id = self._insert_history(question, answer, current_time)
+        print(f"✅ MySQL 저장 성공: {current_time}")
+        return history_id, question, answer, current_time
+
+    def _save_queued_row(self, entry):
+        """write-behind 큐의 한 건씩 저장 경로 (묶음 저장이 실패했을 때)"""
+        return self._save_row(*entry)
+
+    def _insert_history_batch(self, entries):
+        """
+        write-behind 큐의 묶음 저장: entries [(question, answer, created_at), ...] 를 executemany 로 넣고
+        한 번 커밋한다. 저장된 행 [(history_id, question, answer, created_at), ...] 를 반환한다.
+        """
+        split = [self.answer_store.split(a) for _, a, _ in entries]
+        with span("save.batch", rows=len(entries)), self.db_pool.connection() as conn:
+            with conn.cursor() as cursor:
+                # 같은 트랜잭션 안에서 읽으므로 watermark 이후 보이는 행은 이번에 넣은 행뿐이다
+                cursor.execute("SELECT COALESCE(MAX(id), 0) AS max_id FROM chat_history")
+                watermark = cursor.fetchone()['max_id']
+                if self.exact_store.ready:
+                    sql = ("INSERT INTO chat_history (question, answer, create_at, question_hash) "
+                           "VALUES (%s, %s, %s, %s)")
+                    cursor.executemany(sql, [(q, preview, c, question_key(q))
+                                             for (q, _, c), (preview, _) in zip(entries, split)])
+                else:
+                    sql = "INSERT INTO chat_history (question, answer, create_at) VALUES (%s, %s, %s)"
+                    cursor.executemany(sql, [(q, preview, c) for (q, _, c), (preview, _) in zip(entries, split)])
+                cursor.execute("SELECT id FROM chat_history WHERE id > %s ORDER BY id", (watermark,))
+                ids = [row['id'] for row in cursor.fetchall()]
+                if len(ids) != len(entries):
+                    if any(parts for _, parts in split):
+                        # 조각을 붙일 행을 알 수 없으면 커밋하지 않고 한 건씩 저장 경로로 넘긴다
+                        raise RuntimeError("묶음 저장된 행의 id 를 확인할 수 없습니다.")
+                    ids = [None] * len(entries)   # id 를 맞출 수 없으면 색인은 다음 백필에 맡긴다
+                for history_id, (_, parts) in zip(ids, split):
+                    self.answer_store.write_parts(cursor, history_id, parts)
+            conn.commit()
+        return [(history_id, q, a, c) for history_id, (q, a, c) in zip(ids, entries)]
+
+    def _after_saved_batch(self, saved_rows):
+        for row in saved_rows:
+            self._after_saved(*row)
+
+    def _insert_history(self, question, answer, current_time):
+        """
+        chat_history 에 한 행을 넣고 새 id 를 반환한다. question_hash 컬럼이 준비됐으면 함께 저장한다.
+        긴 답변은 answer 컬럼에 앞부분만 넣고 전체를 chat_answer_parts 에 같은 트랜잭션으로 저장한다.
+        """
+        preview, parts = self.answer_store.split(answer)
+        with self.db_pool.connection() as conn:
+            with conn.cursor() as cursor:
+                if self.exact_store.ready:
+                    sql = ("INSERT INTO chat_history (question, answer, create_at, question_hash) "
+                           "VALUES (%s, %s, %s, %s)")
+                    cursor.execute(sql, (question, preview, current_time, question_key(question)))
+                else:
+                    sql = "INSERT INTO chat_history (question, answer, create_at) VALUES (%s, %s, %s)"
+                    cursor.execute(sql, (question, preview, current_time))
+                history_id = cursor.lastrowid
+                self.answer_store.write_parts(cursor, history_id, parts)
+            conn.commit()
+        return history_id
+
+    def _after_saved(self, history_id, question, answer, current_time):
+        """저장 직후 색인/캐시 갱신 (실패해도 저장 자체는 유지된다)"""
+        self.exact_store.remember(history_id, question, answer, current_time)
+        if LONG_ANSWER_SUMMARY and history_id and self.client and self.answer_store.is_long(answer):
+            self.run_background(lambda: self.summarize_preview(history_id, answer))
+        with span("save.index"):
+            self.index_saved_row(history_id, question, answer)
+        if self.replica is not None:
+            with span("save.replica"):
+                self.apply_to_replica(history_id, question, answer, current_time)
+        if self.semantic_cache is not None:
+            with span("save.semantic"):
+                self.add_to_semantic_cache(history_id, question, answer, current_time)
+
+    def search_mysql(self, search_text, offset=0):
+        """
+        DB 검색 함수(명사 추출 기반 다중 검색).
+        - konlpy를 이용해 명사를 추출하고, chat_history_nouns 역색인에서 명사가 80% 이상 겹치는 행을 찾는다.
+          (색인 백필이 끝나기 전에는 각 명사를 LIKE 검색 조건으로 사용한다.)
+        - 결과는 관련도 순으로 offset 부터 SEARCH_PAGE_SIZE 개씩 가져온다.
+          결과가 있으면 (nouns, rows, has_more)를, 없으면 False를 반환한다.
+        각 단계(search.exact / tokenize / retrieve / filter / semantic / attach)의 소요 시간은 metrics 에 기록된다.
+        """
+        with span("search", offset=offset) as info:
+            found = self._search(str(search_text).strip(), offset)
+            info['hit'] = bool(found)
+        return found
+
+    def search_fallback(self, search_text):
+        """
+        Gemini 를 쓸 수 없을 때(GeminiUnavailable) DB 답변만으로 응답하기 위한 검색.
+        명사 겹침 기준을 FALLBACK_MIN_RATIO 로 낮춰 첫 페이지만 찾는다. 없으면 False.
+        """
+        with span("search.fallback") as info:
+            found = self._search(str(search_text).strip(), 0, min_ratio=FALLBACK_MIN_RATIO)
+            info['hit'] = bool(found)
+        if not found:
+            return False
+        nouns, rows, _ = found
+        # 다음 페이지(search_mysql)는 평소 기준으로 찾으므로 이어 붙이지 않는다
+        return nouns + ["Gemini 사용 불가 - 비슷한 저장 답변"], rows, False
+
+    def _read_store(self):
+        """검색할 저장소: 한 번이라도 동기화된 로컬 복제본이 있으면 복제본, 아니면 원격 MySQL (속성 이름이 같다)"""
+        if self.replica is not None and self.replica.ready:
+            return self.replica
+        return self
+
+    def _search(self, text, offset, min_ratio=0.8):
+        store = self._read_store()
+
+        # ---------------------------
+        # 0) 완전히 같은 질문이 저장돼 있으면 형태소 분석 없이 바로 반환
+        # ---------------------------
+        if offset == 0 and text:
+            try:
+                with span("search.exact"):
+                    row = store.exact_store.lookup(text)
+                if row:
+                    store.answer_store.attach_full_answers([row])
+                    return ["같은 질문"], [row], False
+            except Exception as e:
+                print(f"같은 질문 조회 중 오류 (명사 검색으로 진행): {e}")
+
+        # ---------------------------
+        # 1) konlpy로 명사 추출 (공용 Kkma + 캐시)
+        # ---------------------------
+        with span("search.tokenize"):
+            nouns = self.noun_extractor.nouns(text)
+
+        # 명사가 없으면 원래 단일 검색어로 사용
+        if not nouns:
+            nouns = [text]
+
+        # 너무 짧은(1자) 명사는 보통 의미가 약하므로 필터링(원하면 제거 가능)
+        nouns = [n for n in nouns if len(n) > 1]
+
+
+
+
+        # 명사가 하나도 안 남으면 전체 문장을 사용
+        if not nouns:
+            nouns = [text]
+
+        try:
+            if store.noun_index.ready:
+                # 2) 명사 역색인에서 겹침 비율 min_ratio(0.8) 이상인 행을 관련도 순으로 한 페이지만 가져온다
+                with span("search.retrieve", mode=store.ranked_search.mode) as info:
+                    rows, has_more = store.ranked_search.search(text, nouns, SEARCH_PAGE_SIZE, offset,
+                                                               min_ratio=min_ratio)
+                    info['rows'] = len(rows)
+            else:
+                # 색인 백필 전에는 기존 LIKE 검색 + 2차 필터 후 페이지만 잘라서 보낸다
+                filtered_rows = self._search_like(nouns, min_ratio)
+                rows = filtered_rows[offset:offset + SEARCH_PAGE_SIZE]
+                has_more = len(filtered_rows) > offset + SEARCH_PAGE_SIZE
+
+            # 명사 검색에 없으면 의미 캐시(표현만 다른 같은 질문)를 확인
+            if not rows and offset == 0:
+                with span("search.semantic"):
+                    rows = self.search_semantic(text)
+                has_more = False
+                if rows:
+                    nouns = nouns + [f"유사도 {rows[0]['similarity']:.2f}"]
+
+            # 필터 후 결과 없으면 Gemini 호출로 이동
+            if not rows:
+                return False
+
+            # 나눠 저장된 긴 답변은 전체 답변으로 다시 합친다
+            with span("search.attach"):
+                store.answer_store.attach_full_answers(rows)
+            return nouns, rows, has_more
+
+        except Exception as e:
+            err = f"DB 검색 중 오류 발생: {e}"
+            print(err)
+            return False
+
+    def _search_like(self, nouns, min_ratio=0.8):
+        """명사 색인을 쓸 수 없을 때의 검색: LIKE 조건으로 후보를 찾고 명사 80%(min_ratio) 이상 겹치는 행만 남긴다."""
+        with span("search.retrieve", mode="like") as info:
+            rows = self._like_candidates(nouns)
+            info['rows'] = len(rows)
+        with span("search.filter", rows=len(rows)):
+            return self._filter_by_overlap(rows, nouns, min_ratio)
+
+    def _like_candidates(self, nouns):
+        """명사 하나라도 question/answer 에 들어 있는 chat_history 행 전체 (LIKE 검색)"""
+        with self.db_pool.connection() as conn, conn.cursor() as cursor:
+            # --------------------------------------------
+            # 명사들로 다중 LIKE 조건 생성
+            # --------------------------------------------
+            # question LIKE '%키워드%' OR answer LIKE '%키워드%'
+            conditions = []
+            params = []
+
+            for n in nouns:
+                like_n = f"%{n}%"
+                conditions.append("(question LIKE %s OR answer LIKE %s)")
+                params.extend([like_n, like_n])
+
+            where_clause = " OR ".join(conditions)
+
+            sql = (
+                "SELECT * "
+                "FROM chat_history "
+                f"WHERE {where_clause} "
+            )
+
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _filter_by_overlap(self, rows, nouns, min_ratio=0.8):
+        """행의 명사와 검색 명사가 80%(min_ratio) 이상 겹치는 행만 남긴다."""
+        if not rows:
+            return []
+
+        # --- 2차 필터: 명사 80% 이상 겹치는 row만 선별 ---
+        # 저장된 질문/답변은 매번 같으므로 대부분 캐시에서 바로 나온다
+        filtered_rows = []
+
+        for row in rows:
+            q_text = str(row.get('question', ''))
+            a_text = str(row.get('answer', ''))
+
+            row_q_n = self.noun_extractor.nouns(q_text)
+            row_a_n = self.noun_extractor.nouns(a_text)
+            row_nouns = set([n for n in row_q_n + row_a_n if len(n) > 1])
+
+            # 교집합 개수
+            overlap = len(row_nouns.intersection(set(nouns)))
+
+            # *** 추가: 겹침 비율 계산 ***
+            if len(nouns) > 0:
+                overlap_ratio = overlap / len(nouns)
+            else:
+                overlap_ratio = 0
+
+            # *** 조건: 겹침 비율이 0.8 이상일 때만 인정 ***
+            if overlap_ratio >= min_ratio:
+                filtered_rows.append(row)
+
+        return filtered_rows
+
@@ -0,0 +1,196 @@
+# chat_history 순위 검색 (관련도 순 top-k + 페이지 단위 조회)
+# 명사 역색인(chat_history_nouns)으로 "명사 80% 이상 겹침" 후보만 고른 뒤,
+#  - fulltext: MySQL FULLTEXT(ngram parser) 점수
+#  - bm25    : 역색인에서 계산한 BM25 점수 (FULLTEXT 를 쓸 수 없을 때)
+#  - fts5    : SQLite FTS5 의 bm25() 점수 (로컬 복제본 local_replica 에서)
+# 로 정렬해서 필요한 컬럼만, 필요한 페이지만 가져온다.
+import math
+import os
+import threading
+import time
+
+from noun_index import NOUN_MAX_LEN
+
+SEARCH_RANKING = os.getenv("SEARCH_RANKING", "auto")       # auto | fulltext | bm25 | fts5
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "10"))  # 한 번에 보여줄 결과 수
+FULLTEXT_INDEX_NAME = "ft_chat_history_qa"
+DOC_COUNT_TTL = 60          # 전체 행 수(N)를 다시 세는 간격(초) - BM25 idf 계산용
+
+RESULT_COLUMNS = "h.id, h.question, h.answer, h.created_at"
+
+
+class RankedSearch:
+    """
+    search(text, nouns, limit, offset) 로 관련도 순 결과 한 페이지를 돌려준다.
+    ensure_ranking() 이 한 번 실행된 뒤부터 mode 가 'fulltext' / 'bm25' / 'fts5' 로 정해진다.
+    """
+
+    def __init__(self, pool, ranking=SEARCH_RANKING):
+        self.pool = pool
+        self.ranking = ranking
+        self.mode = None
+        self._lock = threading.Lock()
+        self._doc_count = (0, None)   # (N, 계산 시각)
+
+    # ------------------------------------------------------------
+    # 준비: FULLTEXT 인덱스 확인 (만드는 것은 python ranked_search.py 로 따로 한다)
+    # ------------------------------------------------------------
+    def ensure_ranking(self):
+        """
+        FULLTEXT 인덱스가 있으면 'fulltext', 없으면 'bm25' 로 정한다. 앱 시작 중에는 테이블을 바꾸지 않는다
+        (큰 chat_history 에 ALTER TABLE 은 오래 걸리고 쓰기를 막으므로 create_fulltext_index() 로 따로 만든다).
+        """
+        with self._lock:
+            if self.mode is not None:
+                return self.mode
+            if self.ranking in ("bm25", "fts5"):
+                self.mode = self.ranking
+                return self.mode
+            try:
+                if not self.has_fulltext_index():
+                    raise RuntimeError(f"{FULLTEXT_INDEX_NAME} 인덱스가 없습니다 (python ranked_search.py 로 만들 수 있습니다)")
+                self.mode = "fulltext"
+            except Exception as e:
+                if self.ranking == "fulltext":
+                    raise
+                print(f"FULLTEXT 인덱스를 사용할 수 없어 BM25 순위를 사용합니다: {e}")
+                self.mode = "bm25"
+            return self.mode
+
+    def has_fulltext_index(self):
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) AS cnt FROM information_schema.STATISTICS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'chat_history' "
+                "AND INDEX_NAME = %s", (FULLTEXT_INDEX_NAME,)
+            )
+            return bool(cursor.fetchone()['cnt'])
+
+    def create_fulltext_index(self):
+        """chat_history 에 FULLTEXT(ngram) 인덱스를 만든다 (이미 있으면 그대로). 새로 만들었으면 True."""
+        if self.has_fulltext_index():
+            return False
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"ALTER TABLE chat_history ADD FULLTEXT INDEX {FULLTEXT_INDEX_NAME} "
+                    "(question, answer) WITH PARSER ngram"
+                )
+            conn.commit()
+        return True
+
+    # ------------------------------------------------------------
+    # 검색
+    # ------------------------------------------------------------
+    def search(self, text, nouns, limit=SEARCH_PAGE_SIZE, offset=0, min_ratio=0.8):
+        """
+        명사가 min_ratio 이상 겹치는 행을 관련도 순으로 offset 부터 limit 개 돌려준다.
+        반환: (rows, has_more)
+        """
+        if not nouns:
+            return [], False
+        mode = self.mode or self.ensure_ranking()
+        distinct = sorted({n[:NOUN_MAX_LEN] for n in nouns})
+        min_overlap = max(1, math.ceil(min_ratio * len(nouns) - 1e-9))
+        if min_overlap > len(distinct):
+            return [], False
+
+        with self.pool.connection() as conn, conn.cursor() as cursor:
+            if mode == "fulltext":
+                sql, params = self._fulltext_sql(text, distinct, min_overlap)
+            elif mode == "fts5":
+                sql, params = self._fts5_sql(distinct, min_overlap)
+            else:
+                sql, params = self._bm25_sql(cursor, distinct, min_overlap)
+            # 다음 페이지가 있는지 알기 위해 1개 더 가져온다
+            cursor.execute(sql + " LIMIT %s OFFSET %s", params + [limit + 1, offset])
+            rows = list(cursor.fetchall())
+        has_more = len(rows) > limit
+        return rows[:limit], has_more
+
+    @staticmethod
+    def _overlap_subquery(distinct, min_overlap):
+        placeholders = ", ".join(["%s"] * len(distinct))
+        return (
+            "SELECT history_id, COUNT(*) AS overlap FROM chat_history_nouns"
+            f" WHERE noun IN ({placeholders})"
+            " GROUP BY history_id HAVING COUNT(*) >= %s"
+        ), distinct + [min_overlap]
+
+    def _fulltext_sql(self, text, distinct, min_overlap):
+        sub_sql, sub_params = self._overlap_subquery(distinct, min_overlap)
+        sql = (
+            f"SELECT {RESULT_COLUMNS}, m.overlap, "
+            "MATCH(h.question, h.answer) AGAINST (%s IN NATURAL LANGUAGE MODE) AS score "
+            f"FROM chat_history h JOIN ({sub_sql}) m ON m.history_id = h.id "
+            "ORDER BY score DESC, m.overlap DESC, h.id DESC"
+        )
+        return sql, [text] + sub_params
+
+    def _fts5_sql(self, distinct, min_overlap):
+        """
+        (SQLite) 겹침 조건은 역색인으로 거르고, 순위는 chat_history_fts 의 bm25() 로 매긴다.
+        명사마다 접두어 검색("명사"*)이라 조사가 붙은 어절도 찾는다. bm25() 는 작을수록 관련도가 높다.
+        """
+        sub_sql, sub_params = self._overlap_subquery(distinct, min_overlap)
+        match = " OR ".join('"{}"*'.format(n.replace('"', '""')) for n in distinct)
+        sql = (
+            f"SELECT {RESULT_COLUMNS}, m.overlap, COALESCE(f.score, 0) AS score "
+            f"FROM chat_history h JOIN ({sub_sql}) m ON m.history_id = h.id "
+            "LEFT JOIN (SELECT rowid AS history_id, bm25(chat_history_fts) AS score "
+            "FROM chat_history_fts WHERE chat_history_fts MATCH %s) f ON f.history_id = h.id "
+            "ORDER BY score ASC, m.overlap DESC, h.id DESC"
+        )
+        return sql, sub_params + [match]
+
+    def _bm25_sql(self, cursor, distinct, min_overlap):
+        """
+        역색인에는 (명사, 행) 존재 여부만 있으므로 tf=1, 문서 길이 보정 없음(b=0)인 BM25:
+        score = Σ idf(명사),  idf = ln(1 + (N - df + 0.5) / (df + 0.5))
+        """
+        placeholders = ", ".join(["%s"] * len(distinct))
+        cursor.execute(
+            "SELECT noun, COUNT(*) AS df FROM chat_history_nouns "
+            f"WHERE noun IN ({placeholders}) GROUP BY noun", distinct
+        )
+        df = {row['noun']: row['df'] for row in cursor.fetchall()}
+        n_docs = self._get_doc_count(cursor)
+
+        weights = []
+        params = []
+        for noun in distinct:
+            d = df.get(noun, 0)
+            weights.append("SELECT %s AS noun, %s AS idf")
+            params.extend([noun, math.log(1 + (n_docs - d + 0.5) / (d + 0.5))])
+        weight_table = " UNION ALL ".join(weights)
+
+        sql = (
+            f"SELECT {RESULT_COLUMNS}, m.overlap, m.score "
+            "FROM chat_history h JOIN ("
+            "  SELECT n.history_id, COUNT(*) AS overlap, SUM(w.idf) AS score"
+            f"  FROM chat_history_nouns n JOIN ({weight_table}) w ON w.noun = n.noun"
+            "  GROUP BY n.history_id HAVING COUNT(*) >= %s"
+            ") m ON m.history_id = h.id "
+            "ORDER BY m.score DESC, h.id DESC"
+        )
+        return sql, params + [min_overlap]
+
+    def _get_doc_count(self, cursor):
+        count, checked = self._doc_count
+        if checked is None or time.monotonic() - checked > DOC_COUNT_TTL:
+            cursor.execute("SELECT COUNT(*) AS cnt FROM chat_history")
+            count = cursor.fetchone()['cnt']
+            self._doc_count = (count, time.monotonic())
+        return count
+
+
+if __name__ == "__main__":
+    # FULLTEXT(ngram) 인덱스 만들기 (한 번만, 사용자가 적은 시간에): python ranked_search.py
+    from db_pool import get_pool
+
+    search = RankedSearch(get_pool(), ranking="fulltext")
+    print("🔎 chat_history 에 FULLTEXT(ngram) 인덱스를 만드는 중...")
+    if search.create_fulltext_index():
+        print(f"✅ {FULLTEXT_INDEX_NAME} 인덱스를 만들었습니다.")
+    else:
+        print(f"✅ {FULLTEXT_INDEX_NAME} 인덱스가 이미 있습니다.")
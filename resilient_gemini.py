@@ -0,0 +1,366 @@
+# Gemini 호출 보호 계층
+#  - 요청마다 제한 시간(시도 1번 / 재시도 포함 전체)
+#  - 일시적인 오류(429, 5xx, 시간 초과, 연결 오류)는 지터를 넣은 지수 백오프로 재시도
+#  - 같은 질문이 동시에 들어오면 API 는 한 번만 부르고 결과(Future / 스트림 조각)를 함께 쓴다
+#  - 연속으로 실패하면 회로 차단기(circuit breaker)가 열려 한동안 호출하지 않고 GeminiUnavailable 을 올린다
+#    → 호출한 쪽은 DB 에 저장된 답변만으로 응답한다 (search_fallback)
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from metrics import get_metrics
+
+GEMINI_MODEL = 'gemini-2.5-flash'
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT_SEC", "60"))          # 시도 1번의 제한 시간
+GEMINI_DEADLINE = float(os.getenv("GEMINI_DEADLINE_SEC", "120"))       # 재시도를 포함한 전체 제한 시간
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+BACKOFF_BASE = 0.5          # 첫 재시도 대기 상한(초) - 시도마다 두 배
+BACKOFF_MAX = 8.0           # 재시도 대기 상한(초)
+BREAKER_FAILURES = int(os.getenv("GEMINI_BREAKER_FAILURES", "5"))      # 연속 실패 이만큼이면 차단
+BREAKER_COOLDOWN = float(os.getenv("GEMINI_BREAKER_COOLDOWN_SEC", "30"))  # 차단 후 다시 시험해 볼 때까지(초)
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))  # 동시에 진행할 수 있는 호출 수 (호출 스레드 수)
+
+# 다시 시도할 만한 HTTP 상태 코드 (google.genai.errors.APIError.code)
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class GeminiUnavailable(Exception):
+    """Gemini 를 지금 쓸 수 없음 (차단기 열림 / 제한 시간 초과 / 재시도 소진) - DB 답변으로 대신한다"""
+
+
+class _SharedStream:
+    """같은 질문의 스트림 하나를 여러 호출자가 함께 읽는다. 조각은 끝날 때까지 모아 두므로 늦게 온 호출자도 처음부터 읽는다."""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.readers = 0
+        self.cond = threading.Condition()
+
+    def publish(self, chunk):
+        with self.cond:
+            self.chunks.append(chunk)
+            self.cond.notify_all()
+            return self.readers > 0
+
+    def finish(self, error=None):
+        with self.cond:
+            self.done = True
+            self.error = error
+            self.cond.notify_all()
+
+    def subscribe(self):
+        """읽는 쪽으로 등록하고 조각 제너레이터를 돌려준다 (바로 읽기 시작해야 한다)"""
+        with self.cond:
+            self.readers += 1
+        return self._read()
+
+    def _read(self):
+        try:
+            i = 0
+            while True:
+                with self.cond:
+                    while i >= len(self.chunks) and not self.done:
+                        self.cond.wait()
+                    if i >= len(self.chunks):
+                        if self.error is not None:
+                            raise self.error
+                        return
+                    chunk = self.chunks[i]
+                i += 1
+                yield chunk
+        finally:
+            with self.cond:
+                self.readers -= 1
+
+
+def is_retryable(e):
+    if isinstance(e, (TimeoutError, ConnectionError)):
+        return True
+    code = getattr(e, 'code', None)
+    if isinstance(code, int):
+        return code in RETRYABLE_CODES
+    # httpx 의 연결/읽기 오류 등 (google.genai 를 임포트하지 않고 이름으로 판단)
+    return type(e).__name__ in {'ConnectError', 'ReadTimeout', 'ConnectTimeout', 'RemoteProtocolError',
+                                'ReadError', 'WriteError', 'PoolTimeout'}
+
+
+class CircuitBreaker:
+    """
+    closed   : 정상 호출
+    open     : 연속 failure_threshold 번 실패 → cooldown 동안 호출하지 않음
+    half_open: cooldown 후 시험 호출 1건만 허용 → 성공하면 closed, 실패하면 다시 open
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open" and self._clock() - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            recovered = self.state != "closed"
+            self.state = "closed"
+            self._failures = 0
+            self._probing = False
+        if recovered:
+            print("✅ Gemini API 가 다시 응답합니다 - 호출을 재개합니다.")
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            opened = self.state == "half_open" or (self.state == "closed" and self._failures >= self.failure_threshold)
+            if opened:
+                self.state = "open"
+                self._opened_at = self._clock()
+                self._probing = False
+        if opened:
+            print(f"🚫 Gemini API 오류가 이어져 {self.cooldown:.0f}초 동안 DB 답변만 사용합니다.")
+
+
+class ResilientGemini:
+    """
+    client.models.generate_content / generate_content_stream 을 감싼다.
+    - generate(contents, config=None): 응답 텍스트.
+    - stream(contents, config=None)  : 응답 조각(chunk). 첫 조각이 오기 전까지만 재시도한다 (보여준 조각은 되돌릴 수 없음).
+      그 뒤에도 조각마다 제한 시간을 두고, 넘으면 GeminiUnavailable 을 올린다.
+    둘 다 같은 질문(문자열 contents, config 없음)이 진행 중이면 API 를 다시 부르지 않고 그 결과를 함께 쓴다.
+    (대화 모드처럼 config 를 넘기는 요청은 앞선 대화가 달라 묶지 않는다)
+    시도마다 호출 스레드(max_workers 개)에서 호출하고, 스레드가 실제로 호출을 시작한 때부터 timeout 만큼만 기다린다.
+    빈 스레드를 기다리는 시간은 전체 제한 시간에만 들어가고 차단기 실패로 세지 않는다.
+    (이미 보낸 요청은 취소할 수 없으므로 결과만 버린다 - 클라이언트 쪽 HTTP 제한 시간(HttpOptions.timeout)도
+    함께 설정해 두는 것이 좋다.) max_workers 는 동시에 부르는 쪽의 수(작업자 스레드 수) 이상으로 둔다.
+    rate_limit 를 주면 재시도를 포함한 모든 시도 직전에 부른다 (요청 수 제한 - 토큰이 생길 때까지 기다리는 함수).
+    """
+
+    def __init__(self, client, model=GEMINI_MODEL, timeout=GEMINI_TIMEOUT, deadline=GEMINI_DEADLINE,
+                 max_retries=GEMINI_MAX_RETRIES, breaker=None, max_workers=GEMINI_MAX_CONCURRENCY, rate_limit=None,
+                 sleep=time.sleep):
+        self.client = client
+        self.model = model
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker()
+        self.rate_limit = rate_limit
+        self._sleep = sleep
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini-call")
+        self.max_workers = max_workers
+        self._inflight = {}            # (model, contents) -> Future
+        self._streams = {}             # (model, contents) -> _SharedStream
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'shared': 0, 'retries': 0, 'timeouts': 0, 'queue_timeouts': 0,
+                      'rejected': 0, 'failed': 0}
+
+    # ------------------------------------------------------------
+    # 호출
+    # ------------------------------------------------------------
+    def generate(self, contents, model=None, config=None):
+        model = model or self.model
+        key = (model, contents) if isinstance(contents, str) and config is None else None
+        with self._lock:
+            future = self._inflight.get(key) if key is not None else None
+            owner = future is None
+            if owner:
+                future = Future()
+                if key is not None:
+                    self._inflight[key] = future
+            else:
+                self.stats['shared'] += 1
+        if owner:
+            try:
+                future.set_result(self._generate_with_retry(model, contents, config))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    if self._inflight.get(key) is future:
+                        del self._inflight[key]
+            return future.result()
+        try:
+            return future.result(timeout=self.deadline)
+        except FutureTimeout:
+            raise GeminiUnavailable(f"같은 질문의 응답을 {self.deadline:.0f}초 동안 기다렸지만 오지 않았습니다.")
+
+    def _generate_with_retry(self, model, contents, config):
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            timeout = self._before_attempt(deadline)
+            try:
+                response = self._run_with_timeout(
+                    lambda: self.client.models.generate_content(model=model, contents=contents, config=config),
+                    timeout, deadline)
+            except Exception as e:
+                attempt += 1
+                self._after_failure(e, attempt, deadline)
+                continue
+            self.breaker.record_success()
+            return response.text
+
+    def stream(self, contents, model=None, config=None):
+        model = model or self.model
+        if not (isinstance(contents, str) and config is None):
+            yield from self._stream_with_retry(model, contents, config)
+            return
+        key = (model, contents)
+        with self._lock:
+            shared = self._streams.get(key)
+            owner = shared is None
+            if owner:
+                shared = self._streams[key] = _SharedStream()
+            else:
+                self.stats['shared'] += 1
+            reader = shared.subscribe()
+        if owner:
+            threading.Thread(target=self._pump, args=(key, shared, model, contents),
+                             name="gemini-stream", daemon=True).start()
+        yield from reader
+
+    def _pump(self, key, shared, model, contents):
+        """같은 질문의 스트림을 한 번만 받아서 읽는 쪽 모두에게 나눠 준다. 읽는 쪽이 모두 그만두면 멈춘다."""
+        error = None
+        chunks = self._stream_with_retry(model, contents, None)
+        try:
+            for chunk in chunks:
+                if not shared.publish(chunk):
+                    # 읽는 쪽이 모두 그만두었다 - 더 받지 않는다 (그 사이에 붙은 쪽이 잘린 답을 받지 않도록 오류로 끝낸다)
+                    error = GeminiUnavailable("같은 질문의 스트림이 중간에 취소되었습니다.")
+                    break
+        except BaseException as e:
+            error = e
+        finally:
+            chunks.close()
+            with self._lock:
+                if self._streams.get(key) is shared:
+                    del self._streams[key]
+            shared.finish(error)
+
+    def _stream_with_retry(self, model, contents, config):
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            timeout = self._before_attempt(deadline)
+            try:
+                iterator = iter(self._run_with_timeout(
+                    lambda: self.client.models.generate_content_stream(model=model, contents=contents, config=config),
+                    timeout, deadline))
+                first = self._run_with_timeout(lambda: next(iterator, None), timeout, deadline)
+            except Exception as e:
+                attempt += 1
+                self._after_failure(e, attempt, deadline)
+                continue
+            break
+        self.breaker.record_success()
+        if first is None:
+            return
+        yield first
+        # 첫 조각 이후에도 조각마다 시도 제한 시간과 남은 전체 제한 시간을 적용한다 (멈춘 스트림에 묶이지 않도록)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise GeminiUnavailable(f"Gemini 응답 제한 시간({self.deadline:.0f}초)을 넘었습니다.")
+            try:
+                chunk = self._run_with_timeout(lambda: next(iterator, None), min(self.timeout, remaining), deadline)
+            except GeminiUnavailable:
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                self.breaker.record_failure()
+                with self._lock:
+                    self.stats['failed'] += 1
+                raise GeminiUnavailable(f"Gemini 응답이 도중에 끊겼습니다: {e}") from e
+            if chunk is None:
+                return
+            yield chunk
+
+    # ------------------------------------------------------------
+    # 재시도 / 제한 시간
+    # ------------------------------------------------------------
+    def _before_attempt(self, deadline):
+        """이번 시도의 제한 시간. 차단기가 열렸거나 전체 제한 시간이 지났으면 GeminiUnavailable."""
+        if self.client is None:
+            raise GeminiUnavailable("Gemini API 클라이언트가 준비되지 않았습니다.")
+        if not self.breaker.allow():
+            with self._lock:
+                self.stats['rejected'] += 1
+            raise GeminiUnavailable("Gemini API 장애로 잠시 호출을 멈췄습니다.")
+        if self.rate_limit is not None:
+            self.rate_limit()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise GeminiUnavailable(f"Gemini 응답 제한 시간({self.deadline:.0f}초)을 넘었습니다.")
+        with self._lock:
+            self.stats['calls'] += 1
+        return min(self.timeout, remaining)
+
+    def _after_failure(self, e, attempt, deadline):
+        """재시도할 오류면 백오프만큼 기다리고 돌아간다. 아니면 예외를 올린다."""
+        if isinstance(e, GeminiUnavailable):
+            raise e   # 호출 스레드를 기다리다 전체 제한 시간이 지남 - API 탓이 아니므로 차단기에 기록하지 않는다
+        if not is_retryable(e):
+            # 요청 자체의 문제(400 등) - API 는 살아 있으므로 차단기에는 성공으로 기록
+            self.breaker.record_success()
+            with self._lock:
+                self.stats['failed'] += 1
+            raise e
+        self.breaker.record_failure()
+        delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)))   # full jitter
+        if attempt > self.max_retries or time.monotonic() + delay >= deadline:
+            with self._lock:
+                self.stats['failed'] += 1
+            raise GeminiUnavailable(f"Gemini 호출이 {attempt}번 실패했습니다: {e}") from e
+        with self._lock:
+            self.stats['retries'] += 1
+        get_metrics().record("gemini.backoff", delay, attempt=attempt, error=type(e).__name__)
+        print(f"⏳ Gemini 일시 오류 - {delay:.1f}초 뒤 다시 시도합니다 ({attempt}/{self.max_retries}): {e}")
+        self._sleep(delay)
+
+    def _run_with_timeout(self, fn, timeout, deadline):
+        """
+        호출 스레드에서 fn 을 실행한다. 제한 시간(timeout)은 스레드가 fn 을 시작한 때부터 잰다.
+        빈 스레드가 전체 제한 시간(deadline) 안에 나지 않으면 호출을 취소하고 GeminiUnavailable.
+        """
+        started = threading.Event()
+
+        def run():
+            started.set()
+            return fn()
+
+        future = self._executor.submit(run)
+        if not started.wait(max(deadline - time.monotonic(), 0)) and future.cancel():
+            with self._lock:
+                self.stats['queue_timeouts'] += 1
+            raise GeminiUnavailable(f"Gemini 호출 차례를 기다리다 제한 시간({self.deadline:.0f}초)을 넘었습니다.")
+        started.wait()
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._lock:
+                self.stats['timeouts'] += 1
+            raise TimeoutError(f"Gemini 응답이 {timeout:.1f}초 안에 오지 않았습니다.")
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,36 @@
+# 검색 결과를 answerDisplay(QTextBrowser)/결과 목록에 표시할 HTML 만들기 - Qt 없이도 쓸 수 있도록 분리
+import html
+from datetime import datetime
+
+
+def render_header_html(nouns):
+    """검색 결과 머리말 (검색어)"""
+    return (
+        f"<div style='color:#8A2BE2; font-weight:bold;'>[DB 검색 응답]</div>"
+        f"<div style='color:gray;'>검색어: {html.escape(', '.join(nouns))}</div>"
+    )
+
+
+def render_row_html(i, row, answer_limit=None):
+    """결과 한 행 (answer_limit 가 있으면 답변을 그 길이까지만 보여준다)"""
+    created = row.get('created_at', '')
+    # created_at이 None이거나 빈 문자열인 경우 처리
+    if created is None or created == '':
+        created = "저장된 날짜가 없어서 " + datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    q = row.get('question', '')
+    a = str(row.get('answer', ''))
+    more = ""
+    if answer_limit and len(a) > answer_limit:
+        a = a[:answer_limit]
+        more = "<span style='color:gray;'> … (더블클릭하면 전체 보기)</span>"
+    esc_q = html.escape(str(q)).replace('\n', '<br>')
+    esc_a = html.escape(a).replace('\n', '<br>')
+
+    return (
+        f"<div style='color:blue; margin-bottom:15px;'>"
+        f"<div><b>{i}. [{html.escape(str(created))}]</b></div>"
+        f"<div><b>Q:</b> <span style='color:red;'>{esc_q}</span></div>"
+        f"<div><b>A:</b> {esc_a}{more}</div>"
+        f"</div>"
+    )
+
@@ -0,0 +1,175 @@
+# DB 검색 결과 목록 (모델/뷰)
+# 결과 전체를 HTML 문서 하나로 만들어 setHtml 하는 대신,
+#  - SearchResultModel(QAbstractListModel) 이 행 목록을 들고 있고
+#  - 목록(QListView)은 화면에 보이는 항목만 그리며, 항목 HTML 은 그릴 때 만들어 배치 결과를 캐시한다.
+#  - 목록 끝까지 스크롤하면 Qt 의 canFetchMore/fetchMore 로 다음 페이지를 요청하고,
+#    도착한 행은 beginInsertRows 로 끝에 덧붙인다 (기존 항목은 다시 배치하지 않는다).
+from collections import OrderedDict
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, QSize, Qt, pyqtSignal
+from PyQt6.QtGui import QAbstractTextDocumentLayout, QTextDocument
+from PyQt6.QtWidgets import QAbstractItemView, QApplication, QListView, QStyle, QStyledItemDelegate, \
+    QStyleOptionViewItem
+
+from result_html import render_header_html, render_row_html
+
+ROW_ROLE = Qt.ItemDataRole.UserRole + 1     # 결과 행 dict (머리말 항목은 None)
+HTML_ROLE = Qt.ItemDataRole.UserRole + 2    # 항목을 그릴 HTML
+ITEM_ANSWER_PREVIEW = 600                   # 목록에서 보여줄 답변 글자 수 (전체는 더블클릭)
+DOC_CACHE_SIZE = 200                        # 배치해 둔 항목 문서(QTextDocument) 수
+
+
+class SearchResultModel(QAbstractListModel):
+    """
+    0번 항목은 검색어 머리말, 1번부터 검색 결과 행.
+    - reset(question, nouns, rows, has_more): 새 검색 결과
+    - append_rows(rows, has_more)          : 다음 페이지를 끝에 덧붙인다
+    - more_requested 시그널                 : 뷰가 끝까지 스크롤되어 다음 페이지가 필요할 때
+    """
+    more_requested = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.question = ""
+        self.nouns = []
+        self.rows = []
+        self.has_more = False
+        self._loading = False
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows) + 1 if self.nouns else 0
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        i = index.row()
+        row = self.rows[i - 1] if i else None
+        if role == HTML_ROLE:
+            if row is None:
+                return render_header_html(self.nouns)
+            return render_row_html(i, row, ITEM_ANSWER_PREVIEW)
+        if role == ROW_ROLE:
+            return row
+        if role == Qt.ItemDataRole.DisplayRole:
+            return ", ".join(self.nouns) if row is None else str(row.get('question', ''))
+        return None
+
+    def flags(self, index):
+        if index.isValid() and index.row() == 0:
+            return Qt.ItemFlag.ItemIsEnabled   # 머리말은 선택하지 않는다
+        return super().flags(index)
+
+    def reset(self, question, nouns, rows, has_more):
+        self.beginResetModel()
+        self.question = question
+        self.nouns = list(nouns)
+        self.rows = list(rows)
+        self.has_more = has_more
+        self._loading = False
+        self.endResetModel()
+
+    def clear(self):
+        self.reset("", [], [], False)
+
+    def append_rows(self, rows, has_more):
+        self._loading = False
+        self.has_more = has_more
+        if rows:
+            first = len(self.rows) + 1
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self.rows.extend(rows)
+            self.endInsertRows()
+
+    def stop_loading(self):
+        """다음 페이지 요청이 실패/취소되었을 때 - 더 요청하지 않는다"""
+        self._loading = False
+        self.has_more = False
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self.has_more and not self._loading
+
+    def fetchMore(self, parent):
+        if self.canFetchMore(parent):
+            self._loading = True
+            self.more_requested.emit()
+
+
+class HtmlItemDelegate(QStyledItemDelegate):
+    """항목 HTML 을 QTextDocument 로 배치해서 그린다. (HTML, 폭)별 배치 결과는 LRU 로 재사용한다."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._docs = OrderedDict()
+
+    def _document(self, index, width):
+        html_text = index.data(HTML_ROLE) or ""
+        key = (html_text, width)
+        doc = self._docs.get(key)
+        if doc is not None:
+            self._docs.move_to_end(key)
+            return doc
+        doc = QTextDocument()
+        doc.setDocumentMargin(4)
+        doc.setHtml(html_text)
+        doc.setTextWidth(width)
+        self._docs[key] = doc
+        while len(self._docs) > DOC_CACHE_SIZE:
+            self._docs.popitem(last=False)
+        return doc
+
+    def _width(self, option):
+        view = self.parent()
+        if view is not None:
+            return max(view.viewport().width(), 50)
+        return max(option.rect.width(), 50)
+
+    def clear_cache(self):
+        self._docs.clear()
+
+    def paint(self, painter, option, index):
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        opt.text = ""
+        style = opt.widget.style() if opt.widget else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_ItemViewItem, opt, painter, opt.widget)   # 배경/선택 표시
+        doc = self._document(index, self._width(option))
+        painter.save()
+        painter.translate(option.rect.topLeft())
+        painter.setClipRect(0, 0, option.rect.width(), option.rect.height())
+        doc.documentLayout().draw(painter, QAbstractTextDocumentLayout.PaintContext())
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        width = self._width(option)
+        doc = self._document(index, width)
+        return QSize(width, int(doc.size().height()))
+
+
+class SearchResultView(QListView):
+    """검색 결과 목록. 항목을 더블클릭(또는 Enter)하면 row_activated(행 번호, 행 dict)를 보낸다."""
+    row_activated = pyqtSignal(int, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setItemDelegate(HtmlItemDelegate(self))
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setLayoutMode(QListView.LayoutMode.Batched)   # 많은 항목도 조금씩 나눠 배치
+        self.setBatchSize(20)
+        self.setUniformItemSizes(False)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.activated.connect(self._on_activated)
+
+    def _on_activated(self, index):
+        row = index.data(ROW_ROLE)
+        if row is not None:
+            self.row_activated.emit(index.row(), row)
+
+    def resizeEvent(self, event):
+        # 폭이 바뀌면 항목 높이가 달라지므로 배치 캐시를 비운다
+        if event.oldSize().width() != event.size().width():
+            self.itemDelegate().clear_cache()
+        super().resizeEvent(event)
@@ -0,0 +1,265 @@
+# 의미 기반 답변 캐시
+# 저장된 질문마다 임베딩 벡터를 만들어 메모리 맵 NumPy 행렬(float32)에 보관하고,
+# 새 질문이 오면 전체 행렬과 코사인 유사도를 한 번에 계산해 가장 비슷한 질문의 답을 돌려준다.
+# 표현만 다른 같은 질문(명사 겹침 80% 조건에 걸리지 않는 경우)도 Gemini 호출 없이 답할 수 있다.
+import json
+import os
+import re
+import threading
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "0") == "1"               # 1 이면 사용
+SEMANTIC_EMBEDDER = os.getenv("SEMANTIC_EMBEDDER", "hashing")         # hashing | gemini
+SEMANTIC_THRESHOLD = float(os.getenv("SEMANTIC_THRESHOLD", "0.7"))   # 이 유사도 이상만 캐시 적중
+SEMANTIC_TOP_K = int(os.getenv("SEMANTIC_TOP_K", "3"))
+SEMANTIC_CACHE_DIR = os.getenv(
+    "SEMANTIC_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "semantic_cache"))
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+# ------------------------------------------------------------
+# 임베딩 제공자: name, dim, embed(texts) -> (len(texts), dim) float32 (L2 정규화)
+# ------------------------------------------------------------
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+class HashingEmbedder:
+    """
+    오프라인용 임베딩: 글자 2-gram/3-gram 을 해시해서 dim 칸에 더한다 (feature hashing).
+    띄어쓰기/문장부호/대소문자 차이에 강하고, 외부 API 없이 바로 계산된다.
+    """
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text):
+        text = _NON_WORD.sub("", str(text).lower())
+        for n in (2, 3):
+            for i in range(len(text) - n + 1):
+                yield text[i:i + n]
+        if len(text) < 2 and text:
+            yield text
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for gram in self._features(text):
+                h = zlib.crc32(gram.encode('utf-8'))
+                sign = 1.0 if (h >> 31) & 1 else -1.0
+                matrix[row, h % self.dim] += sign
+        # 자주 나오는 n-gram 이 지나치게 커지지 않도록 로그 스케일
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        return _normalize_rows(matrix)
+
+
+class GeminiEmbedder:
+    """Gemini 임베딩 API 를 사용하는 제공자 (한 번의 요청으로 여러 문장을 임베딩)"""
+
+    def __init__(self, client, model='gemini-embedding-001', dim=768):
+        self.client = client
+        self.model = model
+        self.dim = dim
+        self.name = f"{model}-{dim}"
+
+    def embed(self, texts):
+        from google.genai import types
+        result = self.client.models.embed_content(
+            model=self.model,
+            contents=list(texts),
+            config=types.EmbedContentConfig(output_dimensionality=self.dim)
+        )
+        matrix = np.array([e.values for e in result.embeddings], dtype=np.float32)
+        return _normalize_rows(matrix)
+
+
+def make_embedder(kind=SEMANTIC_EMBEDDER, client=None):
+    if kind == "gemini":
+        if client is None:
+            raise ValueError("gemini 임베딩에는 Gemini 클라이언트가 필요합니다.")
+        return GeminiEmbedder(client)
+    return HashingEmbedder()
+
+
+# ------------------------------------------------------------
+# 캐시 저장소
+# ------------------------------------------------------------
+class SemanticCache:
+    """
+    cache_dir 안의 파일:
+      - vectors.f32 : (capacity, dim) float32 메모리 맵 행렬 (앞의 count 행만 유효)
+      - meta.jsonl  : 행마다 {"id", "question", "answer", "created_at"} 한 줄
+      - index.json  : {"embedder", "dim", "count", "capacity"}
+    임베딩 제공자(name)가 바뀌면 벡터를 비교할 수 없으므로 캐시를 비우고 새로 시작한다.
+    """
+
+    def __init__(self, embedder, cache_dir=SEMANTIC_CACHE_DIR, threshold=SEMANTIC_THRESHOLD,
+                 top_k=SEMANTIC_TOP_K, initial_capacity=1024):
+        self.embedder = embedder
+        self.cache_dir = cache_dir
+        self.threshold = threshold
+        self.top_k = top_k
+        self.initial_capacity = initial_capacity
+        self._lock = threading.Lock()
+        self._vectors_path = os.path.join(cache_dir, "vectors.f32")
+        self._meta_path = os.path.join(cache_dir, "meta.jsonl")
+        self._index_path = os.path.join(cache_dir, "index.json")
+        self._matrix = None
+        self._meta = []
+        self.count = 0
+        self.capacity = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        info = None
+        if os.path.exists(self._index_path):
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+        if not info or info.get('embedder') != self.embedder.name or info.get('dim') != self.embedder.dim:
+            self._reset()
+            return
+        meta = []
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, 'r', encoding='utf-8') as f:
+                meta = [json.loads(line) for line in f if line.strip()]
+        # index.json 의 count 보다 meta 가 짧으면(기록 도중 종료) 짧은 쪽에 맞춘다
+        self.count = min(info['count'], len(meta))
+        self._meta = meta[:self.count]
+        if len(meta) > self.count:
+            # 벡터보다 앞서 기록된 메타 줄은 버려서 행 번호를 맞춘다
+            with open(self._meta_path, 'w', encoding='utf-8') as f:
+                for entry in self._meta:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.capacity = info['capacity']
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode='r+',
+                                 shape=(self.capacity, self.embedder.dim))
+
+    def _reset(self):
+        self.count = 0
+        self._meta = []
+        self.capacity = self.initial_capacity
+        open(self._meta_path, 'w', encoding='utf-8').close()
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode='w+',
+                                 shape=(self.capacity, self.embedder.dim))
+        self._write_index()
+
+    def _write_index(self):
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'embedder': self.embedder.name, 'dim': self.embedder.dim,
+                       'count': self.count, 'capacity': self.capacity}, f)
+        os.replace(tmp_path, self._index_path)
+
+    def _grow(self, needed):
+        new_capacity = self.capacity
+        while new_capacity < needed:
+            new_capacity *= 2
+        self._matrix.flush()
+        del self._matrix
+        with open(self._vectors_path, 'r+b') as f:
+            f.truncate(new_capacity * self.embedder.dim * 4)
+        self.capacity = new_capacity
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode='r+',
+                                 shape=(self.capacity, self.embedder.dim))
+
+    # ------------------------------------------------------------
+    # 추가 / 조회
+    # ------------------------------------------------------------
+    def add_many(self, items):
+        """items: [(history_id, question, answer, created_at), ...] - 질문을 한 번에 임베딩해서 추가"""
+        items = list(items)
+        if not items:
+            return 0
+        vectors = self.embedder.embed([q for _, q, _, _ in items])
+        with self._lock:
+            if self.count + len(items) > self.capacity:
+                self._grow(self.count + len(items))
+            self._matrix[self.count:self.count + len(items)] = vectors
+            self._matrix.flush()
+            with open(self._meta_path, 'a', encoding='utf-8') as f:
+                for history_id, question, answer, created_at in items:
+                    entry = {'id': history_id, 'question': question, 'answer': answer,
+                             'created_at': str(created_at) if created_at else None}
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                    self._meta.append(entry)
+            self.count += len(items)
+            self._write_index()
+        return len(items)
+
+    def add(self, history_id, question, answer, created_at=None):
+        created_at = created_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return self.add_many([(history_id, question, answer, created_at)])
+
+    def lookup(self, question, top_k=None, threshold=None):
+        """
+        question 과 코사인 유사도가 threshold 이상인 저장 항목을 높은 순으로 최대 top_k 개.
+        반환: [(similarity, {"id", "question", "answer", "created_at"}), ...]
+        """
+        top_k = top_k or self.top_k
+        threshold = self.threshold if threshold is None else threshold
+        query = self.embedder.embed([question])[0]
+        with self._lock:
+            if not self.count:
+                self.misses += 1
+                return []
+            # 정규화된 벡터끼리의 내적 = 코사인 유사도 (행렬-벡터 곱 한 번)
+            scores = self._matrix[:self.count] @ query
+            k = min(top_k, self.count)
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+            results = [(float(scores[i]), self._meta[i]) for i in best if scores[i] >= threshold]
+            if results:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return results
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {'entries': self.count, 'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': (self.hits / total) if total else 0.0, 'embedder': self.embedder.name}
+
+
+def rebuild_from_db(cache, pool, batch_size=500):
+    """chat_history 전체를 임베딩해서 캐시를 다시 만든다."""
+    with cache._lock:
+        cache._reset()
+    last_id = 0
+    total = 0
+    while True:
+        with pool.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT id, question, answer, created_at FROM chat_history "
+                "WHERE id > %s ORDER BY id LIMIT %s", (last_id, batch_size)
+            )
+            rows = cursor.fetchall()
+        if not rows:
+            break
+        total += cache.add_many(
+            [(r['id'], str(r['question'] or ''), str(r['answer'] or ''), r['created_at']) for r in rows])
+        last_id = rows[-1]['id']
+        print(f"🧭 의미 캐시 재구성: {total}행")
+    return total
+
+
+if __name__ == "__main__":
+    # 기존 chat_history 로 의미 캐시를 다시 만든다: python semantic_cache.py
+    from db_pool import get_pool
+
+    client = None
+    if SEMANTIC_EMBEDDER == "gemini":
+        from google import genai
+        client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    count = rebuild_from_db(SemanticCache(make_embedder(client=client)), get_pool())
+    print(f"✅ 의미 캐시 재구성 완료: {count}행")
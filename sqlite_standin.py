@@ -0,0 +1,155 @@
+# 원격 MySQL 대신 쓰는 로컬 SQLite 대역 (벤치마크 / 로컬 복제본 local_replica 용)
+# ConnectionPool(connect_fn=sqlite_standin.connect, config={'database': 경로}) 로 넣으면
+# 파이프라인의 pymysql 코드(%s 자리표시자, DictCursor, INSERT IGNORE, information_schema 확인)를
+# 그대로 실행할 수 있다. FULLTEXT 인덱스는 만들 수 없으므로 순위 검색은 BM25 로 동작한다.
+import hashlib
+import re
+import sqlite3
+
+STANDIN_ANSWER_LENGTH = 500      # information_schema 가 알려 줄 chat_history.answer 컬럼 길이 (글자 수 = 바이트 수)
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS chat_history ("
+    " id INTEGER PRIMARY KEY AUTOINCREMENT, question TEXT, answer TEXT, create_at TEXT,"
+    " created_at TEXT DEFAULT CURRENT_TIMESTAMP, question_hash CHAR(40))",
+    "CREATE INDEX IF NOT EXISTS idx_question_hash ON chat_history (question_hash)",
+    "CREATE TABLE IF NOT EXISTS chat_history_nouns ("
+    " history_id INTEGER NOT NULL, noun VARCHAR(100) NOT NULL, PRIMARY KEY (noun, history_id))",
+    "CREATE INDEX IF NOT EXISTS idx_history_id ON chat_history_nouns (history_id)",
+    "CREATE TABLE IF NOT EXISTS chat_answer_parts ("
+    " history_id INTEGER NOT NULL, part_no INTEGER NOT NULL, content TEXT NOT NULL,"
+    " PRIMARY KEY (history_id, part_no))",
+]
+
+_PLACEHOLDER = re.compile(r"%s")
+
+
+def _dict_row(cursor, row):
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+
+def init_db(path):
+    """대역 DB 파일에 파이프라인이 쓰는 테이블을 만든다."""
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    for sql in SCHEMA:
+        db.execute(sql)
+    db.commit()
+    db.close()
+
+
+class StandinCursor:
+    """pymysql DictCursor 처럼 쓰는 커서 (execute/executemany/fetchone/fetchall/lastrowid)"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._cursor = conn._db.cursor()
+        self._static = None           # information_schema 등 미리 정한 결과
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def _translate(self, sql):
+        """MySQL 전용 구문을 처리한다. SQLite 로 실행할 SQL 을 돌려주고, 직접 처리했으면 None."""
+        self._static = None
+        head = sql.lstrip()[:40].upper()
+        if head.startswith("CREATE TABLE"):
+            return None               # 테이블은 init_db 에서 이미 만들었다
+        if head.startswith("ALTER TABLE"):
+            raise sqlite3.OperationalError("SQLite 대역은 ALTER TABLE(FULLTEXT 등)을 지원하지 않습니다.")
+        if "information_schema.COLUMNS" in sql:
+            if "CHARACTER_MAXIMUM_LENGTH" in sql:
+                self._static = [{'max_len': self._conn.answer_length, 'max_bytes': self._conn.answer_length}]
+            else:
+                self._static = [{'cnt': 1}]   # question_hash 컬럼은 처음부터 있다
+            return None
+        if "information_schema.STATISTICS" in sql:
+            self._static = [{'cnt': 0}]
+            return None
+        sql = sql.replace("INSERT IGNORE", "INSERT OR IGNORE")
+        return _PLACEHOLDER.sub("?", sql)
+
+    def execute(self, sql, params=()):
+        sql = self._translate(sql)
+        if sql is not None:
+            self._cursor.execute(sql, tuple(params or ()))
+        return self._cursor.rowcount
+
+    def executemany(self, sql, seq_of_params):
+        sql = self._translate(sql)
+        if sql is not None:
+            self._cursor.executemany(sql, [tuple(p) for p in seq_of_params])
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        if self._static is not None:
+            return self._static.pop(0) if self._static else None
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        if self._static is not None:
+            rows, self._static = self._static, []
+            return rows
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class StandinConnection:
+    def __init__(self, database, answer_length=STANDIN_ANSWER_LENGTH):
+        self.answer_length = answer_length
+        self._db = sqlite3.connect(database, check_same_thread=False, timeout=30)
+        self._db.row_factory = _dict_row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        # MySQL 의 MD5() / CONCAT() (로컬 복제본이 원격과 행이 같은지 비교할 때 쓴다 - SQLite 3.44 전에는 CONCAT 이 없다)
+        self._db.create_function("MD5", 1, _md5, deterministic=True)
+        self._db.create_function("CONCAT", -1, _concat, deterministic=True)
+
+    def cursor(self):
+        return StandinCursor(self)
+
+    @property
+    def server_status(self):
+        # pymysql 의 server_status 처럼 트랜잭션 진행 중이면 IN_TRANS 비트(1)를 세운다
+        return 1 if self._db.in_transaction else 0
+
+    def ping(self, reconnect=False):
+        self._db.execute("SELECT 1")
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+    def close(self):
+        self._db.close()
+
+
+def _md5(value):
+    return None if value is None else hashlib.md5(str(value).encode('utf-8')).hexdigest()
+
+
+def _concat(*values):
+    # MySQL 처럼 인자 중 하나라도 NULL 이면 NULL
+    if any(v is None for v in values):
+        return None
+    return "".join(str(v) for v in values)
+
+
+def connect(database, answer_length=STANDIN_ANSWER_LENGTH, **_ignored):
+    """pymysql.connect 와 같은 자리에 넣는다 (host/user 등 MySQL 전용 인자는 무시)"""
+    return StandinConnection(database, answer_length)
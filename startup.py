@@ -0,0 +1,62 @@
+# 빠른 시작을 위한 준비 작업 관리
+# 창을 먼저 띄운 뒤 무거운 준비 작업(google.genai 임포트/클라이언트 생성, 파이프라인, Kkma, DB 연결)을
+# 백그라운드에서 실행하고, 첫 질문은 아직 끝나지 않은 작업만 기다리게 한다.
+import threading
+import time
+
+from metrics import get_metrics
+
+
+class Warmup:
+    """
+    이름 붙은 준비 작업 모음.
+    - start(name, fn, run_background): fn 을 백그라운드에서 실행한다 (소요 시간은 'startup.<name>' 으로 기록)
+    - wait(name): 그 작업이 끝날 때까지 기다린 뒤 결과를 돌려준다 (실패했으면 그 예외를 다시 올린다)
+    - done(name) / error(name): 완료 여부 / 실패 원인
+    """
+
+    def __init__(self):
+        self._events = {}
+        self._results = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def start(self, name, fn, run_background):
+        event = threading.Event()
+        with self._lock:
+            self._events[name] = event
+
+        def job():
+            started = time.perf_counter()
+            try:
+                self._results[name] = fn()
+            except Exception as e:
+                self._errors[name] = e
+                print(f"❌ 준비 작업 실패 ({name}): {e}")
+            finally:
+                get_metrics().record(f"startup.{name}", time.perf_counter() - started, ok=name not in self._errors)
+                event.set()
+
+        run_background(job)
+
+    def wait(self, name, timeout=None):
+        with self._lock:
+            event = self._events.get(name)
+        if event is None:
+            raise KeyError(f"시작하지 않은 준비 작업입니다: {name}")
+        if not event.is_set():
+            started = time.perf_counter()
+            if not event.wait(timeout):
+                raise TimeoutError(f"준비 작업이 {timeout}초 안에 끝나지 않았습니다: {name}")
+            get_metrics().record(f"startup.wait.{name}", time.perf_counter() - started)
+        if name in self._errors:
+            raise self._errors[name]
+        return self._results.get(name)
+
+    def done(self, name):
+        with self._lock:
+            event = self._events.get(name)
+        return event is not None and event.is_set()
+
+    def error(self, name):
+        return self._errors.get(name)
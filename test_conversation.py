@@ -0,0 +1,49 @@
+# 대화 모드 컨텍스트 캐시 확인 (가짜 클라이언트) - python -m pytest test_conversation.py
+from conversation import ConversationContext, estimate_tokens
+from fake_gemini import FakeGeminiClient
+from resilient_gemini import ResilientGemini
+
+
+def _talk(conv, gemini, turns):
+    for i in range(turns):
+        question = f"질문 {i}: 데이터베이스 색인은 어떻게 동작하나요?"
+        contents, config = conv.build(question)
+        sent = sum(estimate_tokens(c['parts'][0]['text']) for c in contents)
+        assert sent + estimate_tokens(conv.system_instruction) <= conv.budget
+        conv.remember(question, gemini.generate(contents, config=config))
+
+
+def test_cache_created_reused_and_deleted_with_defaults():
+    client = FakeGeminiClient(latency=0.0)
+    gemini = ResilientGemini(client)
+    conv = ConversationContext(gemini, run_background=lambda fn: fn())
+    try:
+        _talk(conv, gemini, 40)
+
+        caches = client.caches
+        assert conv.stats['caches_created'] >= 1
+        assert conv.stats['cached_requests'] > conv.stats['caches_created']     # 만든 캐시를 여러 번 썼다
+        assert all(cfg.get('cached_content') in [c.name for c in caches.created]
+                   for cfg in client.models.configs if cfg and 'cached_content' in cfg)
+        # 바뀐 앞부분마다 새 캐시 - 한 세대 전 캐시는 지워지고 지금 것과 바로 전 것만 남는다
+        if len(caches.created) > 2:
+            assert caches.created[0].name not in caches.live
+        assert len(caches.live) <= 2
+
+        conv.reset()
+        assert caches.live == {}
+    finally:
+        gemini.close()
+
+
+def test_short_prefix_is_sent_without_cache():
+    client = FakeGeminiClient(latency=0.0)
+    gemini = ResilientGemini(client)
+    conv = ConversationContext(gemini, run_background=lambda fn: fn())
+    try:
+        _talk(conv, gemini, 3)
+        assert conv.stats['caches_created'] == 0
+        assert client.caches.created == []
+        assert all('system_instruction' in cfg for cfg in client.models.configs)
+    finally:
+        gemini.close()
@@ -0,0 +1,266 @@
+# chat_history 저장을 비동기로 모아서 처리하는 write-behind 큐
+# 저장 요청은 먼저 로컬 SQLite 스풀 파일에 기록(커밋)한 뒤 바로 돌아가고,
+# 백그라운드 스레드가 개수/시간 기준으로 모아서 executemany 한 번으로 원격 DB에 넣는다.
+# DB 에 접속할 수 없으면 스풀에 남겨 두었다가 다시 연결되면 자동으로 이어서 저장한다.
+import os
+import sqlite3
+import threading
+import time
+
+import pymysql
+
+from db_pool import PoolClosed, PoolTimeout
+
+WRITE_BEHIND_SPOOL = os.getenv(
+    "WRITE_BEHIND_SPOOL", os.path.join(os.path.dirname(os.path.abspath(__file__)), "write_spool.sqlite3"))
+FLUSH_SIZE = int(os.getenv("WRITE_BEHIND_FLUSH_SIZE", "20"))          # 이만큼 쌓이면 바로 저장
+FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_SEC", "2"))      # 가장 오래된 항목이 이만큼 기다리면 저장
+RETRY_MAX_DELAY = 60.0                                                # DB 장애 시 재시도 간격 최대값(초)
+
+# 접속 문제로 보고 스풀에 남겨 둘 MySQL 오류 코드
+CONNECTION_ERROR_CODES = {2003, 2006, 2013, 2055}
+# 테이블/컬럼이 아직 없음 (1146 테이블 없음, 1054 컬럼 없음) - 스키마를 준비한 뒤 다시 시도한다
+SCHEMA_ERROR_CODES = {1146, 1054}
+
+
+def is_connection_error(e):
+    if isinstance(e, (PoolTimeout, PoolClosed, pymysql.err.InterfaceError, ConnectionError, TimeoutError)):
+        return True
+    if isinstance(e, pymysql.err.OperationalError) and e.args:
+        return e.args[0] in CONNECTION_ERROR_CODES
+    return False
+
+
+def is_schema_error(e):
+    if isinstance(e, pymysql.err.MySQLError) and e.args:
+        return e.args[0] in SCHEMA_ERROR_CODES
+    # SQLite 대역(sqlite_standin)의 같은 오류
+    return isinstance(e, sqlite3.OperationalError) and str(e).startswith(("no such table", "no such column"))
+
+
+class WriteBehindQueue:
+    """
+    - insert_batch_fn(entries): entries 전체를 한 트랜잭션으로 저장한다 (executemany).
+                                저장된 행 [(history_id, question, answer, created_at), ...] 를 반환한다.
+    - insert_one_fn(entry)    : 묶음 저장이 (접속 문제가 아닌 이유로) 실패했을 때 한 행씩 저장한다.
+                                저장된 행 (history_id, question, answer, created_at) 또는 None 반환.
+    - on_saved(saved_rows)    : 저장된 행에 대한 후처리 (색인/캐시 갱신)
+    - prepare_fn()            : 테이블/컬럼이 없다는 오류(is_schema_error)가 났을 때 다시 시도하기 전에 부른다 (스키마 준비)
+    entry 는 (question, answer, created_at) 튜플이다.
+    접속 오류와 스키마 오류는 스풀에 남겨 두고 간격을 늘려 가며 다시 시도한다.
+    그 밖의 이유로 한 행씩 저장도 실패한 항목은 스풀의 failed 테이블로 옮기고, 다음 실행 때 한 번 더 시도한다.
+    종료할 때(close) 제한 시간 안에 다 저장하지 못하면 남은 항목은 pending 에 그대로 두고 다음 실행 때 저장한다.
+    """
+
+    def __init__(self, insert_batch_fn, insert_one_fn, on_saved=None, spool_path=WRITE_BEHIND_SPOOL,
+                 flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL, prepare_fn=None):
+        self.insert_batch_fn = insert_batch_fn
+        self.insert_one_fn = insert_one_fn
+        self.on_saved = on_saved
+        self.prepare_fn = prepare_fn
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._db = sqlite3.connect(spool_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pending ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, question TEXT, answer TEXT,"
+            " created_at TEXT, queued_at REAL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS failed ("
+            " seq INTEGER PRIMARY KEY, question TEXT, answer TEXT, created_at TEXT, error TEXT)"
+        )
+        self._db.commit()
+        self._db_lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._aborting = False         # close() 제한 시간이 지남 - 지금 하던 묶음까지만 하고 멈춘다
+        self._retry_delay = 0.0
+        self.saved_count = 0
+        self.batch_count = 0
+        self._replay_failed()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------
+    # 생산자 쪽
+    # ------------------------------------------------------------
+    def enqueue(self, question, answer, created_at):
+        """스풀에 기록하고 바로 돌아간다. (기록이 끝나면 프로그램이 죽어도 다음 실행 때 저장된다)"""
+        with self._db_lock:
+            self._db.execute(
+                "INSERT INTO pending (question, answer, created_at, queued_at) VALUES (?, ?, ?, ?)",
+                (question, answer, created_at, time.time())
+            )
+            self._db.commit()
+            pending = self._pending_count()
+        if pending >= self.flush_size:
+            with self._wakeup:
+                self._wakeup.notify()
+
+    def pending_count(self):
+        with self._db_lock:
+            return self._pending_count()
+
+    def _pending_count(self):
+        return self._db.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+
+    def failed_count(self):
+        with self._db_lock:
+            return self._db.execute("SELECT COUNT(*) FROM failed").fetchone()[0]
+
+    def _replay_failed(self):
+        """지난 실행에서 failed 로 옮긴 항목을 pending 으로 되돌려 한 번 더 저장해 본다"""
+        with self._db_lock:
+            count = self._db.execute("SELECT COUNT(*) FROM failed").fetchone()[0]
+            if not count:
+                return
+            self._db.execute(
+                "INSERT INTO pending (question, answer, created_at, queued_at) "
+                "SELECT question, answer, created_at, ? FROM failed ORDER BY seq", (time.time(),)
+            )
+            self._db.execute("DELETE FROM failed")
+            self._db.commit()
+        print(f"🔁 지난번에 저장하지 못한 {count}건을 다시 저장합니다.")
+
+    # ------------------------------------------------------------
+    # 백그라운드 저장
+    # ------------------------------------------------------------
+    def _run(self):
+        while True:
+            with self._wakeup:
+                if not self._stopping:
+                    # DB 장애 중에는 재시도 간격만큼, 평소에는 flush_interval 의 절반마다 확인
+                    self._wakeup.wait(timeout=self._retry_delay or self.flush_interval / 2)
+                stopping = self._stopping
+            if stopping or self._should_flush():
+                self.flush()
+            if stopping:
+                return
+
+    def _should_flush(self):
+        with self._db_lock:
+            row = self._db.execute("SELECT COUNT(*), MIN(queued_at) FROM pending").fetchone()
+        count, oldest = row
+        if not count:
+            return False
+        return count >= self.flush_size or time.time() - oldest >= self.flush_interval
+
+    def flush(self):
+        """스풀에 쌓인 항목을 묶음 단위로 저장한다. 접속 문제면 다음 재시도로 미룬다."""
+        while not self._aborting:
+            with self._db_lock:
+                batch = self._db.execute(
+                    "SELECT seq, question, answer, created_at FROM pending ORDER BY seq LIMIT ?",
+                    (max(self.flush_size, 1) * 5,)
+                ).fetchall()
+            if not batch:
+                self._retry_delay = 0.0
+                return
+            entries = [(q, a, c) for _, q, a, c in batch]
+            try:
+                saved = self.insert_batch_fn(entries)
+                self.batch_count += 1
+            except Exception as e:
+                if self._defer(e):
+                    print(f"⏳ DB 에 저장할 수 없음 - {len(batch)}건을 스풀에 보관하고 "
+                          f"{self._retry_delay:.0f}초 뒤 다시 시도합니다: {e}")
+                    return
+                print(f"❌ 묶음 저장 실패 - 한 건씩 다시 저장합니다: {e}")
+                saved = self._insert_one_by_one(batch)
+                if saved is None:
+                    return   # 중간에 접속이 끊김 - 남은 항목은 다음 재시도에서
+            else:
+                self._remove([seq for seq, _, _, _ in batch])
+            self._retry_delay = 0.0
+            self.saved_count += len(saved)
+            if saved:
+                print(f"✅ MySQL 저장 성공: {len(saved)}건 (write-behind)")
+            if self.on_saved and saved:
+                self._after_saved(saved)
+
+    def _after_saved(self, saved):
+        """저장된 행의 후처리를 한 행씩 한다. 종료 중이면 나머지는 건너뛴다 (색인은 다음 실행의 백필이 채운다)"""
+        for row in saved:
+            if self._aborting:
+                return
+            try:
+                self.on_saved([row])
+            except Exception as e:
+                print(f"❌ 저장 후처리 실패: {e}")
+
+    def _insert_one_by_one(self, batch):
+        saved = []
+        for seq, question, answer, created_at in batch:
+            if self._aborting:
+                return None   # 종료 중 - 남은 항목은 pending 에 두고 다음 실행 때 저장
+            try:
+                row = self.insert_one_fn((question, answer, created_at))
+            except Exception as e:
+                if self._defer(e):
+                    return None
+                self._move_to_failed(seq, question, answer, created_at, str(e))
+                continue
+            self._remove([seq])
+            if row:
+                saved.append(row)
+        return saved
+
+    def _defer(self, e):
+        """
+        접속 오류나 스키마 오류(테이블/컬럼 없음)면 다음 재시도로 미루고 True.
+        스키마 오류면 다시 시도하기 전에 prepare_fn 으로 스키마를 준비한다.
+        """
+        schema = is_schema_error(e)
+        if not (schema or is_connection_error(e)):
+            return False
+        self._retry_delay = min(max(self._retry_delay * 2, 1.0), RETRY_MAX_DELAY)
+        if schema and self.prepare_fn is not None:
+            try:
+                self.prepare_fn()
+            except Exception as prepare_error:
+                print(f"❌ 저장 테이블 준비 실패: {prepare_error}")
+        return True
+
+    def _remove(self, seqs):
+        with self._db_lock:
+            self._db.executemany("DELETE FROM pending WHERE seq = ?", [(s,) for s in seqs])
+            self._db.commit()
+
+    def _move_to_failed(self, seq, question, answer, created_at, error):
+        print(f"❌ 저장 실패 항목을 스풀의 failed 테이블로 옮깁니다: {error}")
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO failed (seq, question, answer, created_at, error) VALUES (?, ?, ?, ?, ?)",
+                (seq, question, answer, created_at, error)
+            )
+            self._db.execute("DELETE FROM pending WHERE seq = ?", (seq,))
+            self._db.commit()
+
+    def stats(self):
+        return {'pending': self.pending_count(), 'failed': self.failed_count(), 'saved': self.saved_count,
+                'batches': self.batch_count}
+
+    def close(self, timeout=5.0):
+        """
+        남은 항목을 한 번 더 저장 시도하고 스레드를 멈춘다.
+        timeout 안에 끝나지 않으면 하던 묶음까지만 마치게 하고 멈춘다 - 이 함수가 돌아온 뒤에
+        커넥션 풀을 닫아도 저장 스레드가 더 이상 풀을 쓰지 않는다.
+        스풀에 남은(다음 실행 때 저장될) 항목 수를 반환한다. failed 로 옮긴 항목이 있으면 알린다.
+        """
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            self._aborting = True
+            self._thread.join(timeout)
+        with self._db_lock:
+            pending = self._pending_count()
+            failed = self._db.execute("SELECT COUNT(*) FROM failed").fetchone()[0]
+            if not self._thread.is_alive():
+                self._db.close()
+        if failed:
+            print(f"⚠️ 저장에 실패한 {failed}건이 스풀의 failed 테이블에 있습니다 (다음 실행 때 다시 시도).")
+        return pending